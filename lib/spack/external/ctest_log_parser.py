@@ -69,8 +69,8 @@
 from __future__ import division
 
 import re
-import math
-import multiprocessing
+import sre_constants
+import sre_parse
 import time
 from contextlib import contextmanager
 
@@ -298,12 +298,6 @@ class BuildWarning(LogEvent):
     """LogEvent subclass for build warnings."""
 
 
-def chunks(l, n):
-    """Divide l into n approximately-even chunks."""
-    chunksize = int(math.ceil(len(l) / n))
-    return [l[i:i + chunksize] for i in range(0, len(l), chunksize)]
-
-
 @contextmanager
 def _time(times, i):
     start = time.time()
@@ -340,49 +334,271 @@ def _profile_match(matches, exceptions, line, match_times, exc_times):
         return True
 
 
-def _parse(lines, offset, profile):
-    def compile(regex_array):
-        return [regex if isinstance(regex, prefilter) else re.compile(regex)
-                for regex in regex_array]
-
-    error_matches      = compile(_error_matches)
-    error_exceptions   = compile(_error_exceptions)
-    warning_matches    = compile(_warning_matches)
-    warning_exceptions = compile(_warning_exceptions)
-    file_line_matches  = compile(_file_line_matches)
-
-    matcher, args = _match, []
-    timings = []
-    if profile:
-        matcher = _profile_match
-        timings = [
-            [0.0] * len(error_matches), [0.0] * len(error_exceptions),
-            [0.0] * len(warning_matches), [0.0] * len(warning_exceptions)]
-
-    errors = []
-    warnings = []
-    for i, line in enumerate(lines):
-        # use CTest's regular expressions to scrape the log for events
-        if matcher(error_matches, error_exceptions, line, *timings[:2]):
-            event = BuildError(line.strip(), offset + i + 1)
-            errors.append(event)
-        elif matcher(warning_matches, warning_exceptions, line, *timings[2:]):
-            event = BuildWarning(line.strip(), offset + i + 1)
-            warnings.append(event)
-        else:
+#: Size of the chunks in which logs are read by ``CTestLogParser.parse()``
+_chunk_size = 2 ** 20
+
+
+def _required_strings(parsed):
+    """Strings one of which is in any text matched by a parsed regex, or
+    None if they cannot be found."""
+    candidates = []
+    literal = []
+    for op, av in list(parsed) + [(None, None)]:
+        if op == sre_constants.LITERAL:
+            literal.append(chr(av))
             continue
+        if literal:
+            candidates.append(set([''.join(literal)]))
+            literal = []
+
+        if op == sre_constants.SUBPATTERN:
+            strings = _required_strings(av[-1])
+        elif op == sre_constants.BRANCH:
+            branches = [_required_strings(b) for b in av[1]]
+            strings = set().union(*branches) if all(branches) else None
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            strings = _required_strings(av[2]) if av[0] > 0 else None
+        else:
+            strings = None
+        if strings:
+            candidates.append(strings)
+
+    if not candidates:
+        return None
+    # The most selective strings are the longest
+    return max(candidates, key=lambda c: (min(len(x) for x in c), -len(c)))
+
+
+def _all_patterns(regex_array):
+    for regex in regex_array:
+        if isinstance(regex, prefilter):
+            for pattern in regex.patterns:
+                yield pattern.pattern
+        else:
+            yield regex
+
+
+_event_keys = None
+
+
+def event_keys(length=4):
+    """Strings, one of which is in every line of a log that may be an error
+    or a warning.
+
+    Checking each line of a large log against all of CTest's regexes is
+    slow. Instead, the lines worth checking are found by searching a whole
+    chunk of the log for these few strings. They are substrings of
+    ``length`` characters of the literal text required by the regexes,
+    chosen so that each regex requires one of them.
+    """
+    global _event_keys
+    if _event_keys is None:
+        required = []
+        for pattern in _all_patterns(_error_matches + _warning_matches):
+            strings = _required_strings(sre_parse.parse(pattern))
+            if strings is None:
+                raise ValueError(
+                    'No literal text in log regex: {0}'.format(pattern))
+            required.extend(strings)
+
+        # Greedily pick the substrings found in most required strings
+        keys = []
+        while required:
+            counts = {}
+            for string in required:
+                n = min(length, len(string))
+                for sub in set(string[i:i + n]
+                               for i in range(len(string) - n + 1)):
+                    counts[sub] = counts.get(sub, 0) + 1
+            key = max(sorted(counts), key=lambda k: counts[k])
+            keys.append(key)
+            required = [string for string in required if key not in string]
+        _event_keys = keys
+    return _event_keys
+
+
+def _lines_before(text, pos, n):
+    """Up to ``n`` lines of ``text`` before the line starting at ``pos``."""
+    lines = []
+    while pos > 0 and len(lines) < n:
+        start = text.rfind('\n', 0, pos - 1) + 1
+        lines.append(text[start:pos - 1])
+        pos = start
+    lines.reverse()
+    return lines
+
+
+def _lines_after(text, pos, n):
+    """Up to ``n`` complete lines of ``text`` from position ``pos``."""
+    lines = []
+    while len(lines) < n:
+        end = text.find('\n', pos)
+        if end < 0:
+            break
+        lines.append(text[pos:end])
+        pos = end + 1
+    return lines
+
+
+class LogScanner(object):
+    """Incremental parser of build logs.
+
+    The log is fed to the scanner in chunks of any size, e.g. as a build
+    writes it, and the errors and warnings found so far are available at
+    any time in ``errors`` and ``warnings``. Lines are only checked against
+    all of CTest's regexes if they contain one of the ``event_keys()``.
+
+    Args:
+        context (int): lines of context to extract around each log event
+        max_errors (int): stop looking for events once this many errors are
+            found, or None to scan the whole log
+        profile (bool): record the time spent in each regex
+    """
+
+    def __init__(self, context=6, max_errors=None, profile=False):
+        self.context = context
+        self.max_errors = max_errors
+        self.errors = []
+        self.warnings = []
+
+        #: Number of complete lines scanned so far
+        self.lines = 0
+
+        def compile(regex_array):
+            return [r if isinstance(r, prefilter) else re.compile(r)
+                    for r in regex_array]
+
+        self._error_matches = compile(_error_matches)
+        self._error_exceptions = compile(_error_exceptions)
+        self._warning_matches = compile(_warning_matches)
+        self._warning_exceptions = compile(_warning_exceptions)
+        self._file_line_matches = compile(_file_line_matches)
+
+        self._matcher = _match
+        self.timings = []
+        if profile:
+            self._matcher = _profile_match
+            self.timings = [
+                [0.0] * len(self._error_matches),
+                [0.0] * len(self._error_exceptions),
+                [0.0] * len(self._warning_matches),
+                [0.0] * len(self._warning_exceptions)]
+
+        self._partial = ''    # last line fed, until it is complete
+        self._previous = []   # last lines scanned, for pre-context
+        self._waiting = []    # (event, lines) of events missing context
+
+    @property
+    def stopped(self):
+        """Whether ``max_errors`` errors were found."""
+        return (self.max_errors is not None and
+                len(self.errors) >= self.max_errors)
+
+    @property
+    def done(self):
+        """Whether no more events will be found, nor context added to them.
+        """
+        return self.stopped and not self._waiting
+
+    def feed(self, text):
+        """Scan the next chunk of the log."""
+        if self.done:
+            return
+        if self._partial:
+            text = self._partial + text
+        end = text.rfind('\n') + 1
+        self._partial = text[end:]
+        if end:
+            self._scan(text[:end])
+
+    def finish(self):
+        """Scan the end of the log, which may not end with a newline.
+
+        Returns:
+            (tuple): two lists containing ``BuildError`` and
+                ``BuildWarning`` objects.
+        """
+        if self._partial and not self.done:
+            self._scan(self._partial)
+        self._partial = ''
+        self._waiting = []
+        return self.errors, self.warnings
+
+    def _scan(self, chunk):
+        """Scan complete lines, or the last line of the log."""
+        # Complete the context of events at the end of the last chunk
+        if self._waiting:
+            head = _lines_after(chunk, 0, self.context)
+            if not chunk.endswith('\n'):
+                head.append(chunk)
+            waiting = []
+            for event, missing in self._waiting:
+                event.post_context.extend(
+                    line.rstrip() for line in head[:missing])
+                if missing > len(head):
+                    waiting.append((event, missing - len(head)))
+            self._waiting = waiting
+
+        # Start of the lines that contain a key
+        starts = set()
+        for key in event_keys():
+            pos = chunk.find(key)
+            while pos >= 0:
+                starts.add(chunk.rfind('\n', 0, pos) + 1)
+                pos = chunk.find('\n', pos) + 1
+                if not pos:
+                    break
+                pos = chunk.find(key, pos)
+
+        line_no, counted = self.lines, 0
+        for start in sorted(starts):
+            if self.stopped:
+                break
+            end = chunk.find('\n', start) + 1 or len(chunk)
+            line_no += chunk.count('\n', counted, start)
+            counted = start
+            self._check(chunk, start, end, line_no + 1)
+
+        self.lines += chunk.count('\n')
+        if self.context:
+            lines = _lines_before(chunk, len(chunk), self.context)
+            self._previous = (self._previous + lines)[-self.context:]
+
+    def _check(self, chunk, start, end, line_no):
+        """Check the line of ``chunk`` between ``start`` and ``end`` with
+        CTest's regexes, and record the event it is, if any."""
+        line = chunk[start:end]
+        if self._matcher(self._error_matches, self._error_exceptions,
+                         line, *self.timings[:2]):
+            event = BuildError(line.strip(), line_no)
+            self.errors.append(event)
+        elif self._matcher(self._warning_matches, self._warning_exceptions,
+                           line, *self.timings[2:]):
+            event = BuildWarning(line.strip(), line_no)
+            self.warnings.append(event)
+        else:
+            return
 
         # get file/line number for each event, if possible
-        for flm in file_line_matches:
+        for flm in self._file_line_matches:
             match = flm.search(line)
             if match:
                 event.source_file, event.source_line_no = match.groups()
 
-    return errors, warnings, timings
+        if not self.context:
+            return
 
+        pre = _lines_before(chunk, start, self.context)
+        missing = self.context - len(pre)
+        if missing:
+            # The context starts in the previous chunks
+            pre = self._previous[-missing:] + pre
+        event.pre_context = [line.rstrip() for line in pre]
 
-def _parse_unpack(args):
-    return _parse(*args)
+        post = _lines_after(chunk, end, self.context)
+        event.post_context = [line.rstrip() for line in post]
+        if len(post) < self.context:
+            self._waiting.append((event, self.context - len(post)))
 
 
 class CTestLogParser(object):
@@ -411,12 +627,20 @@ def stringify(elt):
             index += 1
 
 
-    def parse(self, stream, context=6, jobs=None):
+    def parse(self, stream, context=6, jobs=None, max_errors=None):
         """Parse a log file by searching each line for errors and warnings.
 
+        The log is read and scanned in chunks with a ``LogScanner``, so
+        that large logs are not loaded in memory all at once.
+
         Args:
-            stream (str or file-like): filename or stream to read from
+            stream (str or file-like): filename or stream to read from, or
+                list of lines
             context (int): lines of context to extract around each log event
+            jobs (int): ignored, logs are scanned by a single process since
+                they are prefiltered
+            max_errors (int): stop reading the log once this many errors
+                are found, or None to read all of it
 
         Returns:
             (tuple): two lists containing ``BuildError`` and
@@ -424,48 +648,22 @@ def parse(self, stream, context=6, jobs=None):
         """
         if isinstance(stream, string_types):
             with open(stream) as f:
-                return self.parse(f, context, jobs)
-
-        lines = [line for line in stream]
-
-        if jobs is None:
-            jobs = multiprocessing.cpu_count()
-
-        # single-thread small logs
-        if len(lines) < 10 * jobs:
-            errors, warnings, self.timings = _parse(lines, 0, self.profile)
-
+                return self.parse(f, context, jobs, max_errors)
+
+        scanner = LogScanner(context, max_errors, self.profile)
+        read = getattr(stream, 'read', None)
+        if read is not None:
+            while not scanner.done:
+                text = read(_chunk_size)
+                if not text:
+                    break
+                scanner.feed(text)
         else:
-            # Build arguments for parallel jobs
-            args = []
-            offset = 0
-            for chunk in chunks(lines, jobs):
-                args.append((chunk, offset, self.profile))
-                offset += len(chunk)
-
-            # create a pool and farm out the matching job
-            pool = multiprocessing.Pool(jobs)
-            try:
-                # this is a workaround for a Python bug in Pool with ctrl-C
-                results = pool.map_async(_parse_unpack, args, 1).get(9999999)
-                errors, warnings, timings = zip(*results)
-            finally:
-                pool.terminate()
-
-            # merge results
-            errors = sum(errors, [])
-            warnings = sum(warnings, [])
-
-            if self.profile:
-                self.timings = [
-                    [sum(i) for i in zip(*t)] for t in zip(*timings)]
-
-        # add log context to all events
-        for event in (errors + warnings):
-            i = event.line_no - 1
-            event.pre_context = [
-                l.rstrip() for l in lines[i - context:i]]
-            event.post_context = [
-                l.rstrip() for l in lines[i + 1:i + context + 1]]
+            for line in stream:
+                scanner.feed(line if line.endswith('\n') else line + '\n')
+                if scanner.done:
+                    break
 
+        errors, warnings = scanner.finish()
+        self.timings = scanner.timings
         return errors, warnings
@@ -134,11 +134,14 @@ def __len__(self):
         return len(self.data)
 
 
+#: Path to the file with the data on the known micro-architectures
+targets_json_file = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'microarchitectures.json')
+
+
 def _load_targets_json():
     """Loads ``microarchitectures.json`` in memory."""
-    directory_name = os.path.dirname(os.path.abspath(__file__))
-    filename = os.path.join(directory_name, 'microarchitectures.json')
-    with open(filename, 'r') as f:
+    with open(targets_json_file, 'r') as f:
         return json.load(f)
 
 
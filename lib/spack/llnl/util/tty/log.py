@@ -8,7 +8,10 @@
 from __future__ import unicode_literals
 
 import atexit
+import codecs
 import errno
+import gzip
+import io
 import multiprocessing
 import os
 import re
@@ -28,8 +31,9 @@
     termios = None
 
 
-# Use this to strip escape sequences
-_escape = re.compile(r'\x1b[^m]*m|\x1b\[?1034h')
+# Use this to strip escape sequences. They do not span lines, so that
+# this works the same on blocks of output as on single lines.
+_escape = re.compile(r'\x1b[^m\n]*m|\x1b\[?1034h')
 
 # control characters for enabling/disabling echo
 #
@@ -39,6 +43,21 @@
 xon, xoff = '\x11\n', '\x13\n'
 control = re.compile('(\x11\n|\x13\n)')
 
+#: Compression formats of log files, mapped to the extension of their names
+log_compressions = {'gzip': '.gz', 'zstd': '.zst'}
+
+#: Leading bytes of compressed log files, by compression format
+_magic = {'gzip': b'\x1f\x8b', 'zstd': b'\x28\xb5\x2f\xfd'}
+
+#: Size of the blocks of output read by the writer daemon
+_block_size = 2 ** 16
+
+#: Longest incomplete escape sequence held back at the end of a block
+_max_pending = 2 ** 12
+
+#: Default size of the tail of the output kept in memory, in characters
+default_tail_size = 2 ** 16
+
 
 @contextmanager
 def ignore_signal(signum):
@@ -64,6 +83,196 @@ def _strip(line):
     return _escape.sub('', line)
 
 
+def _zstandard():
+    """The ``zstandard`` module, or None if it is not installed."""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def compression_supported(compression):
+    """Whether logs can be compressed with ``compression`` (one of the keys
+    of ``log_compressions``) by the running Python."""
+    if compression == 'zstd':
+        return _zstandard() is not None
+    return compression in log_compressions
+
+
+def open_log(path):
+    """Open a log file for reading text, whether it is compressed or not.
+
+    The compression of the log is found from its content, not its name.
+    Bytes that are not valid UTF-8 are replaced.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic.startswith(_magic['gzip']):
+        stream = gzip.open(path, 'rb')
+    elif magic.startswith(_magic['zstd']):
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise IOError(
+                'Cannot read {0}: reading zstd compressed logs requires '
+                'the zstandard module'.format(path))
+        stream = zstandard.ZstdDecompressor().stream_reader(
+            io.open(path, 'rb'))
+    else:
+        stream = io.open(path, 'rb')
+    return io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+
+
+class _CompressedLog(object):
+    """Log file that compresses the text written to it.
+
+    The file is created when this object is, but the compressed stream is
+    only started by ``start()`` in the writer daemon, so that closing the
+    copy of this object in the parent process does not write to the file.
+    Output is not flushed before the log is closed, since that would make
+    it compress worse.
+    """
+
+    def __init__(self, path, compression):
+        if not compression_supported(compression):
+            raise ValueError(
+                'Unsupported log compression: {0}'.format(compression))
+        self.compression = compression
+        self._file = io.open(path, 'wb')
+        self._stream = None
+
+    def start(self):
+        if self.compression == 'gzip':
+            self._stream = gzip.GzipFile(
+                fileobj=self._file, mode='wb', compresslevel=6)
+        else:
+            compressor = _zstandard().ZstdCompressor()
+            self._stream = compressor.stream_writer(self._file)
+
+    def write(self, text):
+        if not isinstance(text, bytes):
+            text = text.encode('utf-8', 'replace')
+        self._stream.write(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._file.close()
+
+
+def _decoder():
+    """Return a function decoding the output of the logged process, one
+    block at a time. Python 2 keeps the output as bytes."""
+    if sys.version_info[0] < 3:
+        return lambda data, final=False: data
+    return codecs.getincrementaldecoder('utf-8')('replace').decode
+
+
+def _hold_back(text):
+    """Split ``text`` before a control or escape sequence at its end that
+    may be completed by the next block of output.
+
+    Returns:
+        (tuple): the text that can be handled now, and the rest
+    """
+    end = len(text)
+    if text[-1:] in ('\x11', '\x13'):
+        end -= 1
+
+    escape = text.rfind('\x1b', max(0, end - _max_pending), end)
+    if escape >= 0 and not re.search('[m\n]', text[escape:end]):
+        end = escape
+    return text[:end], text[end:]
+
+
+class _OutputHandler(object):
+    """Echoes and logs the output of the process logged by the writer
+    daemon, one block at a time.
+
+    Arguments:
+        log_file (file-like): file to log the output to
+        echo (bool): whether to echo the output to ``stdout``
+        max_size (int): maximum number of characters written to the log,
+            or 0 for no limit
+        tail_size (int): number of characters at the end of the output
+            that are kept in memory
+    """
+
+    def __init__(self, log_file, echo, max_size, tail_size):
+        self.log_file = log_file
+        self.echo = echo
+        self.force_echo = False  # parent can force echo for certain output
+        self.max_size = max_size
+        self.tail_size = tail_size
+
+        #: Last characters of the output, stripped of escape sequences
+        self.tail = ''
+        #: Number of characters written to the log, and left out of it
+        self.written = 0
+        self.omitted = 0
+        self._ends_line = True
+
+    def handle(self, text):
+        """Echo and log a block of output."""
+        # Control sequences alternate with the output in between them
+        parts = control.split(text)
+        echoed = False
+        for i, part in enumerate(parts):
+            if i % 2:
+                self.force_echo = part == xon
+            elif part and (self.echo or self.force_echo):
+                sys.stdout.write(part)
+                echoed = True
+        if echoed:
+            sys.stdout.flush()
+
+        self._log(_strip(text[:0].join(parts[::2])))
+
+    def _log(self, text):
+        if not text:
+            return
+        if self.tail_size:
+            tail = self.tail + text if self.tail else text
+            self.tail = tail[-self.tail_size:]
+
+        if self.max_size:
+            room = self.max_size - self.written
+            if len(text) > room:
+                if room > 0:
+                    self._write(text[:room])
+                self.omitted += len(text) - max(room, 0)
+                return
+        self._write(text)
+
+    def _write(self, text):
+        self.log_file.write(text)
+        self.log_file.flush()
+        self.written += len(text)
+        self._ends_line = text.endswith('\n')
+
+    def finish(self):
+        """Write the end of the output left out of a truncated log."""
+        if not self.omitted:
+            return
+
+        # The end of the output usually tells why a build failed, so it
+        # is logged after the point where the log was truncated.
+        tail = self.tail[-self.omitted:]
+        if len(tail) < self.omitted:
+            tail = tail[tail.find('\n') + 1:]
+
+        self.log_file.write('{0}==> Output truncated: {1} characters left '
+                            'out of the log\n'.format(
+                                '' if self._ends_line else '\n',
+                                self.omitted - len(tail)))
+        self.log_file.write(tail)
+
+
 class keyboard_input(object):
     """Context manager to disable line editing and echoing.
 
@@ -321,9 +530,15 @@ class log_output(object):
     stdout or stderr has been set to some Python-level file object, we
     use Python-level redirection instead.  This allows the redirection to
     work within test frameworks like nose and pytest.
+
+    Logs written to a named file can be compressed on the fly, and their
+    size can be limited, in which case the end of the output is still
+    logged. Use ``open_log()`` to read them back.
     """
 
-    def __init__(self, file_like=None, echo=False, debug=0, buffer=False):
+    def __init__(self, file_like=None, echo=False, debug=0, buffer=False,
+                 compression=None, max_size=0,
+                 tail_size=default_tail_size):
         """Create a new output log context manager.
 
         Args:
@@ -333,6 +548,14 @@ def __init__(self, file_like=None, echo=False, debug=0, buffer=False):
             debug (int): positive to enable tty debug mode during logging
             buffer (bool): pass buffer=True to skip unbuffering output; note
                 this doesn't set up any *new* buffering
+            compression (str): compress the log file named ``file_like``
+                with this format (one of ``log_compressions``)
+            max_size (int): maximum number of characters written to the log,
+                or 0 for no limit. Past it, only the last ``tail_size``
+                characters of the output are logged, at the end of the log.
+            tail_size (int): number of characters at the end of the output
+                kept in memory. They are available in the ``tail``
+                attribute after the output has been logged.
 
         log_output can take either a file object or a filename. If a
         filename is passed, the file will be opened and closed entirely
@@ -351,10 +574,15 @@ def __init__(self, file_like=None, echo=False, debug=0, buffer=False):
         self.echo = echo
         self.debug = debug
         self.buffer = buffer
+        self.compression = compression
+        self.max_size = max_size
+        self.tail_size = tail_size
+        self.tail = ''
 
         self._active = False  # used to prevent re-entry
 
-    def __call__(self, file_like=None, echo=None, debug=None, buffer=None):
+    def __call__(self, file_like=None, echo=None, debug=None, buffer=None,
+                 compression=None, max_size=None):
         """This behaves the same as init. It allows a logger to be reused.
 
         Arguments are the same as for ``__init__()``.  Args here take
@@ -381,6 +609,10 @@ def __call__(self, file_like=None, echo=None, debug=None, buffer=None):
             self.debug = debug
         if buffer is not None:
             self.buffer = buffer
+        if compression is not None:
+            self.compression = compression
+        if max_size is not None:
+            self.max_size = max_size
         return self
 
     def __enter__(self):
@@ -395,7 +627,11 @@ def __enter__(self):
         self.close_log_in_parent = True
         self.write_log_in_parent = False
         if isinstance(self.file_like, string_types):
-            self.log_file = open(self.file_like, 'w')
+            if self.compression:
+                self.log_file = _CompressedLog(
+                    self.file_like, self.compression)
+            else:
+                self.log_file = open(self.file_like, 'w')
 
         elif _file_descriptors_work(self.file_like):
             self.log_file = self.file_like
@@ -434,7 +670,7 @@ def __enter__(self):
                 target=_writer_daemon,
                 args=(
                     input_stream, read_fd, write_fd, self.echo, self.log_file,
-                    child_pipe
+                    child_pipe, self.max_size, self.tail_size
                 )
             )
             self.process.daemon = True  # must set before start()
@@ -521,8 +757,9 @@ def __exit__(self, exc_type, exc_val, exc_tb):
         if self.close_log_in_parent:
             self.log_file.close()
 
-        # recover and store echo settings from the child before it dies
-        self.echo = self.parent_pipe.recv()
+        # recover and store echo settings and the tail of the output from
+        # the child before it dies
+        self.echo, self.tail = self.parent_pipe.recv()
 
         # join the daemon process. The daemon will quit automatically
         # when the write pipe is closed; we just wait for it here.
@@ -554,7 +791,8 @@ def force_echo(self):
             sys.stdout.flush()
 
 
-def _writer_daemon(stdin, read_fd, write_fd, echo, log_file, control_pipe):
+def _writer_daemon(stdin, read_fd, write_fd, echo, log_file, control_pipe,
+                   max_size=0, tail_size=default_tail_size):
     """Daemon used by ``log_output`` to write to a log file and to ``stdout``.
 
     The daemon receives output from the parent process and writes it both
@@ -588,7 +826,12 @@ def _writer_daemon(stdin, read_fd, write_fd, echo, log_file, control_pipe):
     ``stdout`` was enabled or disabled when it finished and, if the
     ``log_file`` is a ``StringIO`` object, then the daemon also sends the
     logged output back to the parent as a string, to be written to the
-    ``StringIO`` in the parent. This is mainly for testing.
+    ``StringIO`` in the parent. This is mainly for testing. It also sends
+    the last ``tail_size`` characters of the output back to the parent.
+
+    If more than ``max_size`` characters are output, the log is truncated:
+    the rest of the output is not written to it, except for its tail which
+    is written at the end of the log.
 
     Arguments:
         stdin (stream): input from the terminal
@@ -600,18 +843,25 @@ def _writer_daemon(stdin, read_fd, write_fd, echo, log_file, control_pipe):
         log_file (file-like): file to log all output
         control_pipe (Pipe): multiprocessing pipe on which to send control
             information to the parent
-
+        max_size (int): maximum number of characters written to the log,
+            or 0 for no limit
+        tail_size (int): number of characters at the end of the output
+            kept in memory
     """
-    # Use line buffering (3rd param = 1) since Python 3 has a bug
-    # that prevents unbuffered text I/O.
-    in_pipe = os.fdopen(read_fd, 'r', 1)
+    # Output is read in blocks rather than lines, which takes far fewer
+    # system calls for builds that print a lot.
     os.close(write_fd)
+    decode = _decoder()
+    handler = _OutputHandler(log_file, echo, max_size, tail_size)
+    pending = ''  # end of the last block, handled with the next one
 
     # list of streams to select from
-    istreams = [in_pipe, stdin] if stdin else [in_pipe]
-    force_echo = False      # parent can force echo for certain output
+    istreams = [read_fd, stdin] if stdin else [read_fd]
 
     try:
+        if isinstance(log_file, _CompressedLog):
+            log_file.start()
+
         with keyboard_input(stdin) as kb:
             while True:
                 # fix the terminal settings if we recently came to
@@ -631,7 +881,7 @@ def _writer_daemon(stdin, read_fd, write_fd, echo, log_file, control_pipe):
                     with ignore_signal(signal.SIGTTIN):
                         try:
                             if stdin.read(1) == 'v':
-                                echo = not echo
+                                handler.echo = not handler.echo
                         except IOError as e:
                             # If SIGTTIN is ignored, the system gives EIO
                             # to let the caller know the read failed b/c it
@@ -639,42 +889,35 @@ def _writer_daemon(stdin, read_fd, write_fd, echo, log_file, control_pipe):
                             if e.errno != errno.EIO:
                                 raise
 
-                if in_pipe in rlist:
+                if read_fd in rlist:
                     # Handle output from the calling process.
-                    line = _retry(in_pipe.readline)()
-                    if not line:
+                    data = _retry(os.read)(read_fd, _block_size)
+                    if not data:
                         break
 
-                    # find control characters and strip them.
-                    controls = control.findall(line)
-                    line = control.sub('', line)
+                    text = decode(data)
+                    if pending:
+                        text = pending + text
+                    text, pending = _hold_back(text)
+                    handler.handle(text)
 
-                    # Echo to stdout if requested or forced.
-                    if echo or force_echo:
-                        sys.stdout.write(line)
-                        sys.stdout.flush()
-
-                    # Stripped output to log file.
-                    log_file.write(_strip(line))
-                    log_file.flush()
-
-                    if xon in controls:
-                        force_echo = True
-                    if xoff in controls:
-                        force_echo = False
+        handler.handle(pending + decode(b'', final=True))
+        handler.finish()
 
     except BaseException:
         tty.error("Exception occurred in writer daemon!")
         traceback.print_exc()
 
     finally:
+        os.close(read_fd)
+
         # send written data back to parent if we used a StringIO
         if isinstance(log_file, StringIO):
             control_pipe.send(log_file.getvalue())
         log_file.close()
 
-    # send echo value back to the parent so it can be preserved.
-    control_pipe.send(echo)
+    # send echo value and the tail of the output back to the parent
+    control_pipe.send((handler.echo, handler.tail))
 
 
 def _retry(function):
@@ -57,15 +57,21 @@
 will be responsible for compiler detection.
 """
 import functools
+import hashlib
 import inspect
+import json
+import os
+import shutil
 import warnings
 
 import six
 
 import llnl.util.cpu as cpu
 import llnl.util.tty as tty
+from llnl.util.filesystem import mkdirp
 from llnl.util.lang import memoized, list_modules, key_ordering
 
+import spack
 import spack.compiler
 import spack.paths
 import spack.error as serr
@@ -551,9 +557,97 @@ def sys_type():
 def compatible_sys_types():
     """Returns a list of all the systypes compatible with the current host."""
     compatible_archs = []
-    current_host = cpu.host()
+    current_host = host()
     compatible_targets = [current_host] + current_host.ancestors
     for target in compatible_targets:
         arch = Arch(platform(), 'default_os', target)
         compatible_archs.append(str(arch))
     return compatible_archs
+
+
+#: Fields of the cpu information that change while a host is running, and
+#: so are left out of the key of its host cache entry
+_volatile_cpu_info = ('cpu MHz', 'bogomips', 'BogoMIPS')
+
+
+def _host_cache_path():
+    """Returns the path of the entry of this host in the host cache.
+
+    The entry is named after a hash of what the detection of the host
+    depends on: the kernel, the information on the cpu, the release file of
+    the OS, the version of the microarchitecture DB and the version of Spack.
+    """
+    info = cpu.detect.raw_info_dictionary()
+    cpu_info = sorted((k, v) for k, v in info.items()
+                      if k not in _volatile_cpu_info)
+
+    try:
+        st = os.stat('/etc/os-release')
+        os_release = [st.st_mtime, st.st_size]
+    except OSError:
+        os_release = None
+
+    with open(cpu.schema.targets_json_file, 'rb') as f:
+        db_version = hashlib.sha1(f.read()).hexdigest()
+
+    inputs = [list(os.uname()), cpu_info, os_release, db_version,
+              str(spack.spack_version)]
+    digest = hashlib.sha1(json.dumps(inputs).encode('utf-8')).hexdigest()
+    return os.path.join(
+        spack.paths.user_host_cache_path, '{0}.json'.format(digest))
+
+
+@memoized
+def _host_cache():
+    """Returns the path and the values of the host cache entry of this host.
+    """
+    path = _host_cache_path()
+    try:
+        with open(path) as f:
+            return path, json.load(f)
+    except Exception:
+        # Missing, or not written completely
+        return path, {}
+
+
+def host_cache_value(name, detect):
+    """Returns a value detected on this host, like its target or its OS.
+
+    Values are detected once per host, and kept in the host cache for as
+    long as what the detection depends on does not change.
+
+    Args:
+        name (str): name of the value in the host cache
+        detect (callable): function detecting the value, which must be
+            serializable as JSON
+    """
+    path, values = _host_cache()
+    if name not in values:
+        values[name] = detect()
+        tmp = '{0}.tmp-{1}'.format(path, os.getpid())
+        try:
+            mkdirp(os.path.dirname(path))
+            with open(tmp, 'w') as f:
+                json.dump(values, f)
+            os.rename(tmp, path)
+        except Exception as e:
+            tty.debug('Cannot write the host cache: {0}'.format(str(e)))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return values[name]
+
+
+def host():
+    """Returns the microarchitecture of this host.
+
+    This is the microarchitecture ``llnl.util.cpu.host()`` detects, as kept
+    in the host cache.
+    """
+    name = host_cache_value('target', lambda: cpu.host().name)
+    return cpu.targets[name]
+
+
+def clear_host_cache():
+    """Removes what was detected on every host from the host cache."""
+    shutil.rmtree(spack.paths.user_host_cache_path, ignore_errors=True)
+    _host_cache.cache.clear()
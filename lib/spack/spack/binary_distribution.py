@@ -954,10 +954,41 @@ def get_keys(install=False, trust=False, force=False):
                               'Use -t to install all downloaded keys')
 
 
+def _spec_yaml_url(spec, mirror_url):
+    """URL of the .spec.yaml file of ``spec`` in the buildcache at
+    ``mirror_url``."""
+    cache_prefix = build_cache_prefix(mirror_url)
+    return os.path.join(cache_prefix, tarball_name(spec, '.spec.yaml'))
+
+
+def _read_spec_yaml(result):
+    """Read the contents of the .spec.yaml from a ``read_from_url`` result."""
+    _, _, yaml_file = result
+    return codecs.getreader('utf-8')(yaml_file).read()
+
+
 def needs_rebuild(spec, mirror_url, rebuild_on_errors=False):
     if not spec.concrete:
         raise ValueError('spec must be concrete to check against mirror')
 
+    # Try to retrieve the .spec.yaml directly, based on the known
+    # format of the name, in order to determine if the package
+    # needs to be rebuilt.
+    file_path = _spec_yaml_url(spec, mirror_url)
+    yaml_contents, url_err = None, None
+    try:
+        yaml_contents = _read_spec_yaml(web_util.read_from_url(file_path))
+    except (URLError, web_util.SpackWebError) as e:
+        url_err = e
+
+    return _needs_rebuild(
+        spec, file_path, yaml_contents, url_err, rebuild_on_errors)
+
+
+def _needs_rebuild(spec, file_path, yaml_contents, url_err,
+                   rebuild_on_errors):
+    """Decide whether ``spec`` needs rebuilding, given the contents of its
+    remote .spec.yaml or the error raised while reading it."""
     pkg_name = spec.name
     pkg_version = spec.version
 
@@ -968,20 +999,10 @@ def needs_rebuild(spec, mirror_url, rebuild_on_errors=False):
         pkg_name, pkg_version, pkg_hash, pkg_full_hash))
     tty.debug(spec.tree())
 
-    # Try to retrieve the .spec.yaml directly, based on the known
-    # format of the name, in order to determine if the package
-    # needs to be rebuilt.
-    cache_prefix = build_cache_prefix(mirror_url)
-    spec_yaml_file_name = tarball_name(spec, '.spec.yaml')
-    file_path = os.path.join(cache_prefix, spec_yaml_file_name)
-
     result_of_error = 'Package ({0}) will {1}be rebuilt'.format(
         spec.short_spec, '' if rebuild_on_errors else 'not ')
 
-    try:
-        _, _, yaml_file = web_util.read_from_url(file_path)
-        yaml_contents = codecs.getreader('utf-8')(yaml_file).read()
-    except (URLError, web_util.SpackWebError) as url_err:
+    if url_err is not None:
         err_msg = [
             'Unable to determine whether {0} needs rebuilding,',
             ' caught exception attempting to read from {1}.',
@@ -1036,14 +1057,35 @@ def check_specs_against_mirrors(mirrors, specs, output_file=None,
     Returns: 1 if any spec was out-of-date on any mirror, 0 otherwise.
 
     """
+    specs = list(specs)
     rebuilds = {}
     for mirror in spack.mirror.MirrorCollection(mirrors).values():
         tty.debug('Checking for built specs at {0}'.format(mirror.fetch_url))
 
         rebuild_list = []
 
+        # Read all the remote .spec.yaml files concurrently, on pooled
+        # connections, before checking them in order
+        urls = {}
+        for spec in specs:
+            if not spec.concrete:
+                raise ValueError(
+                    'spec must be concrete to check against mirror')
+            urls[spec] = _spec_yaml_url(spec, mirror.fetch_url)
+
+        contents = {}
+        for url, result, error in web_util.read_from_urls(set(urls.values())):
+            if error is None:
+                contents[url] = (_read_spec_yaml(result), None)
+            elif isinstance(error, (URLError, web_util.SpackWebError)):
+                contents[url] = (None, error)
+            else:
+                raise error
+
         for spec in specs:
-            if needs_rebuild(spec, mirror.fetch_url, rebuild_on_errors):
+            yaml_contents, url_err = contents[urls[spec]]
+            if _needs_rebuild(spec, urls[spec], yaml_contents, url_err,
+                              rebuild_on_errors):
                 rebuild_list.append({
                     'short_spec': spec.short_spec,
                     'hash': spec.dag_hash()
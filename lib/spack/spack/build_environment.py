@@ -41,6 +41,7 @@
 import traceback
 import types
 from six import StringIO
+from six.moves import cPickle
 
 import llnl.util.tty as tty
 from llnl.util.tty.color import cescape, colorize
@@ -54,6 +55,7 @@
 import spack.paths
 import spack.schema.environment
 import spack.store
+import spack.subprocess_context
 import spack.architecture as arch
 from spack.util.string import plural
 from spack.util.environment import (
@@ -85,11 +87,21 @@
 SPACK_PREFIX = 'SPACK_PREFIX'
 SPACK_INSTALL = 'SPACK_INSTALL'
 SPACK_DEBUG = 'SPACK_DEBUG'
+SPACK_CC_TIMING = 'SPACK_CC_TIMING'
 SPACK_SHORT_SPEC = 'SPACK_SHORT_SPEC'
 SPACK_DEBUG_LOG_ID = 'SPACK_DEBUG_LOG_ID'
 SPACK_DEBUG_LOG_DIR = 'SPACK_DEBUG_LOG_DIR'
 SPACK_CCACHE_BINARY = 'SPACK_CCACHE_BINARY'
 SPACK_SYSTEM_DIRS = 'SPACK_SYSTEM_DIRS'
+SPACK_WRAPPER_FLAGS_FROM = 'SPACK_WRAPPER_FLAGS_FROM'
+
+#: Variables the arguments injected by the compiler wrappers are computed
+#: from, in the order the wrappers check them in
+compiler_wrapper_flags_from = (
+    SPACK_INCLUDE_DIRS, SPACK_LINK_DIRS, SPACK_RPATH_DIRS,
+    'SPACK_COMPILER_EXTRA_RPATHS', 'SPACK_COMPILER_IMPLICIT_RPATHS',
+    'SPACK_CC_RPATH_ARG', 'SPACK_CXX_RPATH_ARG', 'SPACK_F77_RPATH_ARG',
+    'SPACK_FC_RPATH_ARG')
 
 
 # Platform-specific library suffix.
@@ -420,6 +432,8 @@ def set_build_environment_variables(pkg, env, dirty):
     # Working directory for the spack command itself, for debug logs.
     if spack.config.get('config:debug'):
         env.set(SPACK_DEBUG, 'TRUE')
+    if spack.config.get('config:compiler_wrapper_timing'):
+        env.set(SPACK_CC_TIMING, 'TRUE')
     env.set(SPACK_SHORT_SPEC, pkg.spec.short_spec)
     env.set(SPACK_DEBUG_LOG_ID, pkg.spec.format('{name}-{hash:7}'))
     env.set(SPACK_DEBUG_LOG_DIR, spack.main.spack_working_dir)
@@ -711,6 +725,51 @@ def load_external_modules(pkg):
             load_module(external_module)
 
 
+def compiler_wrapper_flags(environ):
+    """Compute the arguments that the compiler wrappers inject for the
+    include, link and RPATH directories of dependencies.
+
+    The wrappers would otherwise compute them from the same variables on
+    each invocation. They use these values only if the variables did not
+    change since, which they check with ``SPACK_WRAPPER_FLAGS_FROM``.
+
+    Args:
+        environ (dict): environment of the build
+
+    Returns:
+        (dict): variables to be set in the environment of the build
+    """
+    def dirs(name):
+        # Split like the wrappers do, i.e. without a trailing empty field
+        fields = environ.get(name, '').split(':')
+        if fields[-1] == '':
+            fields.pop()
+        return fields
+
+    include_dirs = dirs(SPACK_INCLUDE_DIRS)
+    extra_rpaths = dirs('SPACK_COMPILER_EXTRA_RPATHS')
+    rpath_dirs = (dirs(SPACK_RPATH_DIRS) + extra_rpaths +
+                  dirs('SPACK_COMPILER_IMPLICIT_RPATHS'))
+
+    flags = {
+        'SPACK_INCLUDE_FLAGS': ['-I' + d for d in include_dirs],
+        'SPACK_ISYSTEM_INCLUDE_FLAGS': ['-isystem' + d for d in include_dirs],
+        'SPACK_LINK_DIR_FLAGS': [
+            '-L' + d for d in dirs(SPACK_LINK_DIRS) + extra_rpaths],
+        'SPACK_LD_RPATH_FLAGS': [
+            arg for d in rpath_dirs for arg in ('-rpath', d)],
+    }
+    for lang in ('CC', 'CXX', 'F77', 'FC'):
+        rpath_arg = environ.get('SPACK_{0}_RPATH_ARG'.format(lang), '')
+        flags['SPACK_{0}_RPATH_FLAGS'.format(lang)] = [
+            rpath_arg + d for d in rpath_dirs]
+
+    variables = dict((name, ':'.join(args)) for name, args in flags.items())
+    variables[SPACK_WRAPPER_FLAGS_FROM] = '|'.join(
+        environ.get(name, '') for name in compiler_wrapper_flags_from)
+    return variables
+
+
 def setup_package(pkg, dirty):
     """Execute all environment setup routines."""
     build_env = EnvironmentModifications()
@@ -771,6 +830,10 @@ def setup_package(pkg, dirty):
     validate(build_env, tty.warn)
     build_env.apply_modifications()
 
+    # Packages can modify the variables the compiler wrappers derive their
+    # arguments from, so these are computed once all is set up
+    os.environ.update(compiler_wrapper_flags(os.environ))
+
 
 def modifications_from_dependencies(spec, context):
     """Returns the environment modifications that are required by
@@ -803,6 +866,68 @@ def modifications_from_dependencies(spec, context):
     return env
 
 
+def child_process(child_pipe, input_stream, load_task):
+    """Run a build task in a child process.
+
+    The result of the task, or the error it raised wrapped in a
+    ChildError, is sent to the parent process through ``child_pipe``.
+
+    Args:
+        child_pipe (Connection): child end of the pipe to the parent
+        input_stream (file): standard input forwarded by the parent, or None
+        load_task (callable): argless function returning the ``(pkg,
+            function, dirty, fake)`` arguments of ``fork()``
+    """
+    # We are in the child process. Python sets sys.stdin to
+    # open(os.devnull) to prevent our process and its parent from
+    # simultaneously reading from the original stdin. But, we assume
+    # that the parent process is not going to read from it till we
+    # are done with the child, so we undo Python's precaution.
+    if input_stream is not None:
+        sys.stdin = input_stream
+
+    pkg = None
+    try:
+        pkg, function, dirty, fake = load_task()
+        if not fake:
+            setup_package(pkg, dirty=dirty)
+        return_value = function()
+        child_pipe.send(return_value)
+
+    except StopPhase as e:
+        # Do not create a full ChildError from this, it's not an error
+        # it's a control statement.
+        child_pipe.send(e)
+    except BaseException:
+        # catch ANYTHING that goes wrong in the child process
+        exc_type, exc, tb = sys.exc_info()
+
+        # Need to unwind the traceback in the child because traceback
+        # objects can't be sent to the parent.
+        tb_string = traceback.format_exc()
+
+        # build up some context from the offending package so we can
+        # show that, too.
+        package_context = get_package_context(tb)
+
+        build_log = None
+        if hasattr(pkg, 'log_path'):
+            build_log = pkg.log_path
+        log_tail = getattr(pkg, '_log_tail', None)
+
+        # make a pickleable exception to send to parent.
+        msg = "%s: %s" % (exc_type.__name__, str(exc))
+
+        ce = ChildError(msg,
+                        exc_type.__module__,
+                        exc_type.__name__,
+                        tb_string, build_log, package_context, log_tail)
+        child_pipe.send(ce)
+
+    finally:
+        child_pipe.close()
+
+
 def fork(pkg, function, dirty, fake):
     """Fork a child process to do part of a spack build.
 
@@ -827,67 +952,51 @@ def child_fun():
     control over the environment, etc. without affecting other builds
     that might be executed in the same spack call.
 
+    The child process is started with the method set in
+    ``config:build_process_start_method`` (see
+    ``spack.subprocess_context``). Unless it is ``fork``, the package and
+    ``function`` are pickled and sent to the child process, so
+    ``function`` should be e.g. a ``functools.partial`` of a module level
+    function. Functions that cannot be pickled are run in a forked process.
+
     If something goes wrong, the child process catches the error and
     passes it to the parent wrapped in a ChildError.  The parent is
     expected to handle (or re-raise) the ChildError.
     """
-
-    def child_process(child_pipe, input_stream):
-        # We are in the child process. Python sets sys.stdin to
-        # open(os.devnull) to prevent our process and its parent from
-        # simultaneously reading from the original stdin. But, we assume
-        # that the parent process is not going to read from it till we
-        # are done with the child, so we undo Python's precaution.
-        if input_stream is not None:
-            sys.stdin = input_stream
-
+    method = spack.subprocess_context.start_method()
+    task = None
+    if method != 'fork':
         try:
-            if not fake:
-                setup_package(pkg, dirty=dirty)
-            return_value = function()
-            child_pipe.send(return_value)
-
-        except StopPhase as e:
-            # Do not create a full ChildError from this, it's not an error
-            # it's a control statement.
-            child_pipe.send(e)
-        except BaseException:
-            # catch ANYTHING that goes wrong in the child process
-            exc_type, exc, tb = sys.exc_info()
-
-            # Need to unwind the traceback in the child because traceback
-            # objects can't be sent to the parent.
-            tb_string = traceback.format_exc()
-
-            # build up some context from the offending package so we can
-            # show that, too.
-            package_context = get_package_context(tb)
-
-            build_log = None
-            if hasattr(pkg, 'log_path'):
-                build_log = pkg.log_path
-
-            # make a pickleable exception to send to parent.
-            msg = "%s: %s" % (exc_type.__name__, str(exc))
-
-            ce = ChildError(msg,
-                            exc_type.__module__,
-                            exc_type.__name__,
-                            tb_string, build_log, package_context)
-            child_pipe.send(ce)
-
-        finally:
-            child_pipe.close()
-
-    parent_pipe, child_pipe = multiprocessing.Pipe()
+            task = cPickle.dumps((pkg, function, dirty, fake),
+                                 protocol=cPickle.HIGHEST_PROTOCOL)
+        except (cPickle.PicklingError, AttributeError, TypeError) as e:
+            tty.debug('Forking the build process of {0}, since its task '
+                      'cannot be pickled: {1}'.format(pkg.name, str(e)))
+            method = 'fork'
+    context = spack.subprocess_context.get_context(method)
+
+    parent_pipe, child_pipe = context.Pipe()
     input_stream = None
+    input_fd = None
     try:
         # Forward sys.stdin when appropriate, to allow toggling verbosity
         if sys.stdin.isatty() and hasattr(sys.stdin, 'fileno'):
-            input_stream = os.fdopen(os.dup(sys.stdin.fileno()))
-
-        p = multiprocessing.Process(
-            target=child_process, args=(child_pipe, input_stream))
+            if task is None:
+                input_stream = os.fdopen(os.dup(sys.stdin.fileno()))
+            else:
+                input_fd = spack.subprocess_context.InheritedFd(
+                    os.dup(sys.stdin.fileno()))
+
+        if task is None:
+            p = context.Process(
+                target=child_process,
+                args=(child_pipe, input_stream,
+                      lambda: (pkg, function, dirty, fake)))
+        else:
+            state = spack.subprocess_context.BuildProcessState()
+            p = context.Process(
+                target=spack.subprocess_context.spawned_child_process,
+                args=(child_pipe, input_fd, state, task))
         p.start()
 
     except InstallError as e:
@@ -898,8 +1007,21 @@ def child_process(child_pipe, input_stream):
         # Close the input stream in the parent process
         if input_stream is not None:
             input_stream.close()
+        if input_fd is not None:
+            os.close(input_fd.fd)
 
-    child_result = parent_pipe.recv()
+    # Close the parent's copy of the child end of the pipe, so that
+    # receiving fails instead of hanging if the child dies before sending
+    child_pipe.close()
+    try:
+        child_result = parent_pipe.recv()
+    except EOFError:
+        p.join()
+        error = InstallError(
+            'The build process of {0} exited unexpectedly with code {1}'
+            .format(pkg.name, p.exitcode))
+        error.pkg = pkg
+        raise error
     p.join()
 
     # If returns a StopPhase, raise it
@@ -1034,14 +1156,22 @@ class ChildError(InstallError):
     # context instead of Python context.
     build_errors = [('spack.util.executable', 'ProcessError')]
 
+    #: Maximum number of errors from the build log shown in the message
+    max_log_errors = 50
+
+    #: Number of lines at the end of the build output shown in the message
+    #: when the build log has no errors or warnings
+    max_tail_lines = 20
+
     def __init__(self, msg, module, classname, traceback_string, build_log,
-                 context):
+                 context, log_tail=None):
         super(ChildError, self).__init__(msg)
         self.module = module
         self.name = classname
         self.traceback = traceback_string
         self.build_log = build_log
         self.context = context
+        self.log_tail = log_tail
 
     @property
     def long_message(self):
@@ -1051,11 +1181,18 @@ def long_message(self):
         if (self.module, self.name) in ChildError.build_errors:
             # The error happened in some external executed process. Show
             # the build log with errors or warnings highlighted.
+            nerr = nwar = 0
             if self.build_log and os.path.exists(self.build_log):
-                errors, warnings = parse_log_events(self.build_log)
+                # Large logs are only read up to the errors shown
+                errors, warnings = parse_log_events(
+                    self.build_log, max_errors=self.max_log_errors)
                 nerr = len(errors)
                 nwar = len(warnings)
-                if nerr > 0:
+                if nerr >= self.max_log_errors:
+                    out.write("\nFirst %s found in build log:\n"
+                              % plural(nerr, 'error'))
+                    out.write(make_log_context(errors))
+                elif nerr > 0:
                     # If errors are found, only display errors
                     out.write(
                         "\n%s found in build log:\n" % plural(nerr, 'error'))
@@ -1066,6 +1203,12 @@ def long_message(self):
                         "\n%s found in build log:\n" % plural(nwar, 'warning'))
                     out.write(make_log_context(warnings))
 
+            if not (nerr or nwar) and self.log_tail:
+                # Nothing stands out in the log, show how the output ends
+                lines = self.log_tail.splitlines()[-self.max_tail_lines:]
+                out.write("\nEnd of build output:\n")
+                out.write(''.join('  %s\n' % line for line in lines))
+
         else:
             # The error happened in in the Python code, so try to show
             # some context from the Package itself.
@@ -1098,12 +1241,15 @@ def __reduce__(self):
             self.name,
             self.traceback,
             self.build_log,
-            self.context)
+            self.context,
+            self.log_tail)
 
 
-def _make_child_error(msg, module, name, traceback, build_log, context):
+def _make_child_error(msg, module, name, traceback, build_log, context,
+                      log_tail=None):
     """Used by __reduce__ in ChildError to reconstruct pickled errors."""
-    return ChildError(msg, module, name, traceback, build_log, context)
+    return ChildError(msg, module, name, traceback, build_log, context,
+                      log_tail)
 
 
 class StopPhase(spack.error.SpackError):
@@ -13,6 +13,7 @@
 import spack.paths
 import spack.config
 import spack.fetch_strategy
+import spack.util.content_cache
 import spack.util.file_cache
 import spack.util.path
 
@@ -46,7 +47,25 @@ def _fetch_cache():
         path = os.path.join(spack.paths.var_path, "cache")
     path = spack.util.path.canonicalize_path(path)
 
-    return spack.fetch_strategy.FsCache(path)
+    return spack.fetch_strategy.FsCache(path, archives=_archive_cache(path))
+
+
+def _archive_cache(source_cache):
+    """Content-addressed cache of source archives, shared by all packages.
+
+    It is located in the ``shared_source_cache`` directory if one is
+    configured, so that it can be shared by several users and build
+    hosts, and in the ``source_cache`` directory otherwise.
+    """
+    path = spack.config.get('config:shared_source_cache')
+    if path:
+        path = spack.util.path.canonicalize_path(path)
+    else:
+        path = os.path.join(source_cache, '_archives')
+
+    size_limit = spack.config.get('config:shared_source_cache_size', 0)
+    return spack.util.content_cache.ContentCache(
+        path, size_limit=size_limit * 2 ** 20)
 
 
 class MirrorCache(object):
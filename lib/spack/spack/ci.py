@@ -1043,9 +1043,9 @@ def copy_stage_logs_to_artifacts(job_spec, job_log_dir):
         tty.debug('job package: {0}'.format(job_pkg))
         stage_dir = job_pkg.stage.path
         tty.debug('stage dir: {0}'.format(stage_dir))
-        build_out_src = os.path.join(stage_dir, 'spack-build-out.txt')
+        build_out_src = job_pkg.log_path
         build_out_dst = os.path.join(
-            job_log_dir, 'spack-build-out.txt')
+            job_log_dir, os.path.basename(build_out_src))
         tty.debug('Copying build log ({0}) to artifacts ({1})'.format(
             build_out_src, build_out_dst))
         shutil.copyfile(build_out_src, build_out_dst)
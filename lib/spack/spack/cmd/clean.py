@@ -9,9 +9,11 @@
 
 import llnl.util.tty as tty
 
+import spack.architecture
 import spack.caches
 import spack.cmd
 import spack.cmd.common.arguments as arguments
+import spack.config
 import spack.repo
 import spack.stage
 from spack.paths import lib_path, var_path
@@ -80,6 +82,10 @@ def clean(parser, args):
     if args.misc_cache:
         tty.msg('Removing cached information on repositories')
         spack.caches.misc_cache.destroy()
+        if spack.config.config.cache is not None:
+            spack.config.config.cache.destroy()
+        spack.config.validation_record.destroy()
+        spack.architecture.clear_host_cache()
 
     if args.python_cache:
         tty.msg('Removing python cache files')
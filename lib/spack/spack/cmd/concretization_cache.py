@@ -0,0 +1,71 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+from __future__ import print_function
+
+import llnl.util.tty as tty
+
+import spack.concretize
+
+description = "list or remove stored concretizations"
+section = "build"
+level = "long"
+
+#: Format of the concrete specs listed
+concrete_format = '{name}{@version}{%compiler}{arch=architecture} {/hash:7}'
+
+
+def setup_parser(subparser):
+    sp = subparser.add_subparsers(
+        metavar='SUBCOMMAND', dest='concretization_cache_command')
+
+    sp.add_parser('list', help=concretization_cache_list.__doc__)
+
+    clear_parser = sp.add_parser(
+        'clear', help=concretization_cache_clear.__doc__)
+    clear_parser.add_argument(
+        '--stale', action='store_true',
+        help="only remove the concretizations that can no longer be used")
+
+
+def _is_stale(entry, fingerprint):
+    return entry['fingerprint'] != fingerprint
+
+
+def concretization_cache_list(args):
+    """list the stored concretizations"""
+    cache = spack.concretize.concretization_cache
+    fingerprint = cache.fingerprint()
+    entries = sorted(cache.entries(), key=lambda e: e['abstract'])
+
+    tty.msg('{0} stored concretizations in {1}'
+            .format(len(entries), cache.root))
+    for entry in entries:
+        line = '{0}  ->  {1}'.format(
+            entry['abstract'], entry['spec'].format(concrete_format))
+        if _is_stale(entry, fingerprint):
+            line += '  [stale]'
+        print(line)
+
+
+def concretization_cache_clear(args):
+    """remove stored concretizations"""
+    cache = spack.concretize.concretization_cache
+    if not args.stale:
+        cache.destroy()
+        tty.msg('Removed all stored concretizations')
+        return
+
+    fingerprint = cache.fingerprint()
+    stale = [e for e in cache.entries() if _is_stale(e, fingerprint)]
+    for entry in stale:
+        cache.remove(entry['path'])
+    tty.msg('Removed {0} stale concretizations'.format(len(stale)))
+
+
+def concretization_cache(parser, args):
+    action = {'list': concretization_cache_list,
+              'clear': concretization_cache_clear}
+    action[args.concretization_cache_command](args)
@@ -31,26 +31,18 @@ def setup_parser(subparser):
 
 
 def inverted_dependencies():
-    """Iterate through all packages and return a dictionary mapping package
-       names to possible dependencies.
+    """Return a dictionary mapping package names to the names of the
+       packages that can possibly depend on them.
 
        Virtual packages are included as sources, so that you can query
        dependents of, e.g., `mpi`, but virtuals are not included as
        actual dependents.
+
+       The dictionary is computed from the repository's dependency index,
+       so package classes are not loaded.
     """
-    dag = {}
-    for pkg in spack.repo.path.all_packages():
-        dag.setdefault(pkg.name, set())
-        for dep in pkg.dependencies:
-            deps = [dep]
-
-            # expand virtuals if necessary
-            if spack.repo.path.is_virtual(dep):
-                deps += [s.name for s in spack.repo.path.providers_for(dep)]
-
-            for d in deps:
-                dag.setdefault(d, set()).add(pkg.name)
-    return dag
+    dag = spack.repo.path.dependency_index.inverted()
+    return dict((name, set(dependents)) for name, dependents in dag.items())
 
 
 def get_dependents(pkg_name, ideps, transitive=False, dependents=None):
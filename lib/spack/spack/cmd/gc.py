@@ -8,6 +8,7 @@
 import spack.cmd.common.arguments
 import spack.cmd.uninstall
 import spack.environment
+import spack.package
 import spack.store
 
 description = "remove specs that are now no longer needed"
@@ -17,6 +18,9 @@
 
 def setup_parser(subparser):
     spack.cmd.common.arguments.add_common_arguments(subparser, ['yes_to_all'])
+    subparser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help="number of threads deleting prefixes (default: one per CPU)")
 
 
 def gc(parser, args):
@@ -44,4 +48,4 @@ def gc(parser, args):
     if not args.yes_to_all:
         spack.cmd.uninstall.confirm_removal(specs)
 
-    spack.cmd.uninstall.do_uninstall(None, specs, force=False)
+    spack.package.PackageBase.uninstall_by_specs(specs, jobs=args.jobs)
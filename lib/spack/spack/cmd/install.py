@@ -11,6 +11,7 @@
 
 import llnl.util.filesystem as fs
 import llnl.util.tty as tty
+from llnl.util.tty.log import open_log
 
 import spack.build_environment
 import spack.cmd
@@ -19,6 +20,7 @@
 import spack.fetch_strategy
 import spack.paths
 import spack.report
+import spack.util.tracing
 from spack.error import SpackError
 
 
@@ -120,6 +122,15 @@ def setup_parser(subparser):
     subparser.add_argument(
         '--fake', action='store_true',
         help="fake install for debug purposes.")
+    subparser.add_argument(
+        '--trace', default=None, metavar='TRACE_FILE',
+        help="write a trace of hooks, install phases, lock waits and "
+        "database transactions to TRACE_FILE")
+    subparser.add_argument(
+        '--trace-format', default='chrome',
+        choices=spack.util.tracing.formats,
+        help="format of the trace: chrome (JSON array, readable by "
+        "chrome://tracing) or jsonl (one JSON event per line)")
     subparser.add_argument(
         '--only-concrete', action='store_true', default=False,
         help='(with environment) only install already concretized specs')
@@ -249,7 +260,7 @@ def install_spec(cli_args, kwargs, abstract_spec, spec):
                 tty.error("'spack install' created no log.")
             else:
                 sys.stderr.write('Full build log:\n')
-                with open(e.pkg.build_log_path) as log:
+                with open_log(e.pkg.build_log_path) as log:
                     shutil.copyfileobj(log, sys.stderr)
         raise
 
@@ -267,6 +278,11 @@ def install(parser, args, **kwargs):
         parser.print_help()
         return
 
+    with spack.util.tracing.tracing_to(args.trace, args.trace_format):
+        _install(parser, args, **kwargs)
+
+
+def _install(parser, args, **kwargs):
     if not args.spec and not args.specfiles:
         # if there are no args but an active environment
         # then install the packages from it.
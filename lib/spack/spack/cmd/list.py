@@ -123,10 +123,14 @@ def rows_for_ncols(elts, ncols):
 
 
 def get_dependencies(pkg):
+    """Map each dependency type to the sorted names of the possible
+    dependencies of ``pkg`` with that type, using the dependency index of
+    the package's repository."""
+    index = spack.repo.path.get_repo(pkg.namespace).dependency_index
     all_deps = {}
     for deptype in spack.dependency.all_deptypes:
-        deps = pkg.dependencies_of_type(deptype)
-        all_deps[deptype] = [d for d in deps]
+        deps = index.dependencies_of(pkg.name, deptype)
+        all_deps[deptype] = sorted(deps)
 
     return all_deps
 
@@ -239,8 +243,9 @@ def head(n, span_id, title, anchor=None):
             out.write('\n')
             out.write('</dd>\n')
 
+        all_deps = get_dependencies(pkg)
         for deptype in spack.dependency.all_deptypes:
-            deps = pkg.dependencies_of_type(deptype)
+            deps = all_deps[deptype]
             if deps:
                 out.write('<dt>%s Dependencies:</dt>\n' % deptype.capitalize())
                 out.write('<dd>\n')
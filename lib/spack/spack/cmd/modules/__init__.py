@@ -38,6 +38,11 @@ def setup_parser(subparser):
         help='generate modules for packages installed upstream',
         action='store_true'
     )
+    refresh_parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='number of processes writing module files '
+             '(default: number of CPUs)'
+    )
     arguments.add_common_arguments(
         refresh_parser, ['constraint', 'yes_to_all']
     )
@@ -234,6 +239,11 @@ def rm(module_type, specs, args):
     for s in modules:
         s.remove()
 
+    module_type_root = modules[0].layout.dirname()
+    if os.path.isdir(module_type_root):
+        spack.modules.common.update_module_index(
+            module_type_root, remove=[s.spec.dag_hash() for s in modules])
+
 
 def refresh(module_type, specs, args):
     """Regenerates the module files for every spec in specs and every module
@@ -298,17 +308,33 @@ def refresh(module_type, specs, args):
         shutil.rmtree(module_type_root, ignore_errors=False)
     filesystem.mkdirp(module_type_root)
 
+    # Module files whose inputs did not change since they were written
+    # are not written again
+    index = spack.modules.common.read_module_index(module_type_root)
+    module_inputs = spack.modules.common.ModuleInputs()
+    inputs = dict((x.spec.dag_hash(), module_inputs.digest(x))
+                  for x in writers)
+
+    def up_to_date(writer):
+        entry = index.get(writer.spec.dag_hash())
+        return (entry is not None and
+                entry.inputs == inputs[writer.spec.dag_hash()] and
+                os.path.exists(writer.layout.filename))
+
+    outdated = [x for x in writers if not up_to_date(x)]
+    tty.debug('{0} {1} module files are up to date'.format(
+        len(writers) - len(outdated), module_type))
+
+    errors = spack.modules.common.write_modules(outdated, args.jobs)
+    for x, message in errors:
+        msg = 'Could not write module file [{0}]'
+        tty.warn(msg.format(x.layout.filename))
+        tty.warn('\t--> {0} <--'.format(message))
+        del inputs[x.spec.dag_hash()]
+
     # Dump module index after potentially removing module tree
     spack.modules.common.generate_module_index(
-        module_type_root, writers, overwrite=args.delete_tree)
-    for x in writers:
-        try:
-            x.write(overwrite=True)
-        except Exception as e:
-            tty.debug(e)
-            msg = 'Could not write module file [{0}]'
-            tty.warn(msg.format(x.layout.filename))
-            tty.warn('\t--> {0} <--'.format(str(e)))
+        module_type_root, writers, overwrite=args.delete_tree, inputs=inputs)
 
 
 #: Dictionary populated with the list of sub-commands.
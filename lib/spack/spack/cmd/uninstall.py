@@ -10,10 +10,8 @@
 
 import spack.cmd
 import spack.environment as ev
-import spack.error
 import spack.package
 import spack.cmd.common.arguments as arguments
-import spack.repo
 import spack.store
 from spack.database import InstallStatuses
 
@@ -62,6 +60,9 @@ def setup_parser(subparser):
         '-a', '--all', action='store_true', dest='all',
         help="remove ALL installed packages that match each supplied spec"
     )
+    subparser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help="number of threads deleting prefixes (default: one per CPU)")
 
 
 def find_matching_specs(env, specs, allow_multiple_matches=False, force=False):
@@ -131,19 +132,20 @@ def installed_dependents(specs, env):
 
     env_hashes = set(env.all_hashes()) if env else set()
 
-    all_specs_in_db = spack.store.db.query()
+    # Dependents of all the specs are found at once, walking the dependency
+    # graph of the database backwards
+    dependents = spack.store.db.installed_dependents(specs)
 
     for spec in specs:
-        installed = [x for x in all_specs_in_db if spec in x]
+        installed = dependents.get(spec.dag_hash(), [])
 
         # separate installed dependents into dpts in this environment and
         # dpts that are outside this environment
         for dpt in installed:
-            if dpt not in specs:
-                if not env or dpt.dag_hash() in env_hashes:
-                    active_dpts.setdefault(spec, set()).add(dpt)
-                else:
-                    inactive_dpts.setdefault(spec, set()).add(dpt)
+            if not env or dpt.dag_hash() in env_hashes:
+                active_dpts.setdefault(spec, set()).add(dpt)
+            else:
+                inactive_dpts.setdefault(spec, set()).add(dpt)
 
     return active_dpts, inactive_dpts
 
@@ -197,41 +199,22 @@ def _remove_from_env(spec, env):
         pass  # ignore non-root specs
 
 
-def do_uninstall(env, specs, force):
+def do_uninstall(env, specs, force, jobs=None):
     """Uninstalls all the specs in a list.
 
+    The specs are removed from the database in a single transaction, and
+    their prefixes are deleted in parallel. Pre-uninstall hooks still run
+    on dependents before their dependencies.
+
     Args:
         env (Environment): active environment, or ``None`` if there is not one
         specs (list): list of specs to be uninstalled
         force (bool): force uninstallation (boolean)
+        jobs (int): number of threads deleting prefixes (default: one
+            per CPU)
     """
-    packages = []
-    for item in specs:
-        try:
-            # should work if package is known to spack
-            packages.append(item.package)
-        except spack.repo.UnknownEntityError:
-            # The package.py file has gone away -- but still
-            # want to uninstall.
-            spack.package.Package.uninstall_by_spec(item, force=True)
-
-    # A package is ready to be uninstalled when nothing else references it,
-    # unless we are requested to force uninstall it.
-    is_ready = lambda x: not spack.store.db.query_by_spec_hash(x)[1].ref_count
-    if force:
-        is_ready = lambda x: True
-
-    while packages:
-        ready = [x for x in packages if is_ready(x.spec.dag_hash())]
-        if not ready:
-            msg = 'unexpected error [cannot proceed uninstalling specs with' \
-                  ' remaining dependents {0}]'
-            msg = msg.format(', '.join(x.name for x in packages))
-            raise spack.error.SpackError(msg)
-
-        packages = [x for x in packages if x not in ready]
-        for item in ready:
-            item.do_uninstall(force=force)
+    spack.package.Package.uninstall_by_specs(
+        list(specs), force=force, jobs=jobs)
 
 
 def get_uninstall_list(args, specs, env):
@@ -329,7 +312,7 @@ def uninstall_specs(args, specs):
             env.write()
 
     # Uninstall everything on the list
-    do_uninstall(env, uninstall_list, args.force)
+    do_uninstall(env, uninstall_list, args.force, args.jobs)
 
 
 def confirm_removal(specs):
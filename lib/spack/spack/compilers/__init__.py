@@ -15,7 +15,6 @@
 import llnl.util.lang
 import llnl.util.filesystem as fs
 import llnl.util.tty as tty
-import llnl.util.cpu as cpu
 
 import spack.paths
 import spack.error
@@ -664,7 +663,7 @@ def _default_make_compilers(cmp_id, paths):
         compiler_cls = spack.compilers.class_for_compiler_name(compiler_name)
         spec = spack.spec.CompilerSpec(compiler_cls.name, version)
         paths = [paths.get(x, None) for x in ('cc', 'cxx', 'f77', 'fc')]
-        target = cpu.host()
+        target = spack.architecture.host()
         compiler = compiler_cls(
             spec, operating_system, str(target.family), paths
         )
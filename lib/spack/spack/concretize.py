@@ -16,9 +16,13 @@
 """
 from __future__ import print_function
 
+import hashlib
+import json
 import platform
 import os.path
+import shutil
 import tempfile
+import time
 import llnl.util.filesystem as fs
 import llnl.util.tty as tty
 
@@ -29,15 +33,20 @@
 import llnl.util.lang
 import llnl.util.cpu as cpu
 
+import spack
 import spack.repo
 import spack.abi
 import spack.spec
 import spack.compilers
 import spack.architecture
+import spack.config
 import spack.error
+import spack.hash_types as ht
 import spack.tengine
+import spack.util.source_digest
+import spack.util.spack_json as sjson
 from spack.config import config
-from spack.version import ver, Version, VersionList, VersionRange
+from spack.version import ver, VersionList, VersionRange
 from spack.package_prefs import PackagePrefs, spec_externals, is_spec_buildable
 
 
@@ -174,7 +183,7 @@ def concretize_version(self, spec):
             -yaml_prefs(v),
 
             # The preferred=True flag (packages or packages.yaml or both?)
-            pkg_versions.get(Version(v)).get('preferred', False),
+            pkg_versions.get(v).get('preferred', False),
 
             # ------- Regular case: use latest non-develop version by default.
             # Avoid @develop version, which would otherwise be the "largest"
@@ -186,7 +195,7 @@ def concretize_version(self, spec):
             #    a) develop > everything (disabled by "not v.isdevelop() above)
             #    b) numeric > non-numeric
             #    c) Numeric or string comparison
-            v)
+            v.sort_key)
         usable.sort(key=keyfn, reverse=True)
 
         if usable:
@@ -641,6 +650,170 @@ def _compiler_concretization_failure(compiler_spec, arch):
         raise UnavailableCompilerVersionError(compiler_spec, arch)
 
 
+class ConcretizationCache(object):
+    """Persistent cache of the results of concretization.
+
+    Each entry stores the concrete spec an abstract spec concretized to.
+    Entries are keyed by the abstract spec and by a fingerprint of
+    everything else concretization depends on: the ``package.py`` files
+    of the package repositories, the ``packages`` and compiler
+    configuration, the host architecture, and the version and source of
+    Spack. When any of them changes, old entries are just not found
+    anymore; they stay in the cache until it is cleared.
+
+    Args:
+        root (str): directory of the cache
+    """
+
+    def __init__(self, root):
+        self.root = root
+        #: Digests of the package stats of repositories, by packages path
+        self._repo_digests = {}
+
+    def _repo_digest(self, repo):
+        checker = repo._pkg_checker
+        stats = checker._packages_to_stats
+        cached = self._repo_digests.get(repo.packages_path)
+        if cached is None or cached[0] is not stats:
+            state = sorted((name, st.st_mtime, st.st_size)
+                           for name, st in stats.items())
+            digest = hashlib.sha1(repr(state).encode('utf-8')).hexdigest()
+            cached = self._repo_digests[repo.packages_path] = (stats, digest)
+        return cached[1]
+
+    def fingerprint(self):
+        """Digest of the state of Spack that concretization depends on, or
+        None if it cannot be determined, e.g. for package repositories that
+        are not on disk."""
+        repos = getattr(spack.repo.path, 'repos', None)
+        if not repos or not all(isinstance(r, spack.repo.Repo)
+                                for r in repos):
+            return None
+
+        check_compilers = Concretizer.check_for_compiler_existence
+        if check_compilers is None:
+            check_compilers = not spack.config.get(
+                'config:install_missing_compilers', False)
+
+        state = [
+            str(spack.spack_version),
+            spack.util.source_digest.source_digest(),
+            [(r.namespace, r.root, self._repo_digest(r)) for r in repos],
+            spack.config.get('packages'),
+            spack.compilers.all_compilers_config(),
+            str(spack.architecture.default_arch()),
+            check_compilers,
+        ]
+        data = json.dumps(state, sort_keys=True, default=str)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def key(self, spec, tests=False):
+        """Key of the entry for the abstract ``spec``, concretized with
+        the ``tests`` argument of ``Spec.concretize()``, or None if it
+        cannot be cached.
+
+        The key is a ``(digest, fingerprint)`` tuple.
+        """
+        fingerprint = self.fingerprint()
+        if fingerprint is None:
+            return None
+        if not isinstance(tests, bool):
+            tests = sorted(tests)
+        data = json.dumps([fingerprint, spec.to_dict(), tests],
+                          sort_keys=True, default=str)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest(), fingerprint
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key + '.json')
+
+    def get(self, key):
+        """Concrete spec stored under ``key``, or None."""
+        digest, _ = key
+        try:
+            with open(self._entry_path(digest)) as f:
+                data = sjson.load(f)
+            spec = spack.spec.Spec.from_dict(data['spec'])
+        except (IOError, OSError):
+            return None
+        except Exception as e:
+            tty.debug('Ignoring invalid concretization cache entry {0}: {1}'
+                      .format(digest, str(e)))
+            return None
+
+        spec._mark_concrete()
+        tty.debug('Using cached concretization of {0}'
+                  .format(data['abstract']))
+        return spec
+
+    def store(self, key, abstract, spec):
+        """Store the concrete ``spec`` that the ``abstract`` spec string
+        concretized to under ``key``.
+
+        The cache is best effort: errors writing the entry are ignored.
+        """
+        digest, fingerprint = key
+        data = {
+            'abstract': abstract,
+            'fingerprint': fingerprint,
+            'time': time.time(),
+            'spec': spec.to_dict(hash=ht.build_hash),
+        }
+        path = self._entry_path(digest)
+        tmp = '{0}.tmp-{1}'.format(path, os.getpid())
+        try:
+            fs.mkdirp(self.root)
+            with open(tmp, 'w') as f:
+                sjson.dump(data, f)
+            os.rename(tmp, path)
+        except (IOError, OSError) as e:
+            tty.debug('Cannot write to the concretization cache: {0}'
+                      .format(str(e)))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def entries(self):
+        """Yield a dictionary with the ``path``, the ``abstract`` spec
+        string, the concrete ``spec``, the ``time`` and the
+        ``fingerprint`` of each entry in the cache."""
+        if not os.path.isdir(self.root):
+            return
+        for name in sorted(os.listdir(self.root)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                with open(path) as f:
+                    data = sjson.load(f)
+                data['spec'] = spack.spec.Spec.from_dict(data['spec'])
+            except Exception as e:
+                tty.debug('Skipping invalid concretization cache entry '
+                          '{0}: {1}'.format(path, str(e)))
+                continue
+            data['path'] = path
+            yield data
+
+    def remove(self, path):
+        """Remove the entry at ``path``."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def destroy(self):
+        """Remove all the entries of the cache."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _concretization_cache():
+    import spack.caches
+    root = os.path.join(spack.caches.misc_cache.root, 'concretization')
+    return ConcretizationCache(root)
+
+
+#: Cache of concretized specs, in the misc cache
+concretization_cache = llnl.util.lang.Singleton(_concretization_cache)
+
+
 def concretize_specs_together(*abstract_specs):
     """Given a number of specs as input, tries to concretize them together.
 
@@ -684,7 +857,10 @@ def make_concretization_repository(abstract_specs):
     with spack.repo.additional_repository(concretization_repository):
         # Spec from a helper package that depends on all the abstract_specs
         concretization_root = spack.spec.Spec('concretizationroot')
-        concretization_root.concretize()
+        # The helper repository is different every time, so there is no
+        # point in caching the concretization of its root
+        with spack.config.override('config:concretization_cache', False):
+            concretization_root.concretize()
         # Retrieve the direct dependencies
         concrete_specs = [
             concretization_root[spec.name].copy() for spec in abstract_specs
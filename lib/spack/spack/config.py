@@ -32,12 +32,16 @@
 
 import collections
 import copy
+import hashlib
 import os
 import re
+import shutil
 import sys
 import multiprocessing
 from contextlib import contextmanager
+import six
 from six import iteritems
+from six.moves import cPickle
 from ordereddict_backport import OrderedDict
 
 import ruamel.yaml as yaml
@@ -47,6 +51,7 @@
 import llnl.util.tty as tty
 from llnl.util.filesystem import mkdirp
 
+import spack
 import spack.paths
 import spack.architecture
 import spack.schema
@@ -58,6 +63,7 @@
 import spack.schema.config
 import spack.schema.upstreams
 import spack.schema.env
+import spack.util.source_digest
 from spack.error import SpackError
 
 # Hacked yaml for configuration files preserves line numbers.
@@ -120,6 +126,24 @@
 #: Base name for the (internal) overrides scope.
 overrides_base_name = 'overrides-'
 
+#: Marks a section that a scope has not loaded
+_not_loaded = object()
+
+
+def _file_stat(path):
+    """Modification time and size of a file, or None if it is missing."""
+    try:
+        st = os.stat(path)
+        return st.st_mtime, st.st_size
+    except OSError:
+        return None
+
+
+def _same_objects(a, b):
+    """Whether two lists of tuples hold the very same objects."""
+    return len(a) == len(b) and all(
+        x is y for ta, tb in zip(a, b) for x, y in zip(ta, tb))
+
 
 def first_existing(dictionary, keys):
     """Get the value of the first key in keys that is in the dictionary."""
@@ -173,6 +197,19 @@ def clear(self):
         """Empty cached config information."""
         self.sections = syaml.syaml_dict()
 
+    def cache_key(self, section):
+        """Key of ``section`` in this scope for the ``MergedConfigCache``,
+        or None if it cannot be cached.
+
+        The key identifies the file the section is read from by its path,
+        modification time and size. A section that was already read may
+        have been changed in memory, and has no key.
+        """
+        if section in self.sections:
+            return None
+        path = self.get_section_filename(section)
+        return (type(self).__name__, self.name, path, _file_stat(path))
+
     def __repr__(self):
         return '<ConfigScope: %s: %s>' % (self.name, self.path)
 
@@ -260,6 +297,12 @@ def write_section(self, section):
             raise ConfigFileError(
                 "Error writing to config file: '%s'" % str(e))
 
+    def cache_key(self, section):
+        if self._raw_data is not None:
+            return None
+        return (type(self).__name__, self.name, self.path,
+                _file_stat(self.path), repr(self.yaml_path))
+
     def __repr__(self):
         return '<SingleFileScope: %s: %s>' % (self.name, self.path)
 
@@ -313,6 +356,12 @@ def write_section(self, section):
             validate(data, section_schemas[section])
         self.sections[section] = _mark_internal(data, self.name)
 
+    def cache_key(self, section):
+        """The key of internal data is a digest of the data itself."""
+        data = cPickle.dumps(self.get_section(section), protocol=2)
+        return (type(self).__name__, self.name,
+                hashlib.sha1(data).hexdigest())
+
     def __repr__(self):
         return '<InternalConfigScope: %s>' % self.name
 
@@ -336,6 +385,174 @@ def _process_dict_keyname_overrides(data):
         return result
 
 
+class MergedConfigCache(object):
+    """Persistent cache of merged configuration sections.
+
+    Merging a section reads, parses and validates a YAML file in every
+    scope, and every Spack command pays for it again. This cache stores
+    each merged section in a file under ``root``, along with a key made of
+    the source of Spack, the scope stack and the path, modification time
+    and size of every file that contributes to the section. As long as the
+    key matches, the section is loaded from the cache without reading any
+    YAML.
+
+    Args:
+        root (str): directory of the cache. It is created if needed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def key(self, section, scopes):
+        """Key of the merged ``section`` of ``scopes``, or None if it cannot
+        be cached."""
+        keys = []
+        for scope in scopes:
+            try:
+                key = scope.cache_key(section)
+            except Exception as e:
+                tty.debug('Cannot cache configuration of {0}: {1}'
+                          .format(scope, str(e)))
+                return None
+            if key is None:
+                return None
+            keys.append(key)
+        return repr((spack.spack_version,
+                     spack.util.source_digest.source_digest(),
+                     sys.version_info[0], keys))
+
+    def _entry_path(self, section, scopes):
+        # There is one entry per section and scope stack, so that switching
+        # e.g. between environments does not discard entries
+        stack = repr([(type(s).__name__, s.name, s.path) for s in scopes])
+        digest = hashlib.sha1(stack.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, '{0}-{1}.pickle'.format(
+            section, digest))
+
+    def load(self, section, scopes, key):
+        """Return the merged section and the names of the scopes whose data
+        was updated from an old format, or None if the cache has no entry
+        for ``key``."""
+        path = self._entry_path(section, scopes)
+        try:
+            with open(path, 'rb') as f:
+                entry = cPickle.load(f)
+        except Exception:
+            # Missing, or written by an incompatible version of Spack
+            return None
+
+        if entry.get('key') != key:
+            return None
+        tty.debug('Using cached configuration section {0}'.format(section))
+        return entry['data'], entry['updated']
+
+    def store(self, section, scopes, key, data, updated):
+        """Store the merged section with ``key``, replacing the previous
+        entry for the same scopes."""
+        path = self._entry_path(section, scopes)
+        tmp = '{0}.tmp-{1}'.format(path, os.getpid())
+        entry = {'key': key, 'data': data, 'updated': updated}
+        try:
+            mkdirp(self.root)
+            with open(tmp, 'wb') as f:
+                cPickle.dump(entry, f, protocol=2)
+            os.rename(tmp, path)
+        except Exception as e:
+            tty.debug('Cannot cache configuration section {0}: {1}'
+                      .format(section, str(e)))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def destroy(self):
+        """Remove all the entries of the cache."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class ValidationRecord(object):
+    """Persistent record of the configuration data that passed validation.
+
+    Validating a large file, e.g. a ``packages.yaml`` with many externals,
+    can take longer than parsing it. The record keeps one entry per file
+    under ``root``, holding the validated data, with the defaults of the
+    schema filled in, and a digest of the content the data was parsed from
+    and of the schema. As long as the file does not change, it is not
+    validated again. Data that was not read from a file is not recorded.
+
+    Args:
+        root (str): directory of the record. It is created if needed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _entry_path(self, filename):
+        digest = hashlib.sha1(os.path.abspath(filename).encode('utf-8'))
+        return os.path.join(self.root, digest.hexdigest() + '.pickle')
+
+    @staticmethod
+    def _key(content, schema):
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        digest = hashlib.sha1(content)
+        for part in (spack.schema.digest(schema), spack.spack_version,
+                     str(sys.version_info[0])):
+            digest.update(part.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load(self, filename):
+        try:
+            with open(self._entry_path(filename), 'rb') as f:
+                return cPickle.load(f)
+        except Exception:
+            # Missing, or written by an incompatible version of Spack
+            return {}
+
+    def __contains__(self, key):
+        """Whether the data parsed from ``content`` was already validated
+        against ``schema``, where ``key`` is ``(content, schema, filename)``.
+        """
+        return self.get(*key) is not None
+
+    def get(self, content, schema, filename=None):
+        """Validated data parsed from ``content``, or None if it was not
+        validated against ``schema`` yet."""
+        if not filename:
+            return None
+        entry = self._load(filename)
+        if entry.get('key') != self._key(content, schema):
+            return None
+        return entry.get('data')
+
+    def add(self, content, schema, filename, data):
+        """Record that the data parsed from ``content`` is valid, with
+        ``data`` as the result of the validation. This replaces the previous
+        entry for ``filename``."""
+        if not filename:
+            return
+        path = self._entry_path(filename)
+        tmp = '{0}.tmp-{1}'.format(path, os.getpid())
+        entry = {'key': self._key(content, schema), 'data': data}
+        try:
+            mkdirp(self.root)
+            with open(tmp, 'wb') as f:
+                cPickle.dump(entry, f, protocol=2)
+            os.rename(tmp, path)
+        except Exception as e:
+            tty.debug('Cannot record validation of {0}: {1}'
+                      .format(filename, str(e)))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def destroy(self):
+        """Remove all the entries of the record."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+#: Record of the configuration files that were already validated
+validation_record = ValidationRecord(
+    os.path.join(spack.paths.user_config_cache_path, 'validated'))
+
+
 class Configuration(object):
     """A full Spack configuration, from a hierarchy of config files.
 
@@ -355,6 +572,12 @@ def __init__(self, *scopes):
             self.push_scope(scope)
         self.format_updates = collections.defaultdict(list)
 
+        #: Persistent cache of merged sections (a MergedConfigCache), if any
+        self.cache = None
+
+        #: Merged sections, by name, with the scopes they were merged from
+        self._merged = {}
+
     def push_scope(self, scope):
         """Add a higher precedence scope to the Configuration."""
         cmd_line_scope = None
@@ -439,6 +662,7 @@ def clear_caches(self):
         """Clears the caches for configuration files,
 
         This will cause files to be re-read upon the next request."""
+        self._merged = {}
         for scope in self.scopes.values():
             scope.clear()
 
@@ -515,13 +739,73 @@ def get_config(self, section, scope=None):
            }
 
         """
+        return copy.deepcopy(self._get_config(section, scope))
+
+    def _get_config(self, section, scope=None):
+        """Like ``get_config()``, but the result may be shared with the
+        merged sections kept by the configuration, so it must not be
+        modified."""
         _validate_section_name(section)
 
         if scope is None:
-            scopes = self.scopes.values()
+            merged_section = self._merged_section(section)
         else:
             scopes = [self._validate_scope(scope)]
+            merged_section, _ = self._merge_scopes(section, scopes)
+
+        # no config files -- empty config.
+        if section not in merged_section:
+            return syaml.syaml_dict()
+
+        # take the top key off before returning.
+        return merged_section[section]
+
+    def _loaded_sections(self, section):
+        """Data of ``section`` currently loaded in each scope."""
+        return [(s, s.sections.get(section, _not_loaded))
+                for s in self.scopes.values()]
+
+    def _merged_section(self, section):
+        """Contents of ``section`` merged from all the scopes.
+
+        The result is kept until the scope stack changes or any scope loads
+        or updates the section. It is also stored in the persistent cache,
+        if the configuration has one.
+        """
+        loaded, merged_section = self._merged.get(section, (None, None))
+        if loaded is not None and _same_objects(
+                loaded, self._loaded_sections(section)):
+            return merged_section
+
+        scopes = list(self.scopes.values())
+        key = cached = None
+        if self.cache is not None:
+            key = self.cache.key(section, scopes)
+        if key is not None:
+            cached = self.cache.load(section, scopes, key)
+
+        if cached is not None:
+            merged_section, updated = cached
+            for name in updated:
+                self.format_updates[section].append(self.scopes[name])
+        else:
+            merged_section, updated = self._merge_scopes(section, scopes)
+            if key is not None:
+                self.cache.store(section, scopes, key, merged_section,
+                                 [s.name for s in updated])
 
+        self._merged[section] = (self._loaded_sections(section),
+                                 merged_section)
+        return merged_section
+
+    def _merge_scopes(self, section, scopes):
+        """Merge ``section`` from ``scopes``, in order of precedence.
+
+        Returns:
+            (tuple): the merged data, and the list of scopes whose data was
+                updated from an old format
+        """
+        updated = []
         merged_section = syaml.syaml_dict()
         for scope in scopes:
             # read potentially cached data from the scope.
@@ -540,21 +824,14 @@ def get_config(self, section, scope=None):
             changed = _update_in_memory(data, section)
             if changed:
                 self.format_updates[section].append(scope)
+                updated.append(scope)
                 msg = ('OUTDATED CONFIGURATION FILE '
                        '[section={0}, scope={1}, dir={2}]')
                 tty.debug(msg.format(section, scope.name, scope.path))
 
             merged_section = merge_yaml(merged_section, data)
 
-        # no config files -- empty config.
-        if section not in merged_section:
-            return syaml.syaml_dict()
-
-        # take the top key off before returning.
-        ret = merged_section[section]
-        if isinstance(ret, dict):
-            ret = syaml.syaml_dict(ret)
-        return ret
+        return merged_section, updated
 
     def get(self, path, default=None, scope=None):
         """Get a config section or a single value from one.
@@ -574,12 +851,15 @@ def get(self, path, default=None, scope=None):
         parts = process_config_path(path)
         section = parts.pop(0)
 
-        value = self.get_config(section, scope=scope)
+        value = self._get_config(section, scope=scope)
 
         while parts:
             key = parts.pop(0)
             value = value.get(key, default)
 
+        # Only the value returned is copied, not the whole section
+        if value is not default and isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
         return value
 
     def set(self, path, value, scope=None):
@@ -740,6 +1020,7 @@ def _config():
     # override configuration options.
     cfg.push_scope(InternalConfigScope('command_line'))
 
+    cfg.cache = MergedConfigCache(spack.paths.user_config_cache_path)
     return cfg
 
 
@@ -773,16 +1054,28 @@ def _validate_section_name(section):
             % (section, " ".join(section_schemas.keys())))
 
 
-def validate(data, schema, filename=None):
+def validate(data, schema, filename=None, content=None):
     """Validate data read in from a Spack YAML file.
 
     Arguments:
         data (dict or list): data read from a Spack YAML file
         schema (dict or list): jsonschema to validate data
+        filename (str): file the data was read from, if any
+        content (str): text the data was parsed from, if known. Data
+            parsed from the same text as data that was already validated
+            is not validated again (see ``ValidationRecord``).
 
     This leverages the line information (start_mark, end_mark) stored
     on Spack YAML structures.
     """
+    validated = None
+    if content is not None:
+        validated = validation_record.get(content, schema, filename)
+        if validated is not None and not isinstance(
+                data, yaml.comments.CommentedMap):
+            return validated
+        warnings = spack.schema.deprecation_warnings
+
     import jsonschema
     # validate a copy to avoid adding defaults
     # This allows us to round-trip data without adding to it.
@@ -797,19 +1090,43 @@ def validate(data, schema, filename=None):
                         yaml.comments.Comment.attrib,
                         yaml.comments.Comment()))
 
+    if validated is not None:
+        # Recorded data does not keep the comments of round-trip data
+        _add_missing_keys(test_data, validated)
+        return test_data
+
     try:
-        spack.schema.Validator(schema).validate(test_data)
+        spack.schema.validator_for(schema).validate(test_data)
     except jsonschema.ValidationError as e:
         if hasattr(e.instance, 'lc'):
             line_number = e.instance.lc.line + 1
         else:
             line_number = None
         raise ConfigFormatError(e, data, filename, line_number)
+
+    # Data with deprecated properties is validated again, to warn again
+    if content is not None and warnings == spack.schema.deprecation_warnings:
+        validation_record.add(content, schema, filename, test_data)
+
     # return the validated data so that we can access the raw data
     # mostly relevant for environments
     return test_data
 
 
+def _add_missing_keys(data, validated):
+    """Add the keys of ``validated`` that ``data`` lacks, i.e. the defaults
+    set by validation, to ``data``."""
+    if isinstance(data, dict) and isinstance(validated, dict):
+        for key, value in validated.items():
+            if key in data:
+                _add_missing_keys(data[key], value)
+            else:
+                data[key] = value
+    elif isinstance(data, list) and isinstance(validated, list):
+        for item, value in zip(data, validated):
+            _add_missing_keys(item, value)
+
+
 def read_config_file(filename, schema=None):
     """Read a YAML configuration file.
 
@@ -834,13 +1151,21 @@ def read_config_file(filename, schema=None):
     try:
         tty.debug("Reading config file %s" % filename)
         with open(filename) as f:
-            data = syaml.load_config(f)
+            content = f.read()
+
+        # Parse from a named stream, so that the data is marked with the
+        # name of the file
+        stream = six.StringIO(content)
+        stream.name = filename
+        data = syaml.load_config(stream)
 
         if data:
             if not schema:
                 key = next(iter(data))
                 schema = all_schemas[key]
-            validate(data, schema)
+            # The validated data is not needed, only the check
+            if (content, schema, filename) not in validation_record:
+                validate(data, schema, filename, content)
         return data
 
     except StopIteration:
@@ -22,7 +22,9 @@
 
 import contextlib
 import datetime
+import hashlib
 import os
+import shutil
 import six
 import socket
 import sys
@@ -34,6 +36,8 @@
     _use_uuid = False
     pass
 
+from six.moves import cPickle
+
 import llnl.util.filesystem as fs
 import llnl.util.tty as tty
 
@@ -41,7 +45,9 @@
 import spack.spec
 import spack.store
 import spack.util.lock as lk
+import spack.util.source_digest
 import spack.util.spack_json as sjson
+import spack.util.tracing as tracing
 from spack.directory_layout import DirectoryLayoutError
 from spack.error import SpackError
 from spack.filesystem_view import YamlFilesystemView
@@ -394,12 +400,16 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
 
     def write_transaction(self):
         """Get a write lock context manager for use in a `with` block."""
-        return self._write_transaction_impl(
-            self.lock, acquire=self._read, release=self._write)
+        return tracing.traced_context(
+            self._write_transaction_impl(
+                self.lock, acquire=self._read, release=self._write),
+            'write transaction', 'db', root=self.root)
 
     def read_transaction(self):
         """Get a read lock context manager for use in a `with` block."""
-        return self._read_transaction_impl(self.lock, acquire=self._read)
+        return tracing.traced_context(
+            self._read_transaction_impl(self.lock, acquire=self._read),
+            'read transaction', 'db', root=self.root)
 
     def _failed_spec_path(self, spec):
         """Return the path to the spec's failure file, which may not exist."""
@@ -526,6 +536,44 @@ def prefix_failed(self, spec):
         # spack build process running concurrently.
         return self.prefix_failure_marked(spec)
 
+    def prefixes_failed(self, specs):
+        """Return the specs, among ``specs``, whose prefix is marked as
+        failed.
+
+        This checks the same as ``prefix_failed()`` for each spec, but lists
+        the persistent failure markings once, and checks the failure locks
+        of all the specs through a single open file.
+        """
+        specs = list(specs)
+        try:
+            markings = set(os.listdir(self._failure_dir))
+        except OSError:
+            markings = set()
+
+        failed = set()
+        unmarked = {}
+        for spec in specs:
+            marking = os.path.basename(self._failed_spec_path(spec))
+            if spec.prefix in self._prefix_failures or marking in markings:
+                failed.add(spec.dag_hash())
+            else:
+                start = spec.dag_hash_bit_prefix(bit_length(sys.maxsize))
+                unmarked.setdefault(start, []).append(spec)
+
+        for start in lk.write_locked(self.prefix_fail_path, sorted(unmarked)):
+            failed.update(s.dag_hash() for s in unmarked[start])
+
+        return [s for s in specs if s.dag_hash() in failed]
+
+    def clear_failures(self, specs, force=False):
+        """Remove any persistent and cached failure tracking for the specs.
+
+        This is ``clear_failure()`` for each spec, but the specs without
+        failure tracking are found at once with ``prefixes_failed()``.
+        """
+        for spec in self.prefixes_failed(specs):
+            self.clear_failure(spec, force=force)
+
     def prefix_failure_locked(self, spec):
         """Return True if a process has a failure lock on the spec."""
         check = lk.Lock(
@@ -1292,6 +1340,74 @@ def installed_relatives(self, spec, direction='children', transitive=True,
                 relatives.add(relative)
         return relatives
 
+    def reverse_references(self):
+        """Return a mapping from the DAG hash of each spec in the local
+        database to the hashes of the local specs that depend on it directly.
+
+        This is built in one pass over the records, and answers for the
+        dependents of many specs at once without querying the database for
+        each of them.
+        """
+        references = {}
+        with self.read_transaction():
+            for key, rec in self._data.items():
+                for dep in rec.spec.dependencies():
+                    references.setdefault(dep.dag_hash(), set()).add(key)
+        return references
+
+    def installed_dependents(self, specs):
+        """Return a mapping from the DAG hash of each of ``specs`` that has
+        installed dependents outside of ``specs``, even transitively, to
+        these dependents.
+
+        This answers for all of ``specs`` what ``installed_relatives()``
+        answers for one spec with ``direction='parents'``.
+        """
+        hashes = set(s.dag_hash() for s in specs)
+        references = self.reverse_references()
+
+        def installed_outside(key):
+            rec = self._data.get(key)
+            return key not in hashes and rec is not None and rec.installed
+
+        def dependents_outside(key):
+            outside, visited, stack = [], set([key]), [key]
+            while stack:
+                for dependent in references.get(stack.pop(), ()):
+                    if dependent not in visited:
+                        visited.add(dependent)
+                        stack.append(dependent)
+                        if installed_outside(dependent):
+                            outside.append(self._data[dependent].spec)
+            return outside
+
+        dependents = {}
+        with self.read_transaction():
+            # First find which specs have dependents outside of ``specs``,
+            # visiting each spec once, after its dependents.
+            has_outside = {}
+            for start in hashes:
+                stack = [start]
+                while stack:
+                    key = stack[-1]
+                    if key in has_outside:
+                        stack.pop()
+                        continue
+                    parents = references.get(key, ())
+                    pending = [p for p in parents if p not in has_outside]
+                    if pending:
+                        stack.extend(pending)
+                        continue
+                    stack.pop()
+                    has_outside[key] = any(
+                        has_outside[p] or installed_outside(p)
+                        for p in parents)
+
+            for key in hashes:
+                if has_outside[key]:
+                    dependents[key] = dependents_outside(key)
+        return dependents
+
     @_autospec
     def installed_extensions_for(self, extendee_spec):
         """
@@ -1530,6 +1646,115 @@ def unused_specs(self):
         return unused
 
 
+class UpstreamDatabaseCache(object):
+    """Persistent cache of the records of a chain of upstream databases.
+
+    Reading the index file of a database builds a spec for each of its
+    records, which is slow for large upstream databases. The records of a
+    chain of upstream databases are stored under ``root`` together, so
+    that the specs they share stay shared, along with the modification
+    time and size of the index file each database was read from. A
+    database whose index file still has the same modification time and
+    size is loaded from the cache instead of being read again.
+
+    Records hold pickled specs, so the cache is only used by the Spack it
+    was written by: the key of each entry includes a digest of Spack's
+    source, and is checked before the records are loaded.
+
+    Args:
+        root (str): directory of the cache. It is created if needed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _entry_path(self, upstream_dbs):
+        roots = repr([db.root for db in upstream_dbs])
+        digest = hashlib.sha1(roots.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, '{0}.pickle'.format(digest))
+
+    @staticmethod
+    def _key():
+        return (spack.spack_version, sys.version_info[0], str(_db_version),
+                spack.util.source_digest.source_digest())
+
+    @staticmethod
+    def _index_stat(db):
+        """Modification time and size of the index file of ``db``, or None
+        if it has none."""
+        try:
+            stat = os.stat(db._index_path)
+        except OSError:
+            return None
+        return (stat.st_mtime, stat.st_size)
+
+    def load(self, upstream_dbs):
+        """Return a list with the cached ``(stat, data)`` of each of
+        ``upstream_dbs``, where ``stat`` is the modification time and size
+        of the index file ``data`` was read from. The list is empty if the
+        cache has no entry for these databases."""
+        path = self._entry_path(upstream_dbs)
+        roots = [db.root for db in upstream_dbs]
+        try:
+            with open(path, 'rb') as f:
+                # The key is stored first, so that records pickled by
+                # another Spack are never loaded
+                if cPickle.load(f) != (self._key(), roots):
+                    return []
+                return cPickle.load(f)
+        except Exception:
+            # Missing, or written by an incompatible version of Spack
+            return []
+
+    def store(self, upstream_dbs, stats):
+        """Store the records of ``upstream_dbs``, read from index files with
+        the modification times and sizes in ``stats``."""
+        path = self._entry_path(upstream_dbs)
+        tmp = '{0}.tmp-{1}'.format(path, os.getpid())
+        roots = [db.root for db in upstream_dbs]
+        upstreams = [(stat, db._data) for stat, db in zip(stats, upstream_dbs)]
+        try:
+            fs.mkdirp(self.root)
+            with open(tmp, 'wb') as f:
+                cPickle.dump((self._key(), roots), f, protocol=2)
+                cPickle.dump(upstreams, f, protocol=2)
+            os.rename(tmp, path)
+        except Exception as e:
+            # e.g. specs too deep to be pickled
+            tty.debug('Cannot cache upstream databases: {0}'.format(str(e)))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def read(self, upstream_dbs):
+        """Read a chain of upstream databases, where each database may
+        depend on the ones after it, loading them from the cache where
+        their index files did not change."""
+        stats = [self._index_stat(db) for db in upstream_dbs]
+        cached = self.load(upstream_dbs)
+
+        # Databases are read from the last one. Once one is read again,
+        # the ones before it are as well, so that their specs share the
+        # nodes of its new records.
+        changed = False
+        for i in reversed(range(len(upstream_dbs))):
+            db = upstream_dbs[i]
+            if (not changed and cached and stats[i] is not None and
+                    cached[i][0] == stats[i]):
+                tty.debug('Using cached upstream database {0}'
+                          .format(db.root))
+                db._data = cached[i][1]
+                continue
+            changed = True
+            db._read()
+
+        if changed:
+            self.store(upstream_dbs, stats)
+
+    def destroy(self):
+        """Remove all the entries of the cache."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
 class UpstreamDatabaseLockingError(SpackError):
     """Raised when an operation would need to lock an upstream database"""
 
@@ -6,6 +6,8 @@
 import os
 import shutil
 import glob
+import multiprocessing
+import multiprocessing.pool
 import tempfile
 import re
 from contextlib import contextmanager
@@ -36,6 +38,12 @@ def __init__(self, root):
         self.root = root
         self.check_upstream = True
 
+    @property
+    def trash_path(self):
+        """Directory where prefixes are moved before they are deleted. It
+        is hidden in the root, to be on the same filesystem as prefixes."""
+        return os.path.join(self.root, '.spack-trash')
+
     @property
     def hidden_file_paths(self):
         """Return a list of hidden files used by the directory layout.
@@ -112,6 +120,72 @@ def remove_install_directory(self, spec, deprecated=False):
             except OSError as e:
                 raise RemoveFailedError(spec, path, e)
 
+        self._remove_empty_parents(path)
+
+    def trash_install_directory(self, spec, deprecated=False):
+        """Moves a prefix to the trash, and removes any empty parent
+        directories from the root. Prefixes in the trash are deleted by
+        ``empty_trash()``.
+
+        This is ``remove_install_directory()``, except for the slow part
+        of it. Raises RemoveFailedError if something goes wrong.
+        """
+        path = self.path_for_spec(spec)
+        assert path.startswith(self.root)
+
+        if deprecated:
+            # Deprecated prefixes are only links
+            self.remove_install_directory(spec, deprecated)
+            return
+
+        if os.path.exists(path):
+            try:
+                mkdirp(self.trash_path)
+                trash = tempfile.mkdtemp(
+                    prefix=os.path.basename(path) + '-', dir=self.trash_path)
+                os.rename(path, os.path.join(trash, os.path.basename(path)))
+            except OSError as e:
+                raise RemoveFailedError(spec, path, e)
+
+        self._remove_empty_parents(path)
+
+    def empty_trash(self, jobs=None):
+        """Deletes the prefixes in the trash, using ``jobs`` threads (by
+        default, one per CPU).
+
+        Returns:
+            (list): ``(path, error)`` pairs for the paths in the trash that
+                could not be deleted
+        """
+        try:
+            paths = [os.path.join(self.trash_path, name)
+                     for name in os.listdir(self.trash_path)]
+        except OSError:
+            return []
+
+        def delete(path):
+            try:
+                shutil.rmtree(path)
+            except OSError as e:
+                # Another process may be emptying the trash as well
+                if os.path.exists(path):
+                    return path, e
+            return None
+
+        jobs = min(jobs or multiprocessing.cpu_count(), len(paths))
+        if jobs > 1:
+            pool = multiprocessing.pool.ThreadPool(jobs)
+            try:
+                errors = pool.map(delete, paths)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            errors = [delete(path) for path in paths]
+
+        return [error for error in errors if error is not None]
+
+    def _remove_empty_parents(self, path):
         path = os.path.dirname(path)
         while path != self.root:
             if os.path.isdir(path):
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import collections
+import hashlib
 import os
 import re
 import sys
@@ -26,6 +27,7 @@
 import spack.schema.env
 import spack.spec
 import spack.store
+import spack.util.source_digest
 import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 import spack.config
@@ -80,6 +82,9 @@
 #: version of the lockfile format. Must increase monotonically.
 lockfile_format_version = 2
 
+#: version of the format of the lockfile cache
+lockfile_cache_format_version = 1
+
 # Magic names
 # The name of the standalone spec list in the manifest yaml
 user_speclist_name = 'specs'
@@ -428,10 +433,18 @@ def all_environments():
 
 def _read_yaml(str_or_file):
     """Read YAML from a file for round-trip parsing."""
-    data = syaml.load_config(str_or_file)
     filename = getattr(str_or_file, 'name', None)
+    content = str_or_file
+    if not isinstance(content, six.string_types):
+        # Keep the content, so that it is validated only once
+        content = str_or_file.read()
+        str_or_file = six.StringIO(content)
+        if filename:
+            str_or_file.name = filename
+
+    data = syaml.load_config(str_or_file)
     default_data = spack.config.validate(
-        data, spack.schema.env.schema, filename)
+        data, spack.schema.env.schema, filename, content)
     return (data, default_data)
 
 
@@ -646,7 +659,11 @@ def _read(self):
 
         if os.path.exists(self.lock_path):
             with open(self.lock_path) as f:
-                read_lock_version = self._read_lockfile(f)
+                lockfile = f.read()
+            read_lock_version = self._read_lockfile_cache(lockfile)
+            if read_lock_version is None:
+                read_lock_version = self._read_lockfile(lockfile)
+                self._write_lockfile_cache(lockfile, read_lock_version)
             if default_manifest:
                 # No manifest, set user specs from lockfile
                 self._set_user_specs_from_lockfile()
@@ -768,6 +785,12 @@ def lock_path(self):
         """Path to spack.lock file in this environment."""
         return os.path.join(self.path, lockfile_name)
 
+    @property
+    def _lock_cache_path(self):
+        """Path to the cache of the spack.lock file, from which the concrete
+        specs of the environment are read without hashing them again."""
+        return os.path.join(self.env_subdir_path, lockfile_name + '.cache')
+
     @property
     def _lock_backup_v1_path(self):
         """Path to backup of v1 lockfile before conversion to v2"""
@@ -1422,6 +1445,75 @@ def _read_lockfile(self, file_or_json):
         self._read_lockfile_dict(lockfile_dict)
         return lockfile_dict['_meta']['lockfile-version']
 
+    @staticmethod
+    def _lockfile_cache_key(lockfile):
+        if isinstance(lockfile, six.text_type):
+            lockfile = lockfile.encode('utf-8')
+        digest = hashlib.sha1(lockfile).hexdigest()
+        return [lockfile_cache_format_version, spack.spack_version,
+                spack.util.source_digest.source_digest(), digest]
+
+    def _read_lockfile_cache(self, lockfile):
+        """Read the concrete specs of the lockfile with content ``lockfile``
+        from its cache, if ``config:lockfile_cache`` is set.
+
+        Returns:
+            (int): the version of the format of the lockfile, or None if
+                the cache is missing or was written for another lockfile
+        """
+        if not spack.config.get('config:lockfile_cache', False):
+            return None
+
+        try:
+            with open(self._lock_cache_path) as f:
+                cache = sjson.load(f)
+            if cache['key'] != self._lockfile_cache_key(lockfile):
+                return None
+        except Exception:
+            # Missing, or written by an incompatible version of Spack
+            return None
+
+        tty.debug('Reading concrete specs from {0}'
+                  .format(self._lock_cache_path))
+        self._read_lockfile_dict(cache)
+        return cache['version']
+
+    def _write_lockfile_cache(self, lockfile, version):
+        """Write the cache of the lockfile with content ``lockfile``, if
+        ``config:lockfile_cache`` is set.
+
+        The cache holds the same data as the lockfile, along with all the
+        hashes of each spec, so that they are not computed again when the
+        specs are read. The concrete specs of the environment must have
+        just been read from the lockfile, so that reading them from either
+        file gives the same specs.
+        """
+        if not spack.config.get('config:lockfile_cache', False):
+            return
+
+        data = self._to_lockfile_dict()
+        for spec in self.specs_by_hash.values():
+            for s in spec.traverse():
+                node = data['concrete_specs'][s.build_hash()][s.name]
+                node['build_hash'] = s.build_hash()
+                if s._full_hash:
+                    node['full_hash'] = s._full_hash
+        data['key'] = self._lockfile_cache_key(lockfile)
+        data['version'] = version
+
+        path = self._lock_cache_path
+        tmp = '{0}.tmp-{1}'.format(path, os.getpid())
+        try:
+            fs.mkdirp(self.env_subdir_path)
+            with open(tmp, 'w') as f:
+                sjson.dump(data, f)
+            os.rename(tmp, path)
+        except Exception as e:
+            # e.g. a read-only environment
+            tty.debug('Cannot write {0}: {1}'.format(path, str(e)))
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
     def _read_lockfile_dict(self, d):
         """Read a lockfile dictionary into this environment."""
         roots = d['roots']
@@ -22,13 +22,16 @@
     * archive()
         Archive a source directory, e.g. for creating a mirror.
 """
+import contextlib
 import copy
 import functools
+import multiprocessing.pool
 import os
 import os.path
 import re
 import shutil
 import sys
+import threading
 
 import llnl.util.tty as tty
 import six
@@ -37,10 +40,12 @@
 import spack.error
 import spack.util.crypto as crypto
 import spack.util.pattern as pattern
+import spack.util.s3 as s3_util
 import spack.util.url as url_util
 import spack.util.web as web_util
 from llnl.util.filesystem import (
     working_dir, mkdirp, temp_rename, temp_cwd, get_single_file)
+from llnl.util.lock import LockError
 from spack.util.compression import decompressor_for, extension
 from spack.util.executable import which
 from spack.util.string import comma_and, quote
@@ -228,6 +233,203 @@ def source_id(self):
             return component_ids
 
 
+#: curl return codes of transfers that were interrupted midway, and can be
+#: resumed: partial file, operation timeout, empty reply, send and receive
+#: errors, HTTP/2 stream errors
+_resumable_curl_errors = (18, 28, 52, 55, 56, 92)
+
+
+def _file_signature(path):
+    """Size and modification time of ``path``, or None if it is missing.
+
+    Used to tell whether a file changed since a checksum was computed.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime
+
+
+class _IncrementalChecksum(object):
+    """Checksum of a file that is being downloaded.
+
+    The checksum is updated with the data appended to the file since the
+    last update, so that it is ready as soon as the download completes and
+    the file does not need to be read again to be checked.
+    """
+    block_size = 2 ** 20
+
+    def __init__(self, hash_fun, path):
+        self.hash_fun = hash_fun
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self._hasher = self.hash_fun()
+        self._offset = 0
+
+    def add(self, data):
+        """Update the checksum with data as it is written to the file."""
+        self._hasher.update(data)
+        self._offset += len(data)
+
+    def update(self):
+        """Update the checksum with the data appended to the file."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+
+        if size < self._offset:
+            # The file was truncated or removed, start over
+            self.reset()
+        if size == self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            while True:
+                data = f.read(self.block_size)
+                if not data:
+                    break
+                self.add(data)
+
+    def hexdigest(self):
+        self.update()
+        return self._hasher.hexdigest()
+
+    @contextlib.contextmanager
+    def following(self, interval=0.1):
+        """Update the checksum in a background thread while the body of the
+        context runs, e.g. while an external program writes the file."""
+        done = threading.Event()
+
+        def _follow():
+            while not done.wait(interval):
+                self.update()
+
+        thread = threading.Thread(target=_follow)
+        thread.daemon = True
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+            self.update()
+
+
+class _ResumableRangeError(Exception):
+    """Raised by range fetchers when a transfer was interrupted, and can be
+    resumed from the data received so far."""
+
+
+def _append_file(src, dest):
+    """Append the contents of ``src`` to ``dest`` and remove ``src``."""
+    if not os.path.exists(src):
+        return
+    with open(src, 'rb') as f_src:
+        with open(dest, 'ab') as f_dest:
+            shutil.copyfileobj(f_src, f_dest)
+    os.remove(src)
+
+
+def _download_ranges(url, fetch_range, size, partial_file, connections,
+                     retries, checksum=None):
+    """Download an object in byte ranges over several connections, and
+    assemble it in ``partial_file``.
+
+    Each range is downloaded to its own chunk file next to the partial file.
+    Interrupted ranges are resumed from the data already received, and the
+    chunk files of a previous interrupted fetch are reused.
+
+    Args:
+        url (str): URL of the object, for error messages
+        fetch_range (callable): ``fetch_range(start, end, path)`` writes the
+            bytes from ``start`` to ``end`` (inclusive) of the object to
+            ``path``, and returns the response headers. It raises
+            ``_ResumableRangeError`` if the transfer was interrupted.
+        size (int): size of the object in bytes
+        partial_file (str): file the object is assembled into
+        connections (int): number of ranges downloaded in parallel
+        retries (int): number of times each range is resumed
+        checksum (_IncrementalChecksum): updated while the chunks are
+            assembled, if given
+
+    Returns:
+        headers of the response to the last range
+    """
+    chunk_size = -(-size // connections)
+    ranges = [(i, start, min(start + chunk_size, size) - 1)
+              for i, start in enumerate(range(0, size, chunk_size))]
+    chunk_files = ['{0}.{1}'.format(partial_file, i) for i, _, _ in ranges]
+
+    def _fetch_chunk(chunk):
+        i, start, end = chunk
+        chunk_file = chunk_files[i]
+        tmp_file = chunk_file + '.tmp'
+        headers = ''
+        for attempt in range(retries + 1):
+            received = _file_signature(chunk_file)
+            received = received[0] if received else 0
+            if start + received > end:
+                break
+
+            try:
+                headers = fetch_range(start + received, end, tmp_file)
+            except _ResumableRangeError:
+                if attempt == retries:
+                    raise FailedDownloadError(
+                        url, 'Download of bytes {0}-{1} was interrupted '
+                        '{2} times'.format(start, end, retries + 1))
+                tty.debug('Download of bytes {0}-{1} of {2} interrupted, '
+                          'resuming'.format(start, end, url))
+            finally:
+                # Keep what was received, even if interrupted
+                _append_file(tmp_file, chunk_file)
+        return headers
+
+    def _cleanup():
+        for path in chunk_files:
+            for p in (path, path + '.tmp'):
+                if os.path.exists(p):
+                    os.remove(p)
+
+    tp = multiprocessing.pool.ThreadPool(processes=len(ranges))
+    try:
+        headers = tp.map(_fetch_chunk, ranges)
+    except BaseException:
+        _cleanup()
+        raise
+    finally:
+        tp.terminate()
+        tp.join()
+
+    sizes = [_file_signature(path) for path in chunk_files]
+    if sum(s[0] for s in sizes if s) != size:
+        _cleanup()
+        raise FailedDownloadError(
+            url, 'Downloaded ranges do not add up to {0} bytes'.format(size))
+
+    # Assemble the chunks, computing the checksum on the way
+    if checksum:
+        checksum.reset()
+    with open(partial_file, 'wb') as f_dest:
+        for path in chunk_files:
+            with open(path, 'rb') as f_src:
+                while True:
+                    data = f_src.read(_IncrementalChecksum.block_size)
+                    if not data:
+                        break
+                    f_dest.write(data)
+                    if checksum:
+                        checksum.add(data)
+    _cleanup()
+
+    return headers[-1]
+
+
 @fetcher
 class URLFetchStrategy(FetchStrategy):
     """URLFetchStrategy pulls source code from a URL for an archive, check the
@@ -316,15 +518,49 @@ def _fetch_from_url(self, url):
             save_file = self.stage.save_filename
             partial_file = self.stage.save_filename + '.part'
         tty.debug('Fetching {0}'.format(url))
-        if partial_file:
-            save_args = ['-C',
-                         '-',  # continue partial downloads
-                         '-o',
-                         partial_file]  # use a .part file
+
+        self._fetched_sum = None
+        if not partial_file:
+            curl_args = ['-O'] + self._curl_args(url)
+            with working_dir(self.stage.path):
+                headers = self.curl(*curl_args, output=str,
+                                    fail_on_error=False)
+            self._check_curl_returncode(url, self.curl.returncode)
+
         else:
-            save_args = ['-O']
+            checksum = self._incremental_checksum(partial_file)
+
+            # Large objects are downloaded over several connections, if
+            # the server supports ranged requests. Finding out costs a HEAD
+            # request, so it is only done if parallel downloads are on.
+            size = None
+            if spack.config.get('config:fetch_connections', 1) > 1:
+                size = self._ranged_size(url)
+
+            min_size = spack.config.get('config:fetch_parallel_min_mb', 64)
+            if size and size >= min_size * 2 ** 20:
+                headers = self._fetch_ranges(url, partial_file, size,
+                                             checksum)
+            else:
+                headers = self._fetch_with_resume(url, partial_file,
+                                                  checksum)
+
+            if checksum:
+                self._fetched_sum = (checksum.hexdigest(),
+                                     _file_signature(partial_file))
 
-        curl_args = save_args + [
+        # Check if we somehow got an HTML file rather than the archive we
+        # asked for.  We only look at the last content type, to handle
+        # redirects properly.
+        content_types = re.findall(r'Content-Type:[^\r\n]+', headers,
+                                   flags=re.IGNORECASE)
+        if content_types and 'text/html' in content_types[-1]:
+            warn_content_type_mismatch(self.archive_file or "the archive")
+        return partial_file, save_file
+
+    def _curl_args(self, url, progress=True):
+        """Arguments common to all the curl invocations for ``url``."""
+        curl_args = [
             '-f',  # fail on >400 errors
             '-D',
             '-',  # print out HTML headers
@@ -337,7 +573,7 @@ def _fetch_from_url(self, url):
         if not spack.config.get('config:verify_ssl'):
             curl_args.append('-k')
 
-        if sys.stdout.isatty() and tty.msg_enabled():
+        if progress and sys.stdout.isatty() and tty.msg_enabled():
             curl_args.append('-#')  # status bar when using a tty
         else:
             curl_args.append('-sS')  # just errors when not.
@@ -359,50 +595,131 @@ def _fetch_from_url(self, url):
             # Timeout if can't establish a connection after n sec.
             curl_args.extend(['--connect-timeout', str(connect_timeout)])
 
-        # Run curl but grab the mime type from the http headers
-        curl = self.curl
-        with working_dir(self.stage.path):
-            headers = curl(*curl_args, output=str, fail_on_error=False)
+        return curl_args
+
+    def _incremental_checksum(self, partial_file):
+        """Checksum computed while ``partial_file`` is downloaded, or None
+        if there is no digest to check against."""
+        if not self.digest:
+            return None
+        try:
+            return _IncrementalChecksum(
+                crypto.hash_fun_for_digest(self.digest), partial_file)
+        except ValueError:
+            # Unknown digest type, check() will report it
+            return None
+
+    def _fetch_with_resume(self, url, partial_file, checksum):
+        """Download ``url`` to ``partial_file`` in a single stream.
+
+        If the transfer is interrupted, it is resumed from where it stopped
+        up to ``config:fetch_retries`` times. The checksum is computed from
+        the data while it is being written.
+        """
+        curl_args = ['-C',
+                     '-',  # continue partial downloads
+                     '-o',
+                     partial_file]  # use a .part file
+        curl_args += self._curl_args(url)
 
+        retries = spack.config.get('config:fetch_retries', 3)
+        curl = self.curl
+        for attempt in range(retries + 1):
+            with working_dir(self.stage.path):
+                if checksum:
+                    with checksum.following():
+                        headers = curl(*curl_args, output=str,
+                                       fail_on_error=False)
+                else:
+                    headers = curl(*curl_args, output=str,
+                                   fail_on_error=False)
+
+            if (curl.returncode in _resumable_curl_errors and
+                    attempt < retries):
+                tty.debug('Download of {0} interrupted, resuming [{1}]'
+                          .format(url, curl.returncode))
+                continue
+
+            self._check_curl_returncode(url, curl.returncode, partial_file)
+            return headers
+
+    def _ranged_size(self, url):
+        """Size of the object at ``url`` if its server accepts byte range
+        requests, None otherwise."""
+        curl_args = ['-I'] + self._curl_args(url, progress=False)
+        curl = copy.copy(self.curl)
+        headers = curl(*curl_args, output=str, fail_on_error=False)
         if curl.returncode != 0:
-            # clean up archive on failure.
-            if self.archive_file:
-                os.remove(self.archive_file)
+            return None
 
-            if partial_file and os.path.exists(partial_file):
-                os.remove(partial_file)
-
-            if curl.returncode == 22:
-                # This is a 404.  Curl will print the error.
-                raise FailedDownloadError(
-                    url, "URL %s was not found!" % url)
-
-            elif curl.returncode == 60:
-                # This is a certificate error.  Suggest spack -k
-                raise FailedDownloadError(
-                    url,
-                    "Curl was unable to fetch due to invalid certificate. "
-                    "This is either an attack, or your cluster's SSL "
-                    "configuration is bad.  If you believe your SSL "
-                    "configuration is bad, you can try running spack -k, "
-                    "which will not check SSL certificates."
-                    "Use this at your own risk.")
+        # Only look at the headers of the last response, after redirects
+        last = re.split(r'\r?\n\r?\n(?=\S)', headers.strip())[-1]
+        if not re.search(r'^Accept-Ranges:\s*bytes', last,
+                         flags=re.IGNORECASE | re.MULTILINE):
+            return None
 
-            else:
-                # This is some other curl error.  Curl will print the
-                # error, but print a spack message too
-                raise FailedDownloadError(
-                    url,
-                    "Curl failed with error %d" % curl.returncode)
+        length = re.search(r'^Content-Length:\s*(\d+)', last,
+                           flags=re.IGNORECASE | re.MULTILINE)
+        return int(length.group(1)) if length else None
 
-        # Check if we somehow got an HTML file rather than the archive we
-        # asked for.  We only look at the last content type, to handle
-        # redirects properly.
-        content_types = re.findall(r'Content-Type:[^\r\n]+', headers,
-                                   flags=re.IGNORECASE)
-        if content_types and 'text/html' in content_types[-1]:
-            warn_content_type_mismatch(self.archive_file or "the archive")
-        return partial_file, save_file
+    def _fetch_ranges(self, url, partial_file, size, checksum):
+        """Download ``url`` to ``partial_file`` over several connections,
+        each fetching a byte range of the object into its own chunk file.
+        """
+        def _fetch_range(start, end, chunk_file):
+            curl_args = ['-r', '{0}-{1}'.format(start, end)]
+            curl_args += self._curl_args(url, progress=False)
+            # Headers and errors go to stdout, data to the chunk file
+            curl_args += ['-o', chunk_file]
+            curl = copy.copy(self.curl)
+            output = curl(*curl_args, output=str, fail_on_error=False)
+            if curl.returncode in _resumable_curl_errors:
+                raise _ResumableRangeError(output)
+            self._check_curl_returncode(url, curl.returncode)
+            return output
+
+        connections = spack.config.get('config:fetch_connections', 1)
+        retries = spack.config.get('config:fetch_retries', 3)
+        tty.debug('Fetching {0} bytes over {1} connections'
+                  .format(size, connections))
+
+        return _download_ranges(url, _fetch_range, size, partial_file,
+                                connections, retries, checksum)
+
+    def _check_curl_returncode(self, url, returncode, partial_file=None):
+        """Clean up and raise an appropriate error if curl failed."""
+        if returncode == 0:
+            return
+
+        # clean up archive on failure.
+        if self.archive_file:
+            os.remove(self.archive_file)
+
+        if partial_file and os.path.exists(partial_file):
+            os.remove(partial_file)
+
+        if returncode == 22:
+            # This is a 404.  Curl will print the error.
+            raise FailedDownloadError(
+                url, "URL %s was not found!" % url)
+
+        elif returncode == 60:
+            # This is a certificate error.  Suggest spack -k
+            raise FailedDownloadError(
+                url,
+                "Curl was unable to fetch due to invalid certificate. "
+                "This is either an attack, or your cluster's SSL "
+                "configuration is bad.  If you believe your SSL "
+                "configuration is bad, you can try running spack -k, "
+                "which will not check SSL certificates."
+                "Use this at your own risk.")
+
+        else:
+            # This is some other curl error.  Curl will print the
+            # error, but print a spack message too
+            raise FailedDownloadError(
+                url,
+                "Curl failed with error %d" % returncode)
 
     @property
     @_needs_stage
@@ -503,7 +820,17 @@ def check(self):
                 "Attempt to check URLFetchStrategy with no digest.")
 
         checker = crypto.Checker(self.digest)
-        if not checker.check(self.archive_file):
+
+        # Use the checksum computed while downloading, if the archive has
+        # not changed since, to avoid reading it again
+        fetched_sum = getattr(self, '_fetched_sum', None)
+        if (fetched_sum is not None and
+                fetched_sum[1] == _file_signature(self.archive_file)):
+            ok = checker.check_sum(fetched_sum[0])
+        else:
+            ok = checker.check(self.archive_file)
+
+        if not ok:
             raise ChecksumError(
                 "%s checksum failed for %s" %
                 (checker.hash_name, self.archive_file),
@@ -543,21 +870,38 @@ def __str__(self):
 class CacheURLFetchStrategy(URLFetchStrategy):
     """The resource associated with a cache URL may be out of date."""
 
+    def __init__(self, *args, **kwargs):
+        # Content-addressed cache consulted before the cache URL
+        self.archives = kwargs.pop('archives', None)
+        super(CacheURLFetchStrategy, self).__init__(*args, **kwargs)
+
     @_needs_stage
     def fetch(self):
         path = re.sub('^file://', '', self.url)
 
+        # Archives in the content-addressed cache take precedence
+        cached = None
+        if self.archives and self.digest:
+            cached = self.archives.find(self.digest)
+
         # check whether the cache file exists.
-        if not os.path.isfile(path):
+        if not cached and not os.path.isfile(path):
             raise NoCacheError('No cache of %s' % path)
 
         # remove old symlink if one is there.
         filename = self.stage.save_filename
-        if os.path.exists(filename):
+        if os.path.lexists(filename):
             os.remove(filename)
 
-        # Symlink to local cached archive.
-        os.symlink(path, filename)
+        if cached and self.archives.fetch(self.digest, filename):
+            # Reflinked or hard linked the content-addressed archive
+            path = cached
+        elif not cached or os.path.isfile(path):
+            # Symlink to local cached archive.
+            os.symlink(path, filename)
+        else:
+            # The archive was evicted in the meantime
+            raise NoCacheError('No cache of %s' % path)
 
         # Remove link if checksum fails, or subsequent fetchers
         # will assume they don't need to download.
@@ -1148,26 +1492,95 @@ def fetch(self):
         tty.debug('Fetching {0}'.format(self.url))
 
         basename = os.path.basename(parsed_url.path)
+        filename = os.path.join(self.stage.path, basename)
 
-        with working_dir(self.stage.path):
+        self._fetched_sum = None
+        checksum = self._incremental_checksum(filename)
+
+        # Large objects are downloaded over several connections
+        size = None
+        if spack.config.get('config:fetch_connections', 1) > 1:
+            size = self._object_size(parsed_url)
+
+        min_size = spack.config.get('config:fetch_parallel_min_mb', 64)
+        if size and size >= min_size * 2 ** 20:
+            headers = self._fetch_ranges(parsed_url, filename, size, checksum)
+            content_type = headers.get('content-type')
+        else:
             _, headers, stream = web_util.read_from_url(self.url)
 
-            with open(basename, 'wb') as f:
-                shutil.copyfileobj(stream, f)
+            # Compute the checksum while the object is written
+            with open(filename, 'wb') as f:
+                while True:
+                    data = stream.read(_IncrementalChecksum.block_size)
+                    if not data:
+                        break
+                    f.write(data)
+                    if checksum:
+                        checksum.add(data)
 
             content_type = web_util.get_header(headers, 'Content-type')
 
         if content_type == 'text/html':
             warn_content_type_mismatch(self.archive_file or "the archive")
 
+        if checksum:
+            self._fetched_sum = (checksum.hexdigest(),
+                                 _file_signature(filename))
+
         if self.stage.save_filename:
-            os.rename(
-                os.path.join(self.stage.path, basename),
-                self.stage.save_filename)
+            os.rename(filename, self.stage.save_filename)
 
         if not self.archive_file:
             raise FailedDownloadError(self.url)
 
+    def _bucket_and_key(self, parsed_url):
+        key = parsed_url.path
+        if key.startswith('/'):
+            key = key[1:]
+        return parsed_url.netloc, key
+
+    def _object_size(self, parsed_url):
+        """Size of the object at ``parsed_url``, or None if unknown."""
+        bucket, key = self._bucket_and_key(parsed_url)
+        try:
+            s3 = s3_util.create_s3_session(parsed_url)
+            return s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+        except Exception as e:
+            # Let the single stream fetch report the error, if any
+            tty.debug('Cannot get the size of {0}: {1}'.format(self.url, e))
+            return None
+
+    def _fetch_ranges(self, parsed_url, filename, size, checksum):
+        """Download the object over several connections, each fetching a
+        byte range of the object with ranged GET requests."""
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        bucket, key = self._bucket_and_key(parsed_url)
+        s3 = s3_util.create_s3_session(parsed_url)
+
+        def _fetch_range(start, end, chunk_file):
+            try:
+                obj = s3.get_object(Bucket=bucket, Key=key,
+                                    Range='bytes={0}-{1}'.format(start, end))
+                with open(chunk_file, 'wb') as f:
+                    shutil.copyfileobj(obj['Body'], f)
+            except ClientError as e:
+                # The request was refused, e.g. the object is missing
+                raise FailedDownloadError(self.url, str(e))
+            except (BotoCoreError, IOError, OSError) as e:
+                # Connection and read errors
+                raise _ResumableRangeError(str(e))
+            return obj['ResponseMetadata']['HTTPHeaders']
+
+        connections = spack.config.get('config:fetch_connections', 1)
+        retries = spack.config.get('config:fetch_retries', 3)
+        tty.debug('Fetching {0} bytes over {1} connections'
+                  .format(size, connections))
+
+        return _download_ranges(self.url, _fetch_range, size, filename,
+                                connections, retries, checksum)
+
 
 def stable_target(fetcher):
     """Returns whether the fetcher target is expected to have a stable
@@ -1395,9 +1808,15 @@ def from_list_url(pkg):
 
 
 class FsCache(object):
+    """Cache of fetched archives, at the paths they have in mirrors.
+
+    If ``archives`` is given, archives with a checksum are stored in that
+    content-addressed cache instead, and only linked to from here.
+    """
 
-    def __init__(self, root):
+    def __init__(self, root, archives=None):
         self.root = os.path.abspath(root)
+        self.archives = archives
 
     def store(self, fetcher, relative_dest):
         # skip fetchers that aren't cachable
@@ -1410,13 +1829,33 @@ def store(self, fetcher, relative_dest):
 
         dst = os.path.join(self.root, relative_dest)
         mkdirp(os.path.dirname(dst))
-        fetcher.archive(dst)
+
+        entry = None
+        if self.archives and fetcher.digest and fetcher.archive_file:
+            try:
+                entry = self.archives.store(
+                    fetcher.archive_file, fetcher.digest)
+            except (IOError, OSError, LockError) as e:
+                # e.g. a shared cache this user cannot write to. Caching
+                # is optional, so the archive is cached by path instead.
+                tty.debug('Cannot store {0} in {1}: {2}'.format(
+                    fetcher.archive_file, self.archives.root, str(e)))
+
+        if entry:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            os.symlink(entry, dst)
+        else:
+            fetcher.archive(dst)
 
     def fetcher(self, target_path, digest, **kwargs):
         path = os.path.join(self.root, target_path)
-        return CacheURLFetchStrategy(path, digest, **kwargs)
+        return CacheURLFetchStrategy(
+            path, digest, archives=self.archives, **kwargs)
 
     def destroy(self):
+        # A content-addressed cache outside of the root may be shared with
+        # other users, so it is left alone.
         shutil.rmtree(self.root, ignore_errors=True)
 
 
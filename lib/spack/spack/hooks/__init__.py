@@ -20,11 +20,22 @@
    This can be used to implement support for things like module
    systems (e.g. modules, lmod, etc.) or to add other custom
    features.
+
+   Hooks that need to look at every file in a prefix should use
+   :func:`spack.util.prefix_scan.scan_prefix`, so that a single walk
+   of the prefix is shared by all of them. The time taken by each
+   hook is reported in debug output, and recorded as a span when
+   tracing is enabled (see :mod:`spack.util.tracing`).
 """
 import os.path
+import time
+
+import llnl.util.tty as tty
 
 import spack.paths
 import spack.util.imp as simp
+import spack.util.prefix_scan
+import spack.util.tracing as tracing
 from llnl.util.lang import memoized, list_modules
 
 
@@ -52,11 +63,22 @@ def __init__(self, hook_name):
         self.hook_name = hook_name
 
     def __call__(self, *args, **kwargs):
-        for module in all_hook_modules():
-            if hasattr(module, self.hook_name):
-                hook = getattr(module, self.hook_name)
-                if hasattr(hook, '__call__'):
-                    hook(*args, **kwargs)
+        # Prefix scans are shared among the hooks of a single run only
+        spack.util.prefix_scan.clear_cache()
+        try:
+            for module in all_hook_modules():
+                if hasattr(module, self.hook_name):
+                    hook = getattr(module, self.hook_name)
+                    if hasattr(hook, '__call__'):
+                        start_time = time.time()
+                        with tracing.span(module.__name__, 'hook',
+                                          hook=self.hook_name):
+                            hook(*args, **kwargs)
+                        tty.debug('{0} hook from {1} took {2:.3f}s'.format(
+                            self.hook_name, module.__name__,
+                            time.time() - start_time))
+        finally:
+            spack.util.prefix_scan.clear_cache()
 
 
 pre_install = HookRunner('pre_install')
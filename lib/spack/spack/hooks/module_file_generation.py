@@ -3,19 +3,24 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import os
+
 import spack.config
+import spack.error
 import spack.modules
 import spack.modules.common
 import llnl.util.tty as tty
 
 
 def _for_each_enabled(spec, method_name):
-    """Calls a method for each enabled module"""
+    """Calls a method for each enabled module, and returns the module
+    writers for which it succeeded"""
     enabled = spack.config.get('modules:enable')
     if not enabled:
         tty.debug('NO MODULE WRITTEN: list of enabled module files is empty')
-        return
+        return []
 
+    generators = []
     for name in enabled:
         generator = spack.modules.module_types[name](spec)
         try:
@@ -24,11 +29,28 @@ def _for_each_enabled(spec, method_name):
             msg = 'cannot perform the requested {0} operation on module files'
             msg += ' [{1}]'
             tty.warn(msg.format(method_name, str(e)))
+            continue
+        generators.append(generator)
+    return generators
+
+
+def _update_module_index(generator, **kwargs):
+    try:
+        spack.modules.common.update_module_index(
+            generator.layout.dirname(), **kwargs)
+    except (IOError, OSError, spack.error.SpackError) as e:
+        tty.warn('cannot update the index of module files [{0}]'
+                 .format(str(e)))
 
 
 def post_install(spec):
-    _for_each_enabled(spec, 'write')
+    for generator in _for_each_enabled(spec, 'write'):
+        if os.path.exists(generator.layout.filename):
+            entry = spack.modules.common.module_index_entry(generator)
+            _update_module_index(generator, add={spec.dag_hash(): entry})
 
 
 def post_uninstall(spec):
-    _for_each_enabled(spec, 'remove')
+    for generator in _for_each_enabled(spec, 'remove'):
+        if os.path.isdir(generator.layout.dirname()):
+            _update_module_index(generator, remove=[spec.dag_hash()])
@@ -3,19 +3,25 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-import os
+import spack.package_prefs as pp
 import spack.util.file_permissions as fp
+import spack.util.prefix_scan as prefix_scan
 
 
 def post_install(spec):
     if not spec.external:
         fp.set_permissions_by_spec(spec.prefix, spec)
 
-        # os.walk explicitly set not to follow links
-        for root, dirs, files in os.walk(spec.prefix, followlinks=False):
-            for d in dirs:
-                if not os.path.islink(os.path.join(root, d)):
-                    fp.set_permissions_by_spec(os.path.join(root, d), spec)
-            for f in files:
-                if not os.path.islink(os.path.join(root, f)):
-                    fp.set_permissions_by_spec(os.path.join(root, f), spec)
+        # Query the configuration only once, not once per file
+        dir_perms = pp.get_package_dir_permissions(spec)
+        file_perms = pp.get_package_permissions(spec)
+        group = pp.get_package_group(spec)
+
+        def _set_permissions(entry):
+            perms = dir_perms if entry.kind == prefix_scan.DIR else file_perms
+            fp.set_permissions(entry.path, perms, group)
+
+        # The scan does not follow links, and links are skipped
+        entries = [e for e in prefix_scan.scan_prefix(spec.prefix)
+                   if e.kind != prefix_scan.LINK]
+        prefix_scan.parallel_map(_set_permissions, entries)
@@ -12,6 +12,7 @@
 
 import spack.paths
 import spack.modules
+import spack.util.prefix_scan as prefix_scan
 
 # Character limit for shebang line.  Using Linux's 127 characters
 # here, as it is the shortest I could find on a modern OS.
@@ -81,25 +82,35 @@ def filter_shebang(path):
     tty.debug("Patched overlong shebang in %s" % path)
 
 
-def filter_shebangs_in_directory(directory, filenames=None):
-    if filenames is None:
-        filenames = os.listdir(directory)
-    for file in filenames:
-        path = os.path.join(directory, file)
+def _should_filter(directory, path):
+    """Whether ``path``, found in ``directory``, is a candidate for
+    shebang filtering.
+    """
+    # only handle files
+    if not os.path.isfile(path):
+        return False
 
-        # only handle files
-        if not os.path.isfile(path):
-            continue
+    # only handle links that resolve within THIS package's prefix.
+    if os.path.islink(path):
+        real_path = os.path.realpath(path)
+        if not real_path.startswith(directory + os.sep):
+            return False
 
-        # only handle links that resolve within THIS package's prefix.
-        if os.path.islink(path):
-            real_path = os.path.realpath(path)
-            if not real_path.startswith(directory + os.sep):
-                continue
+    return True
 
-        # test the file for a long shebang, and filter
-        if shebang_too_long(path):
-            filter_shebang(path)
+
+def _filter_if_too_long(path):
+    # test the file for a long shebang, and filter
+    if shebang_too_long(path):
+        filter_shebang(path)
+
+
+def filter_shebangs_in_directory(directory, filenames=None):
+    if filenames is None:
+        filenames = os.listdir(directory)
+    paths = [os.path.join(directory, f) for f in filenames]
+    paths = [p for p in paths if _should_filter(directory, p)]
+    prefix_scan.parallel_map(_filter_if_too_long, paths)
 
 
 def post_install(spec):
@@ -111,5 +122,15 @@ def post_install(spec):
         tty.debug('SKIP: shebang filtering [external package]')
         return
 
-    for directory, _, filenames in os.walk(spec.prefix):
-        filter_shebangs_in_directory(directory, filenames)
+    # The shared prefix scan already tells regular files from links, so
+    # only links need to be resolved here.
+    paths = []
+    for entry in prefix_scan.scan_prefix(spec.prefix):
+        if entry.kind == prefix_scan.FILE:
+            paths.append(entry.path)
+        elif entry.kind == prefix_scan.LINK:
+            directory = os.path.dirname(entry.path)
+            if _should_filter(directory, entry.path):
+                paths.append(entry.path)
+
+    prefix_scan.parallel_map(_filter_if_too_long, paths)
@@ -27,6 +27,7 @@
 installations of packages in a Spack instance.
 """
 
+import functools
 import glob
 import heapq
 import itertools
@@ -47,6 +48,7 @@
 import spack.package_prefs as prefs
 import spack.repo
 import spack.store
+import spack.util.tracing as tracing
 
 from llnl.util.tty.color import colorize
 from llnl.util.tty.log import log_output
@@ -590,6 +592,134 @@ def package_id(pkg):
         """
 
 
+def build_process(pkg, kwargs):
+    """Perform the installation/build of the package.
+
+    This runs in a separate child process, and has its own process and
+    python module space set up by build_environment.fork(). It is a module
+    level function taking only picklable arguments, so that the child
+    process can be started by any of the build process start methods.
+
+    This function's return value is returned to the parent process.
+
+    Args:
+        pkg (PackageBase): the package being installed
+        kwargs (dict): the ``fake``, ``install_source``, ``keep_stage``,
+            ``skip_patch`` and ``verbose`` install arguments, and the
+            ``pre`` prefix of the messages
+    """
+    fake = kwargs.get('fake', False)
+    install_source = kwargs.get('install_source', False)
+    keep_stage = kwargs.get('keep_stage', False)
+    skip_patch = kwargs.get('skip_patch', False)
+    verbose = kwargs.get('verbose', False)
+    pre = kwargs.get('pre', '{0}:'.format(pkg.name))
+
+    start_time = time.time()
+    if not fake:
+        if not skip_patch:
+            pkg.do_patch()
+        else:
+            pkg.do_stage()
+
+    pkg_id = package_id(pkg)
+    tty.debug('{0} Building {1} [{2}]'
+              .format(pre, pkg_id, pkg.build_system_class))
+
+    # get verbosity from do_install() parameter or saved value
+    echo = verbose
+    if spack.package.PackageBase._verbose is not None:
+        echo = spack.package.PackageBase._verbose
+
+    pkg.stage.keep = keep_stage
+
+    # parent process already has a prefix write lock
+    with pkg.stage:
+        # Run the pre-install hook in the child process after
+        # the directory is created.
+        spack.hooks.pre_install(pkg.spec)
+        if fake:
+            _do_fake_install(pkg)
+        else:
+            source_path = pkg.stage.source_path
+            if install_source and os.path.isdir(source_path):
+                src_target = os.path.join(pkg.spec.prefix, 'share',
+                                          pkg.name, 'src')
+                tty.debug('{0} Copying source to {1}'
+                          .format(pre, src_target))
+                fs.install_tree(pkg.stage.source_path, src_target)
+
+            # Do the real install in the source directory.
+            with fs.working_dir(pkg.stage.source_path):
+                # Save the build environment in a file before building.
+                dump_environment(pkg.env_path)
+
+                for attr in ('configure_args', 'cmake_args'):
+                    try:
+                        configure_args = getattr(pkg, attr)()
+                        configure_args = ' '.join(configure_args)
+
+                        with open(pkg.configure_args_path, 'w') as \
+                                args_file:
+                            args_file.write(configure_args)
+
+                        break
+                    except Exception:
+                        pass
+
+                # cache debug settings
+                debug_level = tty.debug_level()
+
+                # Spawn a daemon that reads from a pipe and redirects
+                # everything to log_path
+                max_log_size = spack.config.get(
+                    'config:build_log_max_size', 0) * 1024 * 1024
+                logger = log_output(
+                    pkg.log_path, echo, True,
+                    compression=spack.package.build_log_compression(),
+                    max_size=max_log_size)
+                try:
+                    with logger:
+                        for phase_name, phase_attr in zip(
+                                pkg.phases, pkg._InstallPhase_phases):
+
+                            with logger.force_echo():
+                                inner_debug_level = tty.debug_level()
+                                tty.set_debug(debug_level)
+                                tty.msg("{0} Executing phase: '{1}'"
+                                        .format(pre, phase_name))
+                                tty.set_debug(inner_debug_level)
+
+                            # Redirect stdout and stderr to daemon pipe
+                            phase = getattr(pkg, phase_attr)
+                            with tracing.span(phase_name, 'phase'):
+                                phase(pkg.spec, pkg.prefix)
+                finally:
+                    # The end of the output is reported if the build fails
+                    pkg._log_tail = logger.tail
+
+            echo = logger.echo
+            log(pkg)
+
+        # Run post install hooks before build stage is removed.
+        with tracing.span('post-install', 'phase'):
+            spack.hooks.post_install(pkg.spec)
+
+    # Stop the timer
+    pkg._total_time = time.time() - start_time
+    build_time = pkg._total_time - pkg._fetch_time
+
+    tty.debug('{0} Successfully installed {1}'
+              .format(pre, pkg_id),
+              'Fetch: {0}.  Build: {1}.  Total: {2}.'
+              .format(_hms(pkg._fetch_time), _hms(build_time),
+                      _hms(pkg._total_time)))
+    _print_installed_pkg(pkg.prefix)
+
+    # preserve verbosity across runs
+    return echo
+
+
 class PackageInstaller(object):
     '''
     Class for managing the install process for a Spack instance based on a
@@ -699,39 +829,46 @@ def _check_deps_status(self):
         """Check the install status of the explicit spec's dependencies"""
 
         err = 'Cannot proceed with {0}: {1}'
-        for dep in self.spec.traverse(order='post', root=False):
-            dep_pkg = dep.package
-            dep_id = package_id(dep_pkg)
-
-            # Check for failure since a prefix lock is not required
-            if spack.store.db.prefix_failed(dep):
-                action = "'spack install' the dependency"
-                msg = '{0} is marked as an install failure: {1}' \
-                    .format(dep_id, action)
-                raise InstallError(err.format(self.pkg_id, msg))
-
-            # Attempt to get a write lock to ensure another process does not
-            # uninstall the dependency while the requested spec is being
-            # installed
-            ltype, lock = self._ensure_locked('write', dep_pkg)
-            if lock is None:
-                msg = '{0} is write locked by another process'.format(dep_id)
-                raise InstallError(err.format(self.pkg_id, msg))
-
-            # Flag external and upstream packages as being installed
-            if dep_pkg.spec.external or dep_pkg.installed_upstream:
-                form = 'external' if dep_pkg.spec.external else 'upstream'
-                tty.debug('Flagging {0} {1} as installed'.format(form, dep_id))
-                self.installed.add(dep_id)
-                continue
+        deps = self.spec.topological_order()[:-1]
+
+        # Check for failures first since a prefix lock is not required
+        failed = spack.store.db.prefixes_failed(deps)
+        if failed:
+            action = "'spack install' the dependency"
+            msg = '{0} is marked as an install failure: {1}' \
+                .format(package_id(failed[0].package), action)
+            raise InstallError(err.format(self.pkg_id, msg))
+
+        # Look up all the dependencies within one read transaction
+        with spack.store.db.read_transaction():
+            for dep in deps:
+                dep_pkg = dep.package
+                dep_id = package_id(dep_pkg)
+
+                # Flag external and upstream packages as being installed
+                if dep_pkg.spec.external or dep_pkg.installed_upstream:
+                    form = 'external' if dep_pkg.spec.external else 'upstream'
+                    tty.debug('Flagging {0} {1} as installed'
+                              .format(form, dep_id))
+                    self.installed.add(dep_id)
+                    continue
+
+                # Check the database to see if the dependency has been
+                # installed and flag as such if appropriate
+                rec, installed_in_db = self._check_db(dep)
+                if installed_in_db:
+                    tty.debug('Flagging {0} as installed per the database'
+                              .format(dep_id))
+                    self.installed.add(dep_id)
+                    continue
 
-            # Check the database to see if the dependency has been installed
-            # and flag as such if appropriate
-            rec, installed_in_db = self._check_db(dep)
-            if installed_in_db:
-                tty.debug('Flagging {0} as installed per the database'
-                          .format(dep_id))
-                self.installed.add(dep_id)
+                # Only lock the dependencies that still need installing, to
+                # ensure another process is not installing them as well
+                ltype, lock = self._ensure_locked('write', dep_pkg)
+                if lock is None:
+                    msg = '{0} is write locked by another process' \
+                        .format(dep_id)
+                    raise InstallError(err.format(self.pkg_id, msg))
 
     def _prepare_for_install(self, task, keep_prefix, keep_stage,
                              restage=False):
@@ -995,7 +1132,8 @@ def _init_queue(self, install_deps, install_package):
             'config:install_missing_compilers', False)
 
         if install_deps:
-            for dep in self.spec.traverse(order='post', root=False):
+            deps = self.spec.topological_order()[:-1]
+            for dep in deps:
                 dep_pkg = dep.package
 
                 # First push any missing compilers (if requested)
@@ -1005,10 +1143,10 @@ def _init_queue(self, install_deps, install_package):
                 if package_id(dep_pkg) not in self.build_tasks:
                     self._push_task(dep_pkg, False, 0, 0, STATUS_ADDED)
 
-                # Clear any persistent failure markings _unless_ they are
-                # associated with another process in this parallel build
-                # of the spec.
-                spack.store.db.clear_failure(dep, force=False)
+            # Clear any persistent failure markings _unless_ they are
+            # associated with another process in this parallel build
+            # of the spec.
+            spack.store.db.clear_failures(deps, force=False)
 
             # Push any missing compilers (if requested) as part of the
             # package dependencies.
@@ -1068,107 +1206,6 @@ def _install_task(self, task, **kwargs):
         pid = '{0}: '.format(self.pid) if tty.show_pid() else ''
         pre = '{0}{1}:'.format(pid, pkg.name)
 
-        def build_process():
-            """
-            This function implements the process forked for each build.
-
-            It has its own process and python module space set up by
-            build_environment.fork().
-
-            This function's return value is returned to the parent process.
-            """
-            start_time = time.time()
-            if not fake:
-                if not skip_patch:
-                    pkg.do_patch()
-                else:
-                    pkg.do_stage()
-
-            pkg_id = package_id(pkg)
-            tty.debug('{0} Building {1} [{2}]'
-                      .format(pre, pkg_id, pkg.build_system_class))
-
-            # get verbosity from do_install() parameter or saved value
-            echo = verbose
-            if spack.package.PackageBase._verbose is not None:
-                echo = spack.package.PackageBase._verbose
-
-            pkg.stage.keep = keep_stage
-
-            # parent process already has a prefix write lock
-            with pkg.stage:
-                # Run the pre-install hook in the child process after
-                # the directory is created.
-                spack.hooks.pre_install(pkg.spec)
-                if fake:
-                    _do_fake_install(pkg)
-                else:
-                    source_path = pkg.stage.source_path
-                    if install_source and os.path.isdir(source_path):
-                        src_target = os.path.join(pkg.spec.prefix, 'share',
-                                                  pkg.name, 'src')
-                        tty.debug('{0} Copying source to {1}'
-                                  .format(pre, src_target))
-                        fs.install_tree(pkg.stage.source_path, src_target)
-
-                    # Do the real install in the source directory.
-                    with fs.working_dir(pkg.stage.source_path):
-                        # Save the build environment in a file before building.
-                        dump_environment(pkg.env_path)
-
-                        for attr in ('configure_args', 'cmake_args'):
-                            try:
-                                configure_args = getattr(pkg, attr)()
-                                configure_args = ' '.join(configure_args)
-
-                                with open(pkg.configure_args_path, 'w') as \
-                                        args_file:
-                                    args_file.write(configure_args)
-
-                                break
-                            except Exception:
-                                pass
-
-                        # cache debug settings
-                        debug_level = tty.debug_level()
-
-                        # Spawn a daemon that reads from a pipe and redirects
-                        # everything to log_path
-                        with log_output(pkg.log_path, echo, True) as logger:
-                            for phase_name, phase_attr in zip(
-                                    pkg.phases, pkg._InstallPhase_phases):
-
-                                with logger.force_echo():
-                                    inner_debug_level = tty.debug_level()
-                                    tty.set_debug(debug_level)
-                                    tty.msg("{0} Executing phase: '{1}'"
-                                            .format(pre, phase_name))
-                                    tty.set_debug(inner_debug_level)
-
-                                # Redirect stdout and stderr to daemon pipe
-                                phase = getattr(pkg, phase_attr)
-                                phase(pkg.spec, pkg.prefix)
-
-                    echo = logger.echo
-                    log(pkg)
-
-                # Run post install hooks before build stage is removed.
-                spack.hooks.post_install(pkg.spec)
-
-            # Stop the timer
-            pkg._total_time = time.time() - start_time
-            build_time = pkg._total_time - pkg._fetch_time
-
-            tty.debug('{0} Successfully installed {1}'
-                      .format(pre, pkg_id),
-                      'Fetch: {0}.  Build: {1}.  Total: {2}.'
-                      .format(_hms(pkg._fetch_time), _hms(build_time),
-                              _hms(pkg._total_time)))
-            _print_installed_pkg(pkg.prefix)
-
-            # preserve verbosity across runs
-            return echo
-
         # hook that allows tests to inspect the Package before installation
         # see unit_test_check() docs.
         if not pkg.unit_test_check():
@@ -1179,8 +1216,17 @@ def build_process():
 
             # Fork a child to do the actual installation.
             # Preserve verbosity settings across installs.
+            build_kwargs = {
+                'fake': fake,
+                'install_source': install_source,
+                'keep_stage': keep_stage,
+                'skip_patch': skip_patch,
+                'verbose': verbose,
+                'pre': pre,
+            }
             spack.package.PackageBase._verbose = spack.build_environment.fork(
-                pkg, build_process, dirty=dirty, fake=fake)
+                pkg, functools.partial(build_process, pkg, build_kwargs),
+                dirty=dirty, fake=fake)
 
             # Note: PARENT of the build process adds the new package to
             # the database, so that we don't need to re-read from file.
@@ -1544,7 +1590,9 @@ def install(self, **kwargs):
             # Proceed with the installation since we have an exclusive write
             # lock on the package.
             try:
-                self._install_task(task, **kwargs)
+                with tracing.span('install', 'install', package=pkg_id,
+                                  hash=spec.dag_hash()):
+                    self._install_task(task, **kwargs)
                 self._update_installed(task)
 
                 # If we installed then we should keep the prefix
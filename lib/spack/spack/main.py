@@ -664,7 +664,7 @@ def shell_set(var, value):
     # print environment module system if available. This can be expensive
     # on clusters, so skip it if not needed.
     if 'modules' in info:
-        generic_arch = llnl.util.cpu.host().family
+        generic_arch = spack.architecture.host().family
         module_spec = 'environment-modules target={0}'.format(generic_arch)
         specs = spack.store.db.query(module_spec)
         if specs:
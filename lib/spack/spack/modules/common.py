@@ -31,21 +31,30 @@
 import collections
 import copy
 import datetime
+import hashlib
 import inspect
+import json
+import multiprocessing
 import os.path
 import re
 
 import llnl.util.filesystem
 import llnl.util.tty as tty
+import spack
 import spack.build_environment as build_environment
+import spack.caches
+import spack.config
 import spack.error
 import spack.paths
 import spack.schema.environment
 import spack.projections as proj
+import spack.repo
 import spack.tengine as tengine
 import spack.util.environment
 import spack.util.file_permissions as fp
+import spack.util.lock
 import spack.util.path
+import spack.util.source_digest
 import spack.util.spack_yaml as syaml
 
 
@@ -221,25 +230,258 @@ def root_path(name):
     return spack.util.path.canonicalize_path(path)
 
 
-def generate_module_index(root, modules, overwrite=False):
-    index_path = os.path.join(root, 'module-index.yaml')
-    if overwrite or not os.path.exists(index_path):
-        entries = syaml.syaml_dict()
-    else:
-        with open(index_path) as index_file:
-            yaml_content = syaml.load(index_file)
-            entries = yaml_content['module_index']
-
-    for m in modules:
-        entry = {
-            'path': m.layout.filename,
-            'use_name': m.layout.use_name
-        }
-        entries[m.spec.dag_hash()] = entry
-    index = {'module_index': entries}
+#: Name of the index of the module files in a module root
+module_index_name = 'module-index.json'
+
+#: Name of the YAML index written by older versions of Spack, which is
+#: read when there is no ``module_index_name`` in a module root, and removed
+#: when the index is written in the new format
+legacy_module_index_name = 'module-index.yaml'
+
+#: The index is compacted when it has more than this many superseded lines
+#: and more superseded lines than current entries
+module_index_slack = 64
+
+
+def module_index_entry(writer, inputs=None):
+    """Entry of the index of module files for the module file of
+    ``writer``, with the digest of its inputs if it is in ``inputs``."""
+    inputs = inputs or {}
+    entry = {
+        'path': writer.layout.filename,
+        'use_name': writer.layout.use_name
+    }
+    dag_hash = writer.spec.dag_hash()
+    if dag_hash in inputs:
+        entry['inputs'] = inputs[dag_hash]
+    return entry
+
+
+def generate_module_index(root, modules, overwrite=False, inputs=None):
+    """Write the index of the module files in ``root``.
+
+    Args:
+        root (str): root directory of the module files
+        modules (list): writers of the module files to be indexed
+        overwrite (bool): if False, entries of the index that are not
+            in ``modules`` are kept
+        inputs (dict): digests of the inputs of module files that are up
+            to date (see ``ModuleInputs``), by DAG hash
+    """
+    inputs = inputs or {}
+    entries = dict((m.spec.dag_hash(), module_index_entry(m, inputs))
+                   for m in modules)
+    update_module_index(root, add=entries, overwrite=overwrite)
+
+
+def update_module_index(root, add=None, remove=None, overwrite=False):
+    """Add entries to and remove entries from the index of the module
+    files in ``root``.
+
+    The index has one JSON line per change, and later lines supersede
+    earlier ones for the same DAG hash. Changes are appended to it, so
+    that the cost of an update does not depend on the size of the index,
+    and the index is rewritten only when it has too many superseded lines.
+
+    Args:
+        root (str): root directory of the module files
+        add (dict): entries to be added or updated, by DAG hash
+        remove (list): DAG hashes of the entries to be removed
+        overwrite (bool): if True, the index is replaced by ``add``
+    """
+    add = add or {}
+    remove = [h for h in remove or [] if h not in add]
+    index_path = os.path.join(root, module_index_name)
+
     llnl.util.filesystem.mkdirp(root)
-    with open(index_path, 'w') as index_file:
-        syaml.dump(index, default_flow_style=False, stream=index_file)
+    lock = spack.util.lock.Lock(os.path.join(root, '.module-index.lock'))
+    with spack.util.lock.WriteTransaction(lock):
+        if overwrite:
+            _write_module_index(index_path, add)
+            return
+
+        if os.path.exists(index_path):
+            entries, lines = _read_module_index_lines(index_path)
+        else:
+            entries = dict(
+                (h, dict((k, v) for k, v in e._asdict().items()
+                         if v is not None))
+                for h, e in _read_legacy_module_index(root).items())
+            lines = None
+
+        changes = [(h, e) for h, e in sorted(add.items())
+                   if entries.get(h) != e]
+        changes.extend((h, None) for h in remove if h in entries)
+        for dag_hash, entry in changes:
+            if entry is None:
+                del entries[dag_hash]
+            else:
+                entries[dag_hash] = entry
+
+        superseded = (lines or 0) + len(changes) - len(entries)
+        if lines is None or (superseded > module_index_slack and
+                             superseded > len(entries)):
+            _write_module_index(index_path, entries)
+        elif changes:
+            with open(index_path, 'a') as index_file:
+                index_file.write(
+                    ''.join(_module_index_line(h, e) for h, e in changes))
+
+
+def _module_index_line(dag_hash, entry):
+    return json.dumps([dag_hash, entry], sort_keys=True) + '\n'
+
+
+def _write_module_index(index_path, entries):
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w') as index_file:
+        index_file.write(''.join(
+            _module_index_line(h, e) for h, e in sorted(entries.items())))
+    os.rename(tmp_path, index_path)
+
+    # The legacy index is not updated any more, and would go stale
+    legacy_path = os.path.join(
+        os.path.dirname(index_path), legacy_module_index_name)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+def _read_module_index_lines(index_path):
+    """Current entries of a module index, and the number of its lines."""
+    entries = {}
+    lines = 0
+    with open(index_path) as index_file:
+        for line in index_file:
+            try:
+                dag_hash, entry = json.loads(line)
+            except ValueError:
+                # A line being appended by another process
+                tty.debug('Skipping a line of {0}'.format(index_path))
+                continue
+            lines += 1
+            if entry is None:
+                entries.pop(dag_hash, None)
+            else:
+                entries[dag_hash] = entry
+    return entries, lines
+
+
+class ModuleInputs(object):
+    """Digests of what the content of module files depends on.
+
+    The digest of a module file covers its path, the DAG hash of its spec,
+    the modification time of the package files of the DAG, the ``modules``
+    configuration, the templates and the version and source of Spack.
+    Module files
+    whose digest did not change since they were written need not be
+    written again.
+    """
+
+    def __init__(self):
+        templates_mtime = 0
+        for root in tengine.template_dirs():
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    templates_mtime = max(
+                        templates_mtime, os.path.getmtime(path))
+
+        data = json.dumps(
+            [str(spack.spack_version),
+             spack.util.source_digest.source_digest(),
+             configuration(), templates_mtime],
+            sort_keys=True, default=str)
+        self._common = hashlib.sha1(data.encode('utf-8')).hexdigest()
+        self._package_mtimes = {}
+
+    def _package_mtime(self, spec):
+        key = (spec.namespace, spec.name)
+        if key not in self._package_mtimes:
+            try:
+                repo = spack.repo.path.repo_for_pkg(spec)
+                mtime = os.path.getmtime(
+                    repo.filename_for_package_name(spec.name))
+            except (spack.repo.UnknownEntityError, OSError):
+                mtime = None
+            self._package_mtimes[key] = mtime
+        return self._package_mtimes[key]
+
+    def digest(self, writer):
+        """Digest of the inputs of the module file of ``writer``."""
+        spec = writer.spec
+        data = json.dumps([
+            self._common, writer.layout.filename, spec.dag_hash(),
+            [(s.name, self._package_mtime(s)) for s in spec.traverse()]
+        ])
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+#: Writers of the module files written by ``write_modules``, shared with
+#: the processes that write them
+_writers = []
+
+
+def _write_module_file(i):
+    """Write the module file of ``_writers[i]``, and return None, or an
+    error message if it could not be written."""
+    try:
+        _writers[i].write(overwrite=True)
+    except Exception as e:
+        tty.debug(e)
+        return str(e)
+    return None
+
+
+def write_modules(writers, jobs=None):
+    """Write the module files of ``writers``, overwriting existing ones.
+
+    Module files are written by ``jobs`` processes (by default, one per
+    CPU) forked from this one, where forking is supported. The templates
+    are compiled before, once for all the processes.
+
+    Returns:
+        (list): ``(writer, message)`` pairs for the module files that could
+            not be written
+    """
+    global _writers
+    jobs = jobs or multiprocessing.cpu_count()
+    jobs = min(jobs, len(writers))
+
+    if hasattr(multiprocessing, 'get_context'):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            jobs = 1
+        else:
+            context = multiprocessing.get_context('fork')
+    else:
+        # Python 2 always forks
+        context = multiprocessing
+
+    if jobs > 1:
+        env = tengine.make_environment()
+        templates = set(w.conf.template or w.default_template
+                        for w in writers)
+        for name in templates:
+            try:
+                env.get_template(name)
+            except Exception as e:
+                # Reported by the writers
+                tty.debug(e)
+
+    _writers = writers
+    try:
+        if jobs > 1:
+            pool = context.Pool(jobs)
+            try:
+                errors = pool.map(_write_module_file, range(len(writers)))
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            errors = [_write_module_file(i) for i in range(len(writers))]
+    finally:
+        _writers = []
+
+    return [(w, e) for w, e in zip(writers, errors) if e is not None]
 
 
 def _generate_upstream_module_index():
@@ -253,11 +495,27 @@ def _generate_upstream_module_index():
 
 
 ModuleIndexEntry = collections.namedtuple(
-    'ModuleIndexEntry', ['path', 'use_name'])
+    'ModuleIndexEntry', ['path', 'use_name', 'inputs'])
 
 
 def read_module_index(root):
-    index_path = os.path.join(root, 'module-index.yaml')
+    """Read the index of the module files in ``root``.
+
+    Returns:
+        (dict): ``ModuleIndexEntry`` objects, by DAG hash
+    """
+    index_path = os.path.join(root, module_index_name)
+    if not os.path.exists(index_path):
+        return _read_legacy_module_index(root)
+    entries, _ = _read_module_index_lines(index_path)
+    return dict(
+        (dag_hash, ModuleIndexEntry(
+            entry['path'], entry['use_name'], entry.get('inputs')))
+        for dag_hash, entry in entries.items())
+
+
+def _read_legacy_module_index(root):
+    index_path = os.path.join(root, legacy_module_index_name)
     if not os.path.exists(index_path):
         return {}
     with open(index_path, 'r') as index_file:
@@ -274,7 +532,8 @@ def _read_module_index(str_or_file):
     for dag_hash, module_properties in yaml_index.items():
         index[dag_hash] = ModuleIndexEntry(
             module_properties['path'],
-            module_properties['use_name'])
+            module_properties['use_name'],
+            module_properties.get('inputs'))
     return index
 
 
@@ -288,12 +547,57 @@ def read_module_indices():
         module_type_to_index = {}
         module_type_to_root = install_properties.get('modules', {})
         for module_type, root in module_type_to_root.items():
-            module_type_to_index[module_type] = read_module_index(root)
+            module_type_to_index[module_type] = \
+                _read_upstream_module_index(root)
         module_indices.append(module_type_to_index)
 
     return module_indices
 
 
+def _read_upstream_module_index(root):
+    """Read the index of the module files in ``root``, a module root of an
+    upstream Spack instance.
+
+    Upstream indices are copied to the misc cache once read, and the copy
+    is used for as long as the modification time and size of the index do
+    not change.
+    """
+    for name in (module_index_name, legacy_module_index_name):
+        try:
+            st = os.stat(os.path.join(root, name))
+            break
+        except OSError:
+            continue
+    else:
+        return {}
+    stamp = [name, st.st_mtime, st.st_size]
+
+    misc_cache = spack.caches.misc_cache
+    key = 'modules/{0}-index.json'.format(
+        hashlib.sha1(root.encode('utf-8')).hexdigest())
+    try:
+        if misc_cache.init_entry(key):
+            with misc_cache.read_transaction(key) as f:
+                cached = json.load(f)
+            if cached['stamp'] == stamp:
+                return dict(
+                    (dag_hash, ModuleIndexEntry(*entry))
+                    for dag_hash, entry in cached['index'].items())
+    except Exception as e:
+        tty.debug('Cannot read the cached module index of {0}: {1}'
+                  .format(root, str(e)))
+
+    index = read_module_index(root)
+    try:
+        misc_cache.init_entry(key)
+        with misc_cache.write_transaction(key) as (old, new):
+            json.dump({'stamp': stamp, 'index': index}, new)
+    except (IOError, OSError, spack.error.SpackError) as e:
+        tty.debug('Cannot cache the module index of {0}: {1}'
+                  .format(root, str(e)))
+    return index
+
+
 class UpstreamModuleIndex(object):
     """This is responsible for taking the individual module indices of all
        upstream Spack installations and locating the module for a given spec
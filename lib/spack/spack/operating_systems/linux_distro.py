@@ -4,7 +4,19 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import re
-from spack.architecture import OperatingSystem
+from spack.architecture import OperatingSystem, host_cache_value
+
+
+def linux_distribution():
+    """Returns the name and the version of the Linux distribution."""
+    try:
+        # This will throw an error if imported on a non-Linux platform.
+        from external.distro import linux_distribution
+        distname, version, _ = linux_distribution(
+            full_distribution_name=False)
+        return str(distname), str(version)
+    except ImportError:
+        return 'unknown', ''
 
 
 class LinuxDistro(OperatingSystem):
@@ -16,14 +28,9 @@ class LinuxDistro(OperatingSystem):
     """
 
     def __init__(self):
-        try:
-            # This will throw an error if imported on a non-Linux platform.
-            from external.distro import linux_distribution
-            distname, version, _ = linux_distribution(
-                full_distribution_name=False)
-            distname, version = str(distname), str(version)
-        except ImportError:
-            distname, version = 'unknown', ''
+        distname, version = host_cache_value(
+            'linux_distribution', linux_distribution)
+        distname, version = str(distname), str(version)
 
         # Grabs major version from tuple on redhat; on other platforms
         # grab the first legal identifier in the version field.  On
@@ -28,6 +28,7 @@
 import six
 
 import llnl.util.tty as tty
+import llnl.util.tty.log as log
 import spack.compilers
 import spack.config
 import spack.dependency
@@ -44,6 +45,7 @@
 import spack.store
 import spack.url
 import spack.util.environment
+import spack.util.tracing
 import spack.util.web
 from llnl.util.filesystem import mkdirp, touch, working_dir
 from llnl.util.lang import memoized
@@ -73,6 +75,26 @@
 _spack_configure_argsfile = 'spack-configure-args.txt'
 
 
+def build_log_compression():
+    """Compression of new build logs, from ``config:build_log_compression``,
+    or None if they are not compressed."""
+    compression = spack.config.get('config:build_log_compression', 'none')
+    if compression == 'none':
+        return None
+    if not log.compression_supported(compression):
+        tty.debug('Cannot compress build logs with {0}, using gzip'
+                  .format(compression))
+        return 'gzip'
+    return compression
+
+
+def _build_log_name():
+    """Filename of new build logs, with the extension of their compression.
+    """
+    return _spack_build_logfile + log.log_compressions.get(
+        build_log_compression(), '')
+
+
 class InstallPhase(object):
     """Manages a single phase of the installation.
 
@@ -656,6 +678,9 @@ def __init__(self, spec):
         self._fetch_time = 0.0
         self._total_time = 0.0
 
+        # End of the output of the last build, kept by the installer
+        self._log_tail = None
+
         if self.is_extension:
             spack.repo.get(self.extendee_spec)._check_extendable()
 
@@ -989,7 +1014,7 @@ def log_path(self):
                 return old_log
 
         # Otherwise, return the current log path name.
-        return os.path.join(self.stage.path, _spack_build_logfile)
+        return os.path.join(self.stage.path, _build_log_name())
 
     @property
     def install_log_path(self):
@@ -1002,8 +1027,14 @@ def install_log_path(self):
             if os.path.exists(old_log):
                 return old_log
 
-        # Otherwise, return the current install log path name.
-        return os.path.join(install_path, _spack_build_logfile)
+        # Otherwise, return the name of the existing log, which may have
+        # been compressed, or the current install log path name.
+        for ext in [''] + sorted(log.log_compressions.values()):
+            install_log = os.path.join(
+                install_path, _spack_build_logfile + ext)
+            if os.path.exists(install_log):
+                return install_log
+        return os.path.join(install_path, _build_log_name())
 
     @property
     def configure_args_path(self):
@@ -1210,6 +1241,7 @@ def remove_prefix(self):
         """
         spack.store.layout.remove_install_directory(self.spec)
 
+    @spack.util.tracing.traced('fetch', 'phase')
     def do_fetch(self, mirror_only=False):
         """
         Creates a stage directory and downloads the tarball for this package.
@@ -1257,6 +1289,7 @@ def do_fetch(self, mirror_only=False):
             if patch.stage:
                 patch.stage.cache_local()
 
+    @spack.util.tracing.traced('stage', 'phase')
     def do_stage(self, mirror_only=False):
         """Unpacks and expands the fetched tarball."""
         if not self.spec.concrete:
@@ -1277,6 +1310,7 @@ def do_stage(self, mirror_only=False):
             # Support for post-install hooks requires a stage.source_path
             mkdirp(self.stage.source_path)
 
+    @spack.util.tracing.traced('patch', 'phase')
     def do_patch(self):
         """Applies patches if they haven't been applied already."""
         if not self.spec.concrete:
@@ -1836,32 +1870,13 @@ def uninstall_by_spec(spec, force=False, deprecator=None):
                 raise PackageStillNeededError(spec, dependents)
 
         # Try to get the package for the spec
-        try:
-            pkg = spec.package
-        except spack.repo.UnknownEntityError:
-            pkg = None
+        pkg = Package._package_to_uninstall(spec)
 
         # Pre-uninstall hook runs first.
         with spack.store.db.prefix_write_lock(spec):
 
             if pkg is not None:
-                try:
-                    spack.hooks.pre_uninstall(spec)
-                except Exception as error:
-                    if force:
-                        error_msg = (
-                            "One or more pre_uninstall hooks have failed"
-                            " for {0}, but Spack is continuing with the"
-                            " uninstall".format(str(spec)))
-                        if isinstance(error, spack.error.SpackError):
-                            error_msg += (
-                                "\n\nError message: {0}".format(str(error)))
-                        tty.warn(error_msg)
-                        # Note that if the uninstall succeeds then we won't be
-                        # seeing this error again and won't have another chance
-                        # to run the hook.
-                    else:
-                        raise
+                Package._pre_uninstall(spec, force)
 
             # Uninstalling in Spack only requires removing the prefix.
             if not spec.external:
@@ -1882,22 +1897,157 @@ def uninstall_by_spec(spec, force=False, deprecator=None):
                 spack.store.db.remove(spec)
 
         if pkg is not None:
+            Package._post_uninstall(spec)
+
+        tty.msg('Successfully uninstalled {0}'.format(spec.short_spec))
+
+    @staticmethod
+    def uninstall_by_specs(specs, force=False, jobs=None):
+        """Uninstall many specs at once.
+
+        This does what ``uninstall_by_spec()`` does for each spec, but the
+        database is updated in a single write transaction, and the prefixes
+        are moved to the trash of the store and deleted by ``jobs`` threads
+        (by default, one per CPU) once the database is updated.
+
+        Specs are uninstalled one at a time, dependents before their
+        dependencies, as extensions are deactivated before their extendee
+        goes away: the pre-uninstall hooks of a spec run right before its
+        prefix is removed. If the hooks of a spec fail, the specs before it
+        stay uninstalled, and the others are left untouched.
+
+        Args:
+            specs (list): installed specs to uninstall
+            force (bool): uninstall even if other installed specs depend on
+                some of ``specs``, and despite failing pre-uninstall hooks
+            jobs (int): number of threads deleting prefixes
+        """
+        db = spack.store.db
+        layout = spack.store.layout
+
+        # Dependents come before their dependencies
+        hashes = set(s.dag_hash() for s in specs)
+        ordered, visited = [], set()
+        for spec in specs:
+            for node in spec.traverse(order='post', visited=visited,
+                                      key=lambda s: s.dag_hash()):
+                if node.dag_hash() in hashes:
+                    ordered.append(node)
+        ordered.reverse()
+
+        with db.read_transaction():
+            if not force:
+                dependents = db.installed_dependents(ordered)
+                for spec in ordered:
+                    if spec.dag_hash() in dependents:
+                        raise PackageStillNeededError(
+                            spec, dependents[spec.dag_hash()])
+
+            deprecated = set(s.dag_hash() for s in ordered
+                             if db.deprecator(s))
+
+        # Like uninstall_by_spec(), specs whose prefix is gone are only
+        # removed from the database, without running hooks
+        stale = set(s.dag_hash() for s in ordered
+                    if not os.path.isdir(s.prefix))
+        packages = dict(
+            (s.dag_hash(), Package._package_to_uninstall(s))
+            for s in ordered if s.dag_hash() not in stale)
+
+        locks, uninstalled = [], []
+        try:
+            for spec in ordered:
+                lock = db.prefix_lock(spec)
+                lock.acquire_write()
+                locks.append(lock)
+
             try:
-                spack.hooks.post_uninstall(spec)
-            except Exception:
-                # If there is a failure here, this is our only chance to do
-                # something about it: at this point the Spec has been removed
-                # from the DB and prefix, so the post-uninstallation hooks
-                # will not have another chance to run.
+                for spec in ordered:
+                    if packages.get(spec.dag_hash()) is not None:
+                        Package._pre_uninstall(spec, force)
+                    if not spec.external and spec.dag_hash() not in stale:
+                        tty.debug('Moving package prefix [{0}] to the trash'
+                                  .format(spec.short_spec))
+                        layout.trash_install_directory(
+                            spec, spec.dag_hash() in deprecated)
+                    uninstalled.append(spec)
+            finally:
+                # Update the database for the specs that were uninstalled,
+                # even if some of the others could not be
+                with db.write_transaction():
+                    for spec in uninstalled:
+                        tty.debug('Deleting DB entry [{0}]'
+                                  .format(spec.short_spec))
+                        db.remove(spec)
+        finally:
+            for lock in locks:
+                lock.release_write()
+
+            # This also deletes what interrupted removals left in the trash
+            errors = layout.empty_trash(jobs)
+
+            # The specs that were uninstalled before a failure get their
+            # post-uninstall hooks too
+            for spec in uninstalled:
+                if spec.dag_hash() in stale:
+                    tty.debug('Removed stale DB entry for {0}'
+                              .format(spec.short_spec))
+                    continue
+                if packages[spec.dag_hash()] is not None:
+                    Package._post_uninstall(spec)
+                tty.msg('Successfully uninstalled {0}'
+                        .format(spec.short_spec))
+
+            for path, error in errors:
+                tty.warn('Could not delete {0}: {1}'.format(path, str(error)))
+
+    @staticmethod
+    def _package_to_uninstall(spec):
+        """Return the package of a spec being uninstalled, or None if the
+        package is no longer known to Spack."""
+        try:
+            return spec.package
+        except spack.repo.UnknownEntityError:
+            return None
+
+    @staticmethod
+    def _pre_uninstall(spec, force):
+        """Run the pre-uninstall hooks, which may fail only if forced."""
+        try:
+            spack.hooks.pre_uninstall(spec)
+        except Exception as error:
+            if force:
                 error_msg = (
-                    "One or more post-uninstallation hooks failed for"
-                    " {0}, but the prefix has been removed (if it is not"
-                    " external).".format(str(spec)))
-                tb_msg = traceback.format_exc()
-                error_msg += "\n\nThe error:\n\n{0}".format(tb_msg)
+                    "One or more pre_uninstall hooks have failed"
+                    " for {0}, but Spack is continuing with the"
+                    " uninstall".format(str(spec)))
+                if isinstance(error, spack.error.SpackError):
+                    error_msg += (
+                        "\n\nError message: {0}".format(str(error)))
                 tty.warn(error_msg)
+                # Note that if the uninstall succeeds then we won't be
+                # seeing this error again and won't have another chance
+                # to run the hook.
+            else:
+                raise
 
-        tty.msg('Successfully uninstalled {0}'.format(spec.short_spec))
+    @staticmethod
+    def _post_uninstall(spec):
+        """Run the post-uninstall hooks, warning about their failures."""
+        try:
+            spack.hooks.post_uninstall(spec)
+        except Exception:
+            # If there is a failure here, this is our only chance to do
+            # something about it: at this point the Spec has been removed
+            # from the DB and prefix, so the post-uninstallation hooks
+            # will not have another chance to run.
+            error_msg = (
+                "One or more post-uninstallation hooks failed for"
+                " {0}, but the prefix has been removed (if it is not"
+                " external).".format(str(spec)))
+            tb_msg = traceback.format_exc()
+            error_msg += "\n\nThe error:\n\n{0}".format(tb_msg)
+            tty.warn(error_msg)
 
     def do_uninstall(self, force=False):
         """Uninstall this package by spec."""
@@ -48,6 +48,14 @@
 #: User configuration location
 user_config_path = os.path.expanduser('~/.spack')
 
+#: Cache of merged configuration sections. It cannot be in the misc_cache,
+#: whose location is only known once the configuration is read.
+user_config_cache_path = os.path.join(user_config_path, 'cache', 'config')
+
+#: Cache of what is detected on each host, like its target and OS. It
+#: cannot be in the misc_cache either, as the configuration depends on it.
+user_host_cache_path = os.path.join(user_config_path, 'cache', 'host')
+
 
 opt_path        = os.path.join(prefix, "opt")
 etc_path        = os.path.join(prefix, "etc")
@@ -11,7 +11,7 @@
 import llnl.util.tty as tty
 from spack.paths import build_env_path
 from spack.util.executable import Executable
-from spack.architecture import Platform, Target, NoPlatformError
+from spack.architecture import Platform, Target, NoPlatformError, host
 from spack.operating_systems.cray_frontend import CrayFrontend
 from spack.operating_systems.cray_backend import CrayBackend
 from spack.util.module_cmd import module
@@ -63,7 +63,7 @@ def __init__(self):
         for name in cpu.targets:
             if name not in self.targets:
                 self.add_target(name, Target(name))
-        self.front_end = os.environ.get('SPACK_FRONT_END', cpu.host().name)
+        self.front_end = os.environ.get('SPACK_FRONT_END', host().name)
         if self.front_end not in self.targets:
             self.add_target(self.front_end, Target(self.front_end))
 
@@ -143,13 +143,13 @@ def _default_target_from_env(self):
                 tty.debug("Found default module:%s" % default_from_module)
                 return default_from_module
             else:
-                front_end = cpu.host().name
+                front_end = host().name
                 if front_end in list(
                         map(lambda x: _target_name_from_craype_target_name(x),
                             self._avail_targets())
                 ):
                     tty.debug("default to front-end architecture")
-                    return cpu.host().name
+                    return host().name
                 else:
                     return platform.machine()
 
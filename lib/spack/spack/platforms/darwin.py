@@ -5,7 +5,7 @@
 
 import platform
 import llnl.util.cpu as cpu
-from spack.architecture import Platform, Target
+from spack.architecture import Platform, Target, host
 from spack.operating_systems.mac_os import MacOs
 
 
@@ -18,7 +18,7 @@ def __init__(self):
         for name in cpu.targets:
             self.add_target(name, Target(name))
 
-        self.default = cpu.host().name
+        self.default = host().name
         self.front_end = self.default
         self.back_end = self.default
 
@@ -4,7 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import platform
-from spack.architecture import Platform, Target
+from spack.architecture import Platform, Target, host
 from spack.operating_systems.linux_distro import LinuxDistro
 import llnl.util.cpu as cpu
 
@@ -19,7 +19,7 @@ def __init__(self):
             self.add_target(name, Target(name))
 
         # Get specific default
-        self.default = cpu.host().name
+        self.default = host().name
         self.front_end = self.default
         self.back_end = self.default
 
@@ -8,13 +8,16 @@
 import contextlib
 import errno
 import functools
+import hashlib
 import inspect
 import itertools
+import json
 import os
 import re
 import shutil
 import stat
 import sys
+import time
 import traceback
 import types
 
@@ -32,6 +35,7 @@
 import llnl.util.filesystem as fs
 import spack.config
 import spack.caches
+import spack.dependency
 import spack.error
 import spack.patch
 import spack.spec
@@ -109,6 +113,13 @@ def __getattr__(self, name):
         return getattr(self, name)
 
 
+#: Stats of a 'package.py' file kept by ``FastPackageChecker``
+PackageStat = collections.namedtuple('PackageStat', ['st_mtime', 'st_size'])
+
+#: Version of the format of package manifests in the misc cache
+manifest_version = 1
+
+
 class FastPackageChecker(Mapping):
     """Cache that maps package names to the stats obtained on the
     'package.py' files associated with them.
@@ -134,6 +145,49 @@ def __init__(self, packages_path):
     def _create_new_cache(self):
         """Create a new cache for packages in a repo.
 
+        If ``config:repo_manifest_ttl`` is set, the stats are also stored
+        in a manifest in the misc cache, which is trusted for that many
+        seconds. In the meantime, only the packages added to the repository
+        since the manifest was written are stat'ed. They are detected by
+        the modification time of the packages directory.
+        """
+        ttl = spack.config.get('config:repo_manifest_ttl', 0)
+        if not ttl:
+            return self._stat_packages(os.listdir(self.packages_path))
+
+        manifest = self._read_manifest()
+
+        # Taken before listing the directory, so that packages added in
+        # the meantime are found by the next process
+        dir_mtime = os.stat(self.packages_path).st_mtime
+
+        if manifest and time.time() - manifest['validated'] < ttl:
+            cache = dict((str(name), PackageStat(*st))
+                         for name, st in manifest['packages'].items())
+            if manifest['mtime'] == dir_mtime:
+                return cache
+
+            # Packages were added or removed
+            names = os.listdir(self.packages_path)
+            cache = dict((n, cache[n]) for n in names if n in cache)
+            cache.update(self._stat_packages(
+                n for n in names if n not in cache))
+            validated = manifest['validated']
+        else:
+            cache = self._stat_packages(os.listdir(self.packages_path))
+            validated = time.time()
+
+        self._write_manifest({
+            'mtime': dir_mtime,
+            'validated': validated,
+            'packages': dict((name, list(st)) for name, st in cache.items()),
+        })
+        return cache
+
+    def _stat_packages(self, entries):
+        """Stat the 'package.py' files of the given entries of the packages
+        directory.
+
         The implementation here should try to minimize filesystem
         calls.  At the moment, it is O(number of packages) and makes
         about one stat call per package.  This is reasonably fast, and
@@ -142,7 +196,7 @@ def _create_new_cache(self):
         # Create a dictionary that will store the mapping between a
         # package name and its stat info
         cache = {}
-        for pkg_name in os.listdir(self.packages_path):
+        for pkg_name in entries:
             # Skip non-directories in the package root.
             pkg_dir = os.path.join(self.packages_path, pkg_name)
 
@@ -177,10 +231,44 @@ def _create_new_cache(self):
 
             # If it is a file, then save the stats under the
             # appropriate key
-            cache[pkg_name] = sinfo
+            cache[pkg_name] = PackageStat(sinfo.st_mtime, sinfo.st_size)
 
         return cache
 
+    def _manifest_key(self):
+        digest = hashlib.sha1(self.packages_path.encode('utf-8')).hexdigest()
+        return 'packages/{0}-manifest.json'.format(digest)
+
+    def _read_manifest(self):
+        """Manifest of the repository stored in the misc cache, or None."""
+        misc_cache = spack.caches.misc_cache
+        key = self._manifest_key()
+        try:
+            if not misc_cache.init_entry(key):
+                return None
+            with misc_cache.read_transaction(key) as f:
+                manifest = json.load(f)
+        except Exception as e:
+            tty.debug('Cannot read the manifest of {0}: {1}'
+                      .format(self.packages_path, str(e)))
+            return None
+
+        if manifest.get('version') != manifest_version:
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest):
+        manifest['version'] = manifest_version
+        misc_cache = spack.caches.misc_cache
+        key = self._manifest_key()
+        try:
+            misc_cache.init_entry(key)
+            with misc_cache.write_transaction(key) as (old, new):
+                json.dump(manifest, new)
+        except (IOError, OSError, spack.error.SpackError) as e:
+            tty.debug('Cannot write the manifest of {0}: {1}'
+                      .format(self.packages_path, str(e)))
+
     def last_mtime(self):
         return max(
             sinfo.st_mtime for sinfo in self._packages_to_stats.values())
@@ -244,6 +332,204 @@ def update_package(self, pkg_name):
             self._tag_dict[tag].append(package.name)
 
 
+class DependencyIndex(object):
+    """Graph of the possible dependencies and virtual providers of the
+    packages in a repository.
+
+    For each package, the index records the names of its possible
+    dependencies, with the union of their dependency types over all
+    conditions, and the names of the virtual packages it can provide. It
+    answers questions about the package graph (dependents, transitive
+    closures, providers of virtuals) without loading package classes.
+    """
+
+    def __init__(self):
+        #: Maps package names to ``{dependency name: [deptypes]}``
+        self._dependencies = {}
+
+        #: Maps package names to the names of the virtuals they provide
+        self._provided = {}
+
+        # Derived maps, computed lazily and reset on every update
+        self._dependents = None
+        self._providers = None
+
+    def to_json(self, stream):
+        sjson.dump({'dependencies': self._dependencies,
+                    'provided': self._provided}, stream)
+
+    @staticmethod
+    def from_json(stream):
+        d = sjson.load(stream)
+
+        r = DependencyIndex()
+        r._dependencies = d['dependencies']
+        r._provided = d['provided']
+        return r
+
+    def __contains__(self, pkg_name):
+        return pkg_name in self._dependencies
+
+    def __iter__(self):
+        return iter(self._dependencies)
+
+    def __len__(self):
+        return len(self._dependencies)
+
+    def _reset(self):
+        self._dependents = None
+        self._providers = None
+
+    def update_package(self, pkg_name):
+        """Updates a package in the dependency index.
+
+        Args:
+            pkg_name (str): name of the package to be updated, possibly
+                with its namespace
+        """
+        pkg_cls = path.get_pkg_class(pkg_name)
+
+        # Don't rely on pkg_cls.name, which subclasses of other packages
+        # may inherit from their base class
+        name = pkg_name.split('.')[-1]
+
+        deps = {}
+        for dep_name, conditions in pkg_cls.dependencies.items():
+            deptypes = set()
+            for dependency in conditions.values():
+                deptypes.update(dependency.type)
+            deps[dep_name] = sorted(deptypes)
+
+        self._dependencies[name] = deps
+        self._provided[name] = sorted(
+            set(s.name for s in pkg_cls.provided))
+        self._reset()
+
+    def remove_package(self, pkg_name):
+        """Removes a package from the dependency index, if present."""
+        self._dependencies.pop(pkg_name, None)
+        self._provided.pop(pkg_name, None)
+        self._reset()
+
+    def merge(self, other, pkg_names=None):
+        """Merge another dependency index into this one.
+
+        Packages of ``other`` replace those with the same name in this
+        index. If ``pkg_names`` is given, only those packages are merged.
+        """
+        for name, deps in other._dependencies.items():
+            if pkg_names is None or name in pkg_names:
+                self._dependencies[name] = deps
+                self._provided[name] = other._provided.get(name, [])
+        self._reset()
+
+    @property
+    def providers(self):
+        """Dictionary mapping virtual names to the set of the names of the
+        packages that can provide them."""
+        if self._providers is None:
+            self._providers = {}
+            for name, virtuals in self._provided.items():
+                for virtual in virtuals:
+                    self._providers.setdefault(virtual, set()).add(name)
+        return self._providers
+
+    def is_virtual(self, name):
+        """Whether ``name`` is a virtual provided by some package."""
+        return name in self.providers
+
+    def providers_for(self, virtual):
+        """Sorted names of the packages that can provide ``virtual``."""
+        return sorted(self.providers.get(virtual, ()))
+
+    def dependencies_of(self, pkg_name, deptype='all'):
+        """Dictionary mapping the names of the possible dependencies of a
+        package with one of the types in ``deptype`` to their types."""
+        deptype = spack.dependency.canonical_deptype(deptype)
+        return dict(
+            (name, deptypes) for name, deptypes in
+            self._dependencies.get(pkg_name, {}).items()
+            if any(t in deptype for t in deptypes))
+
+    def inverted(self, deptype='all', expand_virtuals=True):
+        """Dictionary mapping names to the set of the names of the packages
+        that can depend on them.
+
+        Every package in the index is a key. Virtual dependencies are keys
+        as well and, if ``expand_virtuals`` is True, packages depending on
+        a virtual are also dependents of all its providers.
+        """
+        deptype = spack.dependency.canonical_deptype(deptype)
+        if deptype == spack.dependency.all_deptypes and expand_virtuals:
+            if self._dependents is None:
+                self._dependents = self._invert(deptype, True)
+            return self._dependents
+        return self._invert(deptype, expand_virtuals)
+
+    def _invert(self, deptype, expand_virtuals):
+        dag = dict((name, set()) for name in self._dependencies)
+        providers = self.providers
+        for name, deps in self._dependencies.items():
+            for dep_name, deptypes in deps.items():
+                if not any(t in deptype for t in deptypes):
+                    continue
+
+                dag.setdefault(dep_name, set()).add(name)
+                if expand_virtuals and self.is_virtual(dep_name):
+                    for provider in providers[dep_name]:
+                        dag.setdefault(provider, set()).add(name)
+        return dag
+
+    def dependents_of(self, pkg_name, deptype='all', transitive=False,
+                      expand_virtuals=True):
+        """Set of the names of the packages that can depend on a package.
+
+        Args:
+            pkg_name (str): name of a package or of a virtual
+            deptype (str or tuple): dependency types to be followed
+            transitive (bool): return transitive dependents if True
+            expand_virtuals (bool): whether packages depending on a virtual
+                are dependents of its providers
+        """
+        dag = self.inverted(deptype, expand_virtuals)
+        if not transitive:
+            return set(dag.get(pkg_name, ())) - set([pkg_name])
+        return self._closure(pkg_name, lambda n: dag.get(n, ()))
+
+    def possible_dependencies(self, pkg_name, deptype='all',
+                              expand_virtuals=True):
+        """Set of the names of all the packages a package can depend on,
+        directly or transitively.
+
+        If ``expand_virtuals`` is True, virtual dependencies are replaced
+        by all their providers.
+        """
+        deptype = spack.dependency.canonical_deptype(deptype)
+
+        def _direct(name):
+            if expand_virtuals and self.is_virtual(name):
+                return self.providers[name]
+            deps = self._dependencies.get(name, {})
+            return [d for d, deptypes in deps.items()
+                    if any(t in deptype for t in deptypes)]
+
+        result = self._closure(pkg_name, _direct)
+        if expand_virtuals:
+            result = set(n for n in result if not self.is_virtual(n))
+        return result
+
+    def _closure(self, start, neighbors):
+        visited = set([start])
+        stack = [start]
+        while stack:
+            for name in neighbors(stack.pop()):
+                if name not in visited:
+                    visited.add(name)
+                    stack.append(name)
+        visited.discard(start)
+        return visited
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Indexer(object):
     """Adaptor for indexes that need to be generated when repos are updated."""
@@ -299,6 +585,21 @@ def write(self, stream):
         self.index.to_json(stream)
 
 
+class DependencyIndexer(Indexer):
+    """Lifecycle methods for a DependencyIndex on a Repo."""
+    def _create(self):
+        return DependencyIndex()
+
+    def read(self, stream):
+        self.index = DependencyIndex.from_json(stream)
+
+    def update(self, pkg_fullname):
+        self.index.update_package(pkg_fullname)
+
+    def write(self, stream):
+        self.index.to_json(stream)
+
+
 class ProviderIndexer(Indexer):
     """Lifecycle methods for virtual package providers."""
     def _create(self):
@@ -449,6 +750,7 @@ def __init__(self, *repos):
         self._all_package_names = None
         self._provider_index = None
         self._patch_index = None
+        self._dependency_index = None
 
         # Add each repo to this path.
         for repo in repos:
@@ -557,6 +859,18 @@ def patch_index(self):
 
         return self._patch_index
 
+    @property
+    def dependency_index(self):
+        """Merged DependencyIndex from all Repos in the RepoPath."""
+        if self._dependency_index is None:
+            self._dependency_index = DependencyIndex()
+            for repo in reversed(self.repos):
+                # Skip the entries of packages removed from the repo
+                self._dependency_index.merge(
+                    repo.dependency_index, set(repo.all_package_names()))
+
+        return self._dependency_index
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -941,6 +1255,7 @@ def index(self):
             self._repo_index.add_indexer('providers', ProviderIndexer())
             self._repo_index.add_indexer('tags', TagIndexer())
             self._repo_index.add_indexer('patches', PatchIndexer())
+            self._repo_index.add_indexer('dependencies', DependencyIndexer())
         return self._repo_index
 
     @property
@@ -958,6 +1273,11 @@ def patch_index(self):
         """Index of patches and packages they're defined on."""
         return self.index['patches']
 
+    @property
+    def dependency_index(self):
+        """Index of the possible dependencies of the packages in this repo."""
+        return self.index['dependencies']
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
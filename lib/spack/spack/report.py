@@ -4,13 +4,13 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 """Tools to produce reports of spec installations"""
-import codecs
 import collections
 import functools
 import time
 import traceback
 
 import llnl.util.lang
+from llnl.util.tty.log import open_log
 import spack.build_environment
 import spack.fetch_strategy
 import spack.package
@@ -35,8 +35,8 @@
 
 def fetch_package_log(pkg):
     try:
-        with codecs.open(pkg.build_log_path, 'r', 'utf-8') as f:
-            return ''.join(f.readlines())
+        with open_log(pkg.build_log_path) as f:
+            return f.read()
     except Exception:
         return 'Cannot open build log for {0}'.format(
             pkg.spec.cshort_spec
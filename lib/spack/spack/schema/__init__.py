@@ -6,6 +6,8 @@
 """This module contains jsonschema files for all of Spack's YAML formats."""
 
 import copy
+import hashlib
+import json
 import re
 
 import six
@@ -74,6 +76,7 @@ def _validate_spec(validator, is_spec, instance, schema):
                 )
 
     def _deprecated_properties(validator, deprecated, instance, schema):
+        global deprecation_warnings
         if not (validator.is_type(instance, "object") or
                 validator.is_type(instance, "array")):
             return
@@ -89,6 +92,7 @@ def _deprecated_properties(validator, deprecated, instance, schema):
         msg = deprecated['message']
         is_error = deprecated['error']
         if not is_error:
+            deprecation_warnings += len(deprecated_properties)
             for entry in deprecated_properties:
                 llnl.util.tty.warn(
                     msg.format(property=entry, entry=instance[entry])
@@ -111,3 +115,31 @@ def _deprecated_properties(validator, deprecated, instance, schema):
 
 
 Validator = llnl.util.lang.Singleton(_make_validator)
+
+#: Number of warnings about deprecated properties issued by validators
+deprecation_warnings = 0
+
+#: Validators and digests of the schemas used so far, by id of the schema.
+#: The schemas are kept, so that their ids are not reused.
+_compiled = {}
+
+
+def _compile(schema):
+    entry = _compiled.get(id(schema))
+    if entry is None:
+        text = json.dumps(schema, sort_keys=True, default=str)
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        entry = (schema, Validator(schema), digest)
+        _compiled[id(schema)] = entry
+    return entry
+
+
+def validator_for(schema):
+    """Validator of ``schema``, built once and reused for all the data
+    validated against it."""
+    return _compile(schema)[1]
+
+
+def digest(schema):
+    """Digest of the contents of ``schema``."""
+    return _compile(schema)[2]
@@ -54,8 +54,16 @@
                 },
             },
             'source_cache': {'type': 'string'},
+            'shared_source_cache': {'type': 'string'},
+            'shared_source_cache_size': {'type': 'integer', 'minimum': 0},
             'misc_cache': {'type': 'string'},
+            'concretization_cache': {'type': 'boolean'},
+            'lockfile_cache': {'type': 'boolean'},
+            'repo_manifest_ttl': {'type': 'integer', 'minimum': 0},
             'connect_timeout': {'type': 'integer', 'minimum': 0},
+            'fetch_connections': {'type': 'integer', 'minimum': 1},
+            'fetch_parallel_min_mb': {'type': 'integer', 'minimum': 0},
+            'fetch_retries': {'type': 'integer', 'minimum': 0},
             'verify_ssl': {'type': 'boolean'},
             'suppress_gpg_warnings': {'type': 'boolean'},
             'install_missing_compilers': {'type': 'boolean'},
@@ -65,7 +73,17 @@
             'dirty': {'type': 'boolean'},
             'build_language': {'type': 'string'},
             'build_jobs': {'type': 'integer', 'minimum': 1},
+            'build_process_start_method': {
+                'type': 'string',
+                'enum': ['fork', 'forkserver', 'spawn']
+            },
+            'build_log_compression': {
+                'type': 'string',
+                'enum': ['none', 'gzip', 'zstd']
+            },
+            'build_log_max_size': {'type': 'integer', 'minimum': 0},
             'ccache': {'type': 'boolean'},
+            'compiler_wrapper_timing': {'type': 'boolean'},
             'db_lock_timeout': {'type': 'integer', 'minimum': 1},
             'package_lock_timeout': {
                 'anyOf': [
@@ -97,6 +97,7 @@
 import spack.architecture
 import spack.compiler
 import spack.compilers as compilers
+import spack.config
 import spack.dependency as dp
 import spack.error
 import spack.hash_types as ht
@@ -997,6 +998,7 @@ def __init__(self, spec_like=None,
         self._build_hash = None
         self._cmp_key_cache = None
         self._package = None
+        self._topological_order = None
 
         # Most of these are internal implementation details that can be
         # set by internal Spack calls in the constructor.
@@ -1138,6 +1140,7 @@ def _add_dependency(self, spec, deptypes):
         dspec = DependencySpec(self, spec, deptypes)
         self._dependencies[spec.name] = dspec
         spec._dependents[self.name] = dspec
+        self._topological_order = None
 
     def _add_default_platform(self):
         """If a spec has an os or a target and no platform, give it
@@ -1273,7 +1276,7 @@ def traverse_edges(self, visited=None, d=0, deptype='all',
 
         """
         # get initial values for kwargs
-        depth = kwargs.get('depth', False)
+        depth_tuples = kwargs.get('depth', False)
         key_fun = kwargs.get('key', id)
         if isinstance(key_fun, six.string_types):
             key_fun = operator.attrgetter(key_fun)
@@ -1294,53 +1297,92 @@ def validate(name, val, allowed_values):
 
         if visited is None:
             visited = set()
-        key = key_fun(self)
-
-        # Node traversal does not yield visited nodes.
-        if key in visited and cover == 'nodes':
-            return
 
-        def return_val(dspec):
+        if direction == 'children':
+            attr, succ = '_dependencies', operator.attrgetter('spec')
+        else:
+            attr, succ = '_dependents', operator.attrgetter('parent')
+
+        def successors(node):
+            where = getattr(node, attr)
+            edges = [where[name] for name in sorted(where)]
+            if deptype != dp.all_deptypes:
+                edges = [dspec for dspec in edges
+                         if not dspec.deptypes or
+                         any(dt in deptype for dt in dspec.deptypes)]
+            return edges
+
+        def return_val(node, dspec, depth):
             if not dspec:
                 # make a fake dspec for the root.
                 if direction == 'parents':
-                    dspec = DependencySpec(self, None, ())
+                    dspec = DependencySpec(node, None, ())
+                else:
+                    dspec = DependencySpec(None, node, ())
+            return (depth, dspec) if depth_tuples else dspec
+
+        # The traversal uses an explicit stack instead of recursion. Each
+        # frame holds a node being visited, the edge it was reached by, its
+        # depth, its successors and the index of the next one to visit.
+        stack = []
+        node, dspec, depth = self, dep_spec, d
+        while True:
+            key = key_fun(node)
+
+            # Node traversal does not yield visited nodes.
+            if not (key in visited and cover == 'nodes'):
+                # Preorder traversal yields before successors
+                if order == 'pre' and (yield_root or depth > 0):
+                    yield return_val(node, dspec, depth)
+
+                # Edge traversal yields but skips children of visited nodes
+                if key in visited and cover == 'edges':
+                    edges = ()
                 else:
-                    dspec = DependencySpec(None, self, ())
-            return (d, dspec) if depth else dspec
-
-        yield_me = yield_root or d > 0
-
-        # Preorder traversal yields before successors
-        if yield_me and order == 'pre':
-            yield return_val(dep_spec)
-
-        # Edge traversal yields but skips children of visited nodes
-        if not (key in visited and cover == 'edges'):
-            visited.add(key)
-
-            # This code determines direction and yields the children/parents
-            if direction == 'children':
-                where = self._dependencies
-                succ = lambda dspec: dspec.spec
-            elif direction == 'parents':
-                where = self._dependents
-                succ = lambda dspec: dspec.parent
+                    visited.add(key)
+                    edges = successors(node)
+                stack.append([node, dspec, depth, edges, 0])
+
+            # Move to the next successor, finishing the nodes that have none
+            # left to visit.
+            while stack:
+                frame = stack[-1]
+                edges, index = frame[3], frame[4]
+                if index < len(edges):
+                    frame[4] = index + 1
+                    dspec = edges[index]
+                    node, depth = succ(dspec), frame[2] + 1
+                    break
+
+                stack.pop()
+
+                # Postorder traversal yields after successors
+                if order == 'post' and (yield_root or frame[2] > 0):
+                    yield return_val(frame[0], frame[1], frame[2])
             else:
-                raise ValueError('Invalid traversal direction: %s' % direction)
+                return
 
-            for name, dspec in sorted(where.items()):
-                dt = dspec.deptypes
-                if dt and not any(d in deptype for d in dt):
-                    continue
+    def topological_order(self, deptype='all'):
+        """Return the nodes in the DAG of this spec, each one after all of
+        its dependencies, and this spec last.
 
-                for child in succ(dspec).traverse_edges(
-                        visited, d + 1, deptype, dspec, **kwargs):
-                    yield child
+        This is the order of a post-order traversal of the nodes, which is
+        cached on concrete specs as they are not expected to change.
 
-        # Postorder traversal yields after successors
-        if yield_me and order == 'post':
-            yield return_val(dep_spec)
+        Args:
+            deptype (str or tuple): dependency types to follow
+        """
+        deptype = dp.canonical_deptype(deptype)
+        if not self.concrete:
+            return tuple(self.traverse(order='post', deptype=deptype))
+
+        if self._topological_order is None:
+            self._topological_order = {}
+        nodes = self._topological_order.get(deptype)
+        if nodes is None:
+            nodes = tuple(self.traverse(order='post', deptype=deptype))
+            self._topological_order[deptype] = nodes
+        return nodes
 
     @property
     def short_spec(self):
@@ -1381,17 +1423,62 @@ def _spec_hash(self, hash):
         Arguments:
             hash (SpecHashDescriptor): type of hash to generate.
         """
-        # TODO: curently we strip build dependencies by default.  Rethink
-        # this when we move to using package hashing on all specs.
-        yaml_text = syaml.dump(
-            self.to_node_dict(hash=hash), default_flow_style=True)
-        sha = hashlib.sha1(yaml_text.encode('utf-8'))
-        b32_hash = base64.b32encode(sha.digest()).lower()
+        return self._spec_hashes([hash])[0]
 
-        if sys.version_info[0] >= 3:
-            b32_hash = b32_hash.decode('utf-8')
+    def _spec_hashes(self, hashes):
+        """Compute several types of hashes of this node at once.
 
-        return b32_hash
+        The part of the node dictionary that is common to all the hash
+        types is built only once. The dictionaries are serialized with
+        ``syaml.flow_text()``, which yields the same text as dumping them
+        in YAML flow style, without going through the YAML emitter.
+
+        Arguments:
+            hashes (list of SpecHashDescriptor): types of hash to generate.
+
+        Returns:
+            (list): the hashes, in the same order as ``hashes``
+        """
+        node_dict = self._node_dict_without_hash_fields()
+
+        result = []
+        for hash in hashes:
+            # TODO: curently we strip build dependencies by default.  Rethink
+            # this when we move to using package hashing on all specs.
+            d = self._add_hash_fields(syaml.syaml_dict(node_dict), hash)
+            yaml_text = syaml.flow_text(
+                syaml.syaml_dict([(self.name, d)])) + '\n'
+            sha = hashlib.sha1(yaml_text.encode('utf-8'))
+            b32_hash = base64.b32encode(sha.digest()).lower()
+
+            if sys.version_info[0] >= 3:
+                b32_hash = b32_hash.decode('utf-8')
+
+            result.append(b32_hash)
+        return result
+
+    def _fill_hashes(self, hashes):
+        """Compute and store the given types of hash on all the nodes of
+        this concrete spec, in a single bottom-up traversal of the DAG.
+
+        Dependencies are hashed before their dependents, so the hash of
+        each node is computed only once, and all the hash types of a node
+        are computed together.
+
+        Arguments:
+            hashes (list of SpecHashDescriptor): types of hash to generate.
+        """
+        deptype = tuple(set(dt for hash in hashes for dt in hash.deptype))
+        for spec in self.traverse(order='post', deptype=deptype):
+            if not spec.concrete:
+                continue
+
+            missing = [hash for hash in hashes
+                       if hash.attr and not getattr(spec, hash.attr, None)]
+            if missing:
+                values = spec._spec_hashes(missing)
+                for hash, value in zip(missing, values):
+                    setattr(spec, hash.attr, value)
 
     def _cached_hash(self, hash, length=None):
         """Helper function for storing a cached hash on the spec.
@@ -1409,12 +1496,11 @@ def _cached_hash(self, hash, length=None):
         hash_string = getattr(self, hash.attr, None)
         if hash_string:
             return hash_string[:length]
+        elif self.concrete:
+            self._fill_hashes([hash])
+            return getattr(self, hash.attr)[:length]
         else:
-            hash_string = self._spec_hash(hash)
-            if self.concrete:
-                setattr(self, hash.attr, hash_string)
-
-            return hash_string[:length]
+            return self._spec_hash(hash)[:length]
 
     def dag_hash(self, length=None):
         """This is Spack's default hash, used to identify installations.
@@ -1501,6 +1587,14 @@ def to_node_dict(self, hash=ht.dag_hash):
         Arguments:
             hash (SpecHashDescriptor) type of hash to generate.
          """
+        d = self._node_dict_without_hash_fields()
+        d = self._add_hash_fields(d, hash)
+        return syaml.syaml_dict([(self.name, d)])
+
+    def _node_dict_without_hash_fields(self):
+        """Contents of the node dictionary that are the same for all the
+        types of hash, i.e. everything but the package hash and the
+        dependencies."""
         d = syaml.syaml_dict()
 
         if self.versions:
@@ -1540,6 +1634,11 @@ def to_node_dict(self, hash=ht.dag_hash):
             if hasattr(variant, '_patches_in_order_of_appearance'):
                 d['patches'] = variant._patches_in_order_of_appearance
 
+        return d
+
+    def _add_hash_fields(self, d, hash):
+        """Add the fields that depend on the type of hash to the node
+        dictionary ``d``, and return it."""
         if hash.package_hash:
             d['package_hash'] = self.package.content_hash()
 
@@ -1553,7 +1652,7 @@ def to_node_dict(self, hash=ht.dag_hash):
                  ) for name, dspec in sorted(deps.items())
             ])
 
-        return syaml.syaml_dict([(self.name, d)])
+        return d
 
     def to_dict(self, hash=ht.dag_hash):
         """Create a dictionary suitable for writing this spec to YAML or JSON.
@@ -1620,6 +1719,13 @@ def to_dict(self, hash=ht.dag_hash):
                 hashes in the dictionary.
 
         """
+        if self.concrete:
+            # Compute all the hashes written below in one pass
+            hashes = [hash, ht.dag_hash]
+            if 'build' in hash.deptype:
+                hashes.append(ht.build_hash)
+            self._fill_hashes(hashes)
+
         node_list = []
         for s in self.traverse(order='pre', deptype=hash.deptype):
             node = s.to_node_dict(hash)
@@ -2200,6 +2306,18 @@ def concretize(self, tests=False):
         if self._concrete:
             return
 
+        cache_key = None
+        if spack.config.get('config:concretization_cache', False):
+            cache = spack.concretize.concretization_cache
+            cache_key = cache.key(self, tests)
+            cached = cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                self._dup(cached)
+                self._mark_concrete()
+                self._check_deprecated()
+                return
+            abstract = str(self)
+
         changed = True
         force = False
 
@@ -2307,21 +2425,7 @@ def concretize(self, tests=False):
         self._mark_concrete()
 
         # If any spec in the DAG is deprecated, throw an error
-        deprecated = []
-        with spack.store.db.read_transaction():
-            for x in self.traverse():
-                _, rec = spack.store.db.query_by_spec_hash(x.dag_hash())
-                if rec and rec.deprecated_for:
-                    deprecated.append(rec)
-
-        if deprecated:
-            msg = "\n    The following specs have been deprecated"
-            msg += " in favor of specs with the hashes shown:\n"
-            for rec in deprecated:
-                msg += '        %s  --> %s\n' % (rec.spec, rec.deprecated_for)
-            msg += '\n'
-            msg += "    For each package listed, choose another spec\n"
-            raise SpecDeprecatedError(msg)
+        self._check_deprecated()
 
         # Now that the spec is concrete we should check if
         # there are declared conflicts
@@ -2344,6 +2448,27 @@ def concretize(self, tests=False):
         # there are declared inconsistencies)
         self.architecture.target.optimization_flags(self.compiler)
 
+        if cache_key:
+            cache.store(cache_key, abstract, self)
+
+    def _check_deprecated(self):
+        """Raise if any spec in the DAG is deprecated."""
+        deprecated = []
+        with spack.store.db.read_transaction():
+            for x in self.traverse():
+                _, rec = spack.store.db.query_by_spec_hash(x.dag_hash())
+                if rec and rec.deprecated_for:
+                    deprecated.append(rec)
+
+        if deprecated:
+            msg = "\n    The following specs have been deprecated"
+            msg += " in favor of specs with the hashes shown:\n"
+            for rec in deprecated:
+                msg += '        %s  --> %s\n' % (rec.spec, rec.deprecated_for)
+            msg += '\n'
+            msg += "    For each package listed, choose another spec\n"
+            raise SpecDeprecatedError(msg)
+
     def _mark_concrete(self, value=True):
         """Mark this spec and its dependencies as concrete.
 
@@ -3135,6 +3260,7 @@ def _dup(self, other, deps=True, cleardeps=True, caches=None):
             self._dup_deps(other, deptypes, caches)
 
         self._concrete = other._concrete
+        self._topological_order = None
 
         if caches:
             self._hash = other._hash
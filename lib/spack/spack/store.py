@@ -105,7 +105,18 @@ def _construct_upstream_dbs_from_install_roots(
         next_db = spack.database.Database(
             install_root, is_upstream=True, upstream_dbs=upstream_dbs)
         next_db._fail_when_missing_deps = _test
-        next_db._read()
         accumulated_upstream_dbs.insert(0, next_db)
 
+    # Unchanged upstream databases are loaded from the cache
+    upstream_db_cache.read(accumulated_upstream_dbs)
     return accumulated_upstream_dbs
+
+
+def _upstream_db_cache():
+    import spack.caches
+    root = os.path.join(spack.caches.misc_cache.root, 'upstream-dbs')
+    return spack.database.UpstreamDatabaseCache(root)
+
+
+#: Cache of the records of upstream databases, in the misc cache
+upstream_db_cache = llnl.util.lang.Singleton(_upstream_db_cache)
@@ -0,0 +1,243 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Start methods of the processes that run package builds.
+
+``spack.build_environment.fork`` runs each build in a child process. By
+default, the child is forked from the Spack process and inherits all of
+its state: this is the ``fork`` start method. Forking a large Spack
+process for every build is costly when many small packages are built,
+and forking a process that runs several threads is unsafe.
+
+Two other start methods avoid this:
+
+``forkserver``
+    Build processes are forked from a small server process, started once
+    with the modules needed by builds already imported.
+
+``spawn``
+    Each build process is a fresh Python interpreter.
+
+With these methods the build task, i.e. the package and the function to
+run, is pickled and sent to the build process, along with the state of
+the Spack process that builds depend on (see :class:`BuildProcessState`).
+Errors are reported to the parent process as with ``fork``.
+
+The start method is chosen with ``config:build_process_start_method``.
+Python 2 only supports ``fork``.
+"""
+import multiprocessing
+import os
+
+from six.moves import cPickle
+
+import llnl.util.lang
+import llnl.util.tty as tty
+import llnl.util.tty.color as color
+
+import spack.config
+import spack.package
+import spack.paths
+import spack.repo
+import spack.store
+import spack.util.tracing as tracing
+
+#: Supported start methods of build processes
+start_methods = ('fork', 'forkserver', 'spawn')
+
+#: Modules imported by the fork server before it forks any build process
+forkserver_preload = [
+    'spack.main',
+    'spack.build_environment',
+    'spack.installer',
+    'spack.pkgkit',
+    'spack.subprocess_preload',
+]
+
+#: Multiprocessing contexts, by start method
+_contexts = {}
+
+
+def supported(method):
+    """Whether the running Python can start build processes with
+    ``method``."""
+    if method == 'fork':
+        return True
+    get_all = getattr(multiprocessing, 'get_all_start_methods', None)
+    return get_all is not None and method in get_all()
+
+
+def start_method():
+    """Start method of build processes, from the configuration.
+
+    Methods that the running Python does not support fall back to
+    ``fork``.
+    """
+    method = spack.config.get('config:build_process_start_method', 'fork')
+    if not supported(method):
+        tty.debug('Cannot start build processes with {0}, forking them'
+                  .format(method))
+        return 'fork'
+    return method
+
+
+def get_context(method):
+    """Return an object with the ``multiprocessing`` API that starts
+    processes with ``method``.
+
+    The fork server is set to preload the modules in
+    ``forkserver_preload``.
+    """
+    if method not in _contexts:
+        if not hasattr(multiprocessing, 'get_context'):
+            # Python 2 always forks
+            _contexts[method] = multiprocessing
+        else:
+            context = multiprocessing.get_context(method)
+            if method == 'forkserver':
+                context.set_forkserver_preload(forkserver_preload)
+                _start_forkserver()
+            _contexts[method] = context
+    return _contexts[method]
+
+
+def _start_forkserver():
+    """Start the fork server with Spack's libraries in its PYTHONPATH.
+
+    The fork server does not get the system path of the process that
+    starts it, so it could not preload Spack's modules otherwise. Build
+    processes get the environment of the Spack process back when its
+    state is restored.
+    """
+    import multiprocessing.forkserver
+
+    saved = os.environ.get('PYTHONPATH')
+    paths = [spack.paths.lib_path, spack.paths.external_path]
+    if saved:
+        paths.append(saved)
+    os.environ['PYTHONPATH'] = os.pathsep.join(paths)
+    try:
+        multiprocessing.forkserver.ensure_running()
+    finally:
+        if saved is None:
+            del os.environ['PYTHONPATH']
+        else:
+            os.environ['PYTHONPATH'] = saved
+
+
+class InheritedFd(object):
+    """File descriptor passed to a process started by any method.
+
+    When a process is started with ``forkserver`` or ``spawn``, the
+    descriptor is duplicated into it while its arguments are pickled.
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __reduce__(self):
+        import multiprocessing.reduction
+        return _inherited_fd, (multiprocessing.reduction.DupFd(self.fd),)
+
+
+def _inherited_fd(dup):
+    return InheritedFd(dup.detach())
+
+
+class BuildProcessState(object):
+    """State of this Spack process that build processes depend on.
+
+    Build processes that are not forked from Spack do not inherit its
+    memory. This object captures, in a picklable form, what they need from
+    it: configuration, package repositories, install tree, environment
+    variables, working directory and output settings. It is restored in
+    the build process before the build task is unpickled, since unpickling
+    packages requires their repositories.
+    """
+
+    def __init__(self):
+        import spack.main  # circular import
+
+        self.environ = dict(os.environ)
+        self.working_dir = os.getcwd()
+        self.spack_working_dir = spack.main.spack_working_dir
+        self.umask = os.umask(0)
+        os.umask(self.umask)
+
+        config = spack.config.config
+        if isinstance(config, llnl.util.lang.Singleton):
+            config = config.instance
+        self.config = config
+
+        repo_path = spack.repo.path
+        repos = getattr(repo_path, 'repos', [repo_path])
+        self.repo_dirs = [repo.root for repo in repos]
+
+        # The path scheme of the layout already includes the hash length
+        self.store = (spack.store.store.root,
+                      spack.store.store.layout.path_scheme)
+
+        self.tty = dict(
+            (name, getattr(tty, name)) for name in (
+                '_debug', '_verbose', '_stacktrace', '_timestamp',
+                '_msg_enabled', '_warn_enabled', '_error_enabled'))
+        self.force_color = color._force_color
+        self.verbose = spack.package.PackageBase._verbose
+
+        self.trace = None
+        if tracing.enabled():
+            self.trace = (tracing._tracer.path, tracing._tracer.fmt)
+
+    def restore(self):
+        """Apply the captured state to the running process."""
+        import spack.main  # circular import
+
+        os.environ.clear()
+        os.environ.update(self.environ)
+        os.chdir(self.working_dir)
+        os.umask(self.umask)
+        spack.main.spack_working_dir = self.spack_working_dir
+
+        spack.config.config = self.config
+        spack.repo.set_path(spack.repo.RepoPath(*self.repo_dirs))
+        root, path_scheme = self.store
+        spack.store.store = spack.store.Store(root, path_scheme)
+
+        for name, value in self.tty.items():
+            setattr(tty, name, value)
+        color._force_color = self.force_color
+        spack.package.PackageBase._verbose = self.verbose
+
+        if self.trace:
+            path, fmt = self.trace
+            tracing.enable(path, fmt, append=True)
+
+
+def spawned_child_process(child_pipe, input_fd, state, task):
+    """Entry point of build processes started with ``forkserver`` or
+    ``spawn``.
+
+    Args:
+        child_pipe (Connection): child end of the pipe to the parent
+        input_fd (InheritedFd): standard input forwarded by the parent,
+            or None
+        state (BuildProcessState): state of the parent process
+        task (bytes): the pickled ``(pkg, function, dirty, fake)``
+            arguments of ``spack.build_environment.fork()``
+    """
+    # Imported here, since spack.build_environment imports this module
+    import spack.main  # must be imported before spack.build_environment
+    import spack.build_environment
+
+    input_stream = None
+    if input_fd is not None:
+        input_stream = os.fdopen(input_fd.fd)
+
+    def load_task():
+        # Packages can only be unpickled once their repos are set up
+        state.restore()
+        return cPickle.loads(task)
+
+    spack.build_environment.child_process(child_pipe, input_stream, load_task)
@@ -0,0 +1,22 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Warm-up of the fork server of build processes.
+
+The fork server imports this module once, when it starts (see
+``spack.subprocess_context``). It scans the configured package
+repositories, so that the build processes forked from the server share
+the result instead of each scanning thousands of package directories.
+"""
+import llnl.util.tty as tty
+
+import spack.repo
+
+try:
+    for repo in spack.repo.path.repos:
+        repo.all_package_names()
+except Exception as e:
+    # Build processes will scan the repositories they need on demand
+    tty.debug('Could not scan the package repositories: {0}'.format(e))
@@ -64,26 +64,43 @@ def to_dict(self):
         return dict(d)
 
 
+#: Environments for template rendering, by template directories
+_environments = {}
+
+
+def template_dirs():
+    """Returns the directories where templates are searched by default."""
+    builtins = spack.config.get('config:template_dirs')
+    extensions = spack.extensions.get_template_dirs()
+    return [canonicalize_path(d)
+            for d in itertools.chain(builtins, extensions)]
+
+
 def make_environment(dirs=None):
-    """Returns an configured environment for template rendering."""
+    """Returns an configured environment for template rendering.
+
+    The environment is shared by all the callers that search templates
+    in the same directories, so that each template is compiled only once.
+    Templates are still reloaded when they change on disk.
+    """
     if dirs is None:
         # Default directories where to search for templates
-        builtins = spack.config.get('config:template_dirs')
-        extensions = spack.extensions.get_template_dirs()
-        dirs = [canonicalize_path(d)
-                for d in itertools.chain(builtins, extensions)]
-
-    # avoid importing this at the top level as it's used infrequently and
-    # slows down startup a bit.
-    import jinja2
-
-    # Loader for the templates
-    loader = jinja2.FileSystemLoader(dirs)
-    # Environment of the template engine
-    env = jinja2.Environment(loader=loader, trim_blocks=True)
-    # Custom filters
-    _set_filters(env)
-    return env
+        dirs = template_dirs()
+
+    key = tuple(dirs)
+    if key not in _environments:
+        # avoid importing this at the top level as it's used infrequently
+        # and slows down startup a bit.
+        import jinja2
+
+        # Loader for the templates
+        loader = jinja2.FileSystemLoader(dirs)
+        # Environment of the template engine
+        env = jinja2.Environment(loader=loader, trim_blocks=True)
+        # Custom filters
+        _set_filters(env)
+        _environments[key] = env
+    return _environments[key]
 
 
 # Extra filters for template engine environment
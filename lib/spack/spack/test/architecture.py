@@ -11,7 +11,10 @@
 
 import pytest
 
+import llnl.util.cpu
+
 import spack.architecture
+import spack.paths
 from spack.spec import Spec
 from spack.platforms.cray import Cray
 from spack.platforms.linux import Linux
@@ -223,3 +226,40 @@ def test_satisfy_strict_constraint_when_not_concrete(
     architecture = spack.spec.ArchSpec(architecture_tuple)
     constraint = spack.spec.ArchSpec(constraint_tuple)
     assert not architecture.satisfies(constraint, strict=True)
+
+
+def test_host_cache(tmpdir, monkeypatch):
+    monkeypatch.setattr(
+        spack.paths, 'user_host_cache_path', str(tmpdir.join('host')))
+    detected = []
+
+    def _detect():
+        detected.append(True)
+        return 'value'
+
+    def _host_cache_value():
+        spack.architecture._host_cache.cache.clear()
+        return spack.architecture.host_cache_value('name', _detect)
+
+    # Values are detected once per host, even by new processes
+    try:
+        assert _host_cache_value() == 'value'
+        assert _host_cache_value() == 'value'
+        assert len(detected) == 1
+        assert len(tmpdir.join('host').listdir()) == 1
+
+        # The entry is specific to the cpu of the host
+        info = {'vendor_id': 'GenuineIntel', 'flags': 'sse sse2 avx',
+                'model': '85', 'model_name': 'Intel Xeon'}
+        monkeypatch.setattr(
+            llnl.util.cpu.detect, 'raw_info_dictionary', lambda: info)
+        assert _host_cache_value() == 'value'
+        assert len(detected) == 2
+        assert len(tmpdir.join('host').listdir()) == 2
+
+        # It does not depend on the frequency of the cpu
+        info['cpu MHz'] = '1200.000'
+        assert _host_cache_value() == 'value'
+        assert len(detected) == 2
+    finally:
+        spack.architecture._host_cache.cache.clear()
@@ -3,7 +3,9 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import functools
 import os
+import pickle
 import platform
 
 import pytest
@@ -11,6 +13,7 @@
 import spack.build_environment
 import spack.config
 import spack.spec
+import spack.subprocess_context
 from spack.paths import build_env_path
 from spack.build_environment import dso_suffix, _static_to_shared_library
 from spack.util.executable import Executable
@@ -339,3 +342,94 @@ def test_setting_dtags_based_on_config(
 
         dtags_to_add = modifications['SPACK_DTAGS_TO_ADD'][0]
         assert dtags_to_add.value == expected_flag
+
+
+def _build_task(pkg, value):
+    return pkg.name, value, os.getpid()
+
+
+def _failing_build_task(pkg):
+    raise RuntimeError('{0} failed to build'.format(pkg.name))
+
+
+def _check_start_method(method):
+    if not spack.subprocess_context.supported(method):
+        pytest.skip('{0} is not supported by this Python'.format(method))
+
+
+@pytest.mark.parametrize('method', spack.subprocess_context.start_methods)
+def test_fork_start_methods(method, config, mock_packages):
+    _check_start_method(method)
+    pkg = spack.spec.Spec('a').concretized().package
+
+    with spack.config.override('config:build_process_start_method', method):
+        name, value, pid = spack.build_environment.fork(
+            pkg, functools.partial(_build_task, pkg, 42),
+            dirty=False, fake=True)
+
+    assert (name, value) == ('a', 42)
+    assert pid != os.getpid()
+
+
+@pytest.mark.parametrize('method', spack.subprocess_context.start_methods)
+def test_fork_start_methods_child_error(method, config, mock_packages):
+    _check_start_method(method)
+    pkg = spack.spec.Spec('a').concretized().package
+
+    with spack.config.override('config:build_process_start_method', method):
+        with pytest.raises(spack.build_environment.ChildError) as exc_info:
+            spack.build_environment.fork(
+                pkg, functools.partial(_failing_build_task, pkg),
+                dirty=False, fake=True)
+
+    error = exc_info.value
+    assert error.name == 'RuntimeError'
+    assert 'a failed to build' in str(error)
+    assert '_failing_build_task' in error.traceback
+    assert error.pkg is pkg
+
+
+def test_fork_unpicklable_task(config, mock_packages):
+    _check_start_method('spawn')
+    pkg = spack.spec.Spec('a').concretized().package
+
+    # Closures cannot be sent to spawned processes, so they are forked
+    with spack.config.override('config:build_process_start_method', 'spawn'):
+        pid = spack.build_environment.fork(
+            pkg, lambda: os.getpid(), dirty=False, fake=True)
+    assert pid != os.getpid()
+
+
+def test_child_error_shows_first_log_errors(tmpdir, monkeypatch):
+    log = tmpdir.join('spack-build-out.txt')
+    log.write(''.join('foo.c:{0}: error: oops\n'.format(i)
+                      for i in range(1, 6)))
+    monkeypatch.setattr(
+        spack.build_environment.ChildError, 'max_log_errors', 2)
+
+    error = spack.build_environment.ChildError(
+        'failed', 'spack.util.executable', 'ProcessError', '', str(log), [])
+    message = error.long_message
+    assert 'First 2 errors found in build log' in message
+    assert message.count('>>') == 2
+
+
+def test_child_error_shows_end_of_output(tmpdir):
+    log = tmpdir.join('spack-build-out.txt')
+    output = ''.join('line {0}\n'.format(i) for i in range(100))
+    log.write(output)
+
+    error = spack.build_environment.ChildError(
+        'failed', 'spack.util.executable', 'ProcessError', '', str(log), [],
+        output)
+    error = pickle.loads(pickle.dumps(error))
+    message = error.long_message
+    assert 'End of build output' in message
+    assert 'line 79\n' not in message
+    assert '  line 80\n' in message and '  line 99\n' in message
+
+    # Errors in the log are shown instead
+    log.write('foo.c:1: error: oops\n', mode='a')
+    message = error.long_message
+    assert 'End of build output' not in message
+    assert '1 error found in build log' in message
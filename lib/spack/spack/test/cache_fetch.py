@@ -7,9 +7,13 @@
 import pytest
 
 from llnl.util.filesystem import mkdirp, touch
+from llnl.util.lock import LockROFileError
 
+import spack.util.crypto as crypto
 from spack.stage import Stage
-from spack.fetch_strategy import CacheURLFetchStrategy, NoCacheError
+from spack.fetch_strategy import (
+    CacheURLFetchStrategy, FsCache, NoCacheError, URLFetchStrategy)
+from spack.util.content_cache import ContentCache
 
 
 def test_fetch_missing_cache(tmpdir):
@@ -34,3 +38,94 @@ def test_fetch(tmpdir):
         source_path = stage.source_path
         mkdirp(source_path)
         fetcher.fetch()
+
+
+def test_fetch_from_content_cache(tmpdir):
+    """Ensure archives are taken from the content-addressed cache first, for
+    any package with the same checksum."""
+    archive = tmpdir.join('archive.tar.gz')
+    archive.write_binary(b'contents')
+    digest = crypto.checksum(
+        crypto.hash_fun_for_algo('sha256'), str(archive))
+
+    archives = ContentCache(str(tmpdir.join('archives')))
+    archives.store(str(archive), digest)
+
+    cache = FsCache(str(tmpdir.join('cache')), archives=archives)
+    fetcher = cache.fetcher('not/cached/by/path.tar.gz', digest)
+    with Stage(fetcher, path=str(tmpdir.join('stage'))):
+        fetcher.fetch()
+        with open(fetcher.archive_file, 'rb') as f:
+            assert f.read() == b'contents'
+
+        # The stage does not depend on the cache entry
+        assert not os.path.islink(fetcher.archive_file)
+        archives.destroy()
+        assert os.path.exists(fetcher.archive_file)
+
+
+def test_fetch_evicted_from_content_cache(tmpdir, monkeypatch):
+    """Ensure an archive evicted from the content-addressed cache while it
+    is fetched is reported as missing, so that it is fetched from the next
+    location."""
+    archive = tmpdir.join('archive.tar.gz')
+    archive.write_binary(b'contents')
+    digest = crypto.checksum(
+        crypto.hash_fun_for_algo('sha256'), str(archive))
+
+    archives = ContentCache(str(tmpdir.join('archives')))
+    archives.store(str(archive), digest)
+    find = archives.find
+
+    def _find(digest):
+        path = find(digest)
+        archives.destroy()
+        return path
+
+    monkeypatch.setattr(archives, 'find', _find)
+    cache = FsCache(str(tmpdir.join('cache')), archives=archives)
+    fetcher = cache.fetcher('not/cached/by/path.tar.gz', digest)
+    with Stage(fetcher, path=str(tmpdir.join('stage'))):
+        with pytest.raises(NoCacheError, match=r'No cache'):
+            fetcher.fetch()
+
+
+def test_store_in_content_cache(tmpdir, mock_archive):
+    """Ensure cached archives with a checksum go to the content-addressed
+    cache."""
+    digest = crypto.checksum(
+        crypto.hash_fun_for_algo('sha256'), mock_archive.archive_file)
+    archives = ContentCache(str(tmpdir.join('archives')))
+    cache = FsCache(str(tmpdir.join('cache')), archives=archives)
+
+    fetcher = URLFetchStrategy(mock_archive.url, sha256=digest)
+    with Stage(fetcher, path=str(tmpdir.join('stage'))):
+        fetcher.fetch()
+        cache.store(fetcher, 'pkg/pkg-1.0.tar.gz')
+
+    assert archives.find(digest)
+    assert os.path.realpath(
+        str(tmpdir.join('cache', 'pkg', 'pkg-1.0.tar.gz'))
+    ) == archives.find(digest)
+
+
+def test_store_without_content_cache_access(tmpdir, mock_archive,
+                                            monkeypatch):
+    """Ensure archives are cached by path if they cannot be stored in the
+    content-addressed cache."""
+    digest = crypto.checksum(
+        crypto.hash_fun_for_algo('sha256'), mock_archive.archive_file)
+    archives = ContentCache(str(tmpdir.join('archives')))
+    cache = FsCache(str(tmpdir.join('cache')), archives=archives)
+
+    def _store(*args, **kwargs):
+        raise LockROFileError(archives.root)
+
+    monkeypatch.setattr(archives, 'store', _store)
+    fetcher = URLFetchStrategy(mock_archive.url, sha256=digest)
+    with Stage(fetcher, path=str(tmpdir.join('stage'))):
+        fetcher.fetch()
+        cache.store(fetcher, 'pkg/pkg-1.0.tar.gz')
+
+    path = str(tmpdir.join('cache', 'pkg', 'pkg-1.0.tar.gz'))
+    assert os.path.isfile(path) and not os.path.islink(path)
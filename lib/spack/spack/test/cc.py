@@ -10,6 +10,7 @@
 import os
 import pytest
 
+import spack.build_environment
 from spack.paths import build_env_path
 from spack.util.environment import system_dirs, set_env
 from spack.util.executable import Executable
@@ -619,3 +620,65 @@ def test_filter_enable_new_dtags(wrapper_flags):
         result = cc(*(test_args + ['-Wl,--enable-new-dtags']), output=str)
         result = result.strip().split('\n')
         assert '-Wl,--enable-new-dtags' not in result
+
+
+@pytest.mark.parametrize('wrapper,args', [
+    (cpp, test_args),
+    (cc, ['-c'] + test_args),
+    (cc, test_args),
+    (cc, test_args + ['-isystemfooinc']),
+    (cxx, test_args),
+    (fc, test_args),
+    (ld, test_args),
+    (ld, ['-r'] + test_args),
+])
+def test_precomputed_dep_flags(wrapper, args):
+    """Ensure the arguments precomputed by Spack are those the wrapper
+    computes, and are only used while the variables they were computed
+    from do not change."""
+    with set_env(SPACK_INCLUDE_DIRS='xinc:yinc',
+                 SPACK_RPATH_DIRS='xlib:ylib:rlib',
+                 SPACK_LINK_DIRS='xlib:ylib',
+                 SPACK_COMPILER_EXTRA_RPATHS='elib',
+                 SPACK_COMPILER_IMPLICIT_RPATHS='/usr/ilib:ilib'):
+        with set_env(SPACK_TEST_COMMAND='dump-args'):
+            expected = wrapper(*args, output=str)
+
+        precomputed = spack.build_environment.compiler_wrapper_flags(
+            os.environ)
+        with set_env(**precomputed):
+            check_args(wrapper, args, expected.strip().split('\n'))
+
+            # The wrapper uses the precomputed arguments
+            with set_env(SPACK_INCLUDE_FLAGS='-Iprecomputed',
+                         SPACK_ISYSTEM_INCLUDE_FLAGS='-isystemprecomputed',
+                         SPACK_LINK_DIR_FLAGS='-Lprecomputed'):
+                with set_env(SPACK_TEST_COMMAND='dump-args'):
+                    output = wrapper(*args, output=str)
+                if wrapper is not cpp and '-c' not in args:
+                    assert '-Lprecomputed' in output.split('\n')
+
+            # ... unless the variables they were computed from changed
+            with set_env(SPACK_LINK_DIRS='zlib',
+                         SPACK_LINK_DIR_FLAGS='-Lprecomputed'):
+                with set_env(SPACK_TEST_COMMAND='dump-args'):
+                    output = wrapper(*args, output=str).split('\n')
+                assert '-Lprecomputed' not in output
+                assert '-Lxlib' not in output
+
+
+def test_wrapper_timing(tmpdir):
+    """Ensure the time spent in the wrapper is logged on request."""
+    with set_env(SPACK_CC='true',
+                 SPACK_CC_TIMING='TRUE',
+                 SPACK_DEBUG_LOG_DIR=str(tmpdir)):
+        cc('-c', 'foo.c')
+        cc('foo.o', '-o', 'foo')
+
+    lines = tmpdir.join('spack-cc-foo-hashabc.timing.log').readlines()
+    assert len(lines) == 2
+    for line, mode in zip(lines, ('cc', 'ccld')):
+        tag, microseconds, command = line.split()
+        assert tag == '[{0}]'.format(mode)
+        assert int(microseconds) >= 0
+        assert command == 'true'
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import pytest
+import spack.architecture
 import spack.stage
 import spack.caches
 import spack.main
@@ -28,6 +29,7 @@ def __call__(self, *args, **kwargs):
         spack.caches.fetch_cache, 'destroy', Counter(), raising=False)
     monkeypatch.setattr(
         spack.caches.misc_cache, 'destroy', Counter())
+    monkeypatch.setattr(spack.architecture, 'clear_host_cache', Counter())
     monkeypatch.setattr(
         spack.installer, 'clear_failures', Counter())
 
@@ -55,4 +57,5 @@ def test_function_calls(command_line, counters):
     assert spack.stage.purge.call_count == counters[1]
     assert spack.caches.fetch_cache.destroy.call_count == counters[2]
     assert spack.caches.misc_cache.destroy.call_count == counters[3]
+    assert spack.architecture.clear_host_cache.call_count == counters[3]
     assert spack.installer.clear_failures.call_count == counters[4]
@@ -0,0 +1,44 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import pytest
+
+import spack.config
+from spack.main import SpackCommand
+from spack.spec import Spec
+
+concretization_cache = SpackCommand('concretization-cache')
+
+
+@pytest.fixture()
+def cache(mock_concretization_cache, mock_packages):
+    Spec('mpileaks').concretized()
+    Spec('libelf').concretized()
+    return mock_concretization_cache
+
+
+def test_list(cache):
+    output = concretization_cache('list')
+    assert '2 stored concretizations' in output
+    assert 'mpileaks  ->  mpileaks@2.3' in output
+    assert '[stale]' not in output
+
+    spack.config.set('packages:all:providers:mpi', ['zmpi'])
+    assert concretization_cache('list').count('[stale]') == 2
+
+
+def test_clear(cache):
+    concretization_cache('clear', '--stale')
+    assert len(list(cache.entries())) == 2
+
+    spack.config.set('packages', {'libelf': {'version': ['0.8.12']}})
+    Spec('libelf').concretized()
+    concretization_cache('clear', '--stale')
+    entries = list(cache.entries())
+    assert len(entries) == 1
+    assert entries[0]['spec'].satisfies('libelf@0.8.12')
+
+    concretization_cache('clear')
+    assert not list(cache.entries())
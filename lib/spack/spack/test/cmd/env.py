@@ -10,9 +10,12 @@
 
 import llnl.util.filesystem as fs
 
+import spack.config
 import spack.hash_types as ht
 import spack.modules
 import spack.environment as ev
+import spack.spec
+import spack.util.source_digest
 
 from spack.cmd.env import _env_create
 from spack.spec import Spec
@@ -408,6 +411,68 @@ def test_init_from_lockfile(tmpdir):
         assert s1 == s2
 
 
+def test_lockfile_cache(monkeypatch):
+    """Test that concrete specs are read from the cache of the lockfile, for
+    as long as the lockfile does not change."""
+    reads = []
+    read_lockfile = ev.Environment._read_lockfile
+
+    def _read_lockfile(env, lockfile):
+        reads.append(lockfile)
+        return read_lockfile(env, lockfile)
+
+    monkeypatch.setattr(ev.Environment, '_read_lockfile', _read_lockfile)
+
+    with spack.config.override('config:lockfile_cache', True):
+        e1 = ev.create('test')
+        e1.add('mpileaks')
+        e1.concretize()
+        e1.write()
+        assert not os.path.exists(e1._lock_cache_path)
+
+        # The first read writes the cache, which the next one reads without
+        # hashing the specs again
+        e2 = ev.read('test')
+        assert len(reads) == 1
+        assert os.path.exists(e1._lock_cache_path)
+
+        spec_hash = spack.spec.Spec._spec_hash
+
+        def _spec_hash(*args, **kwargs):
+            raise AssertionError('spec hashed again')
+
+        monkeypatch.setattr(spack.spec.Spec, '_spec_hash', _spec_hash)
+        e3 = ev.read('test')
+        monkeypatch.setattr(spack.spec.Spec, '_spec_hash', spec_hash)
+        assert len(reads) == 1
+        assert e3.concretized_user_specs == e1.concretized_user_specs
+        assert e3.concretized_order == e1.concretized_order
+        assert e3.specs_by_hash == e2.specs_by_hash
+        for h in e1.concretized_order:
+            spec = e3.specs_by_hash[h]
+            assert spec.concrete
+            assert spec.build_hash() == h
+            assert spec.dag_hash() == e1.specs_by_hash[h].dag_hash()
+
+        # A changed lockfile is read again
+        e3.add('libelf')
+        e3.concretize()
+        e3.write()
+        e4 = ev.read('test')
+        assert len(reads) == 2
+        assert len(e4.concretized_order) == 2
+
+        # So is a cache written by a different Spack
+        monkeypatch.setattr(
+            spack.util.source_digest, 'source_digest', lambda: 'changed')
+        ev.read('test')
+        assert len(reads) == 3
+
+    # The cache is not used unless configured
+    ev.read('test')
+    assert len(reads) == 4
+
+
 def test_init_from_yaml(tmpdir):
     """Test that an environment can be instantiated from a lockfile."""
     initial_yaml = StringIO("""\
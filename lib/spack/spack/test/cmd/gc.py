@@ -3,11 +3,14 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import os
+
 import pytest
 
 import spack.environment as ev
 import spack.spec
 import spack.main
+import spack.store
 
 gc = spack.main.SpackCommand('gc')
 
@@ -44,3 +47,18 @@ def test_gc_with_environment(
             output = gc('-y')
     assert 'Restricting the garbage collection' in output
     assert 'There are no unused specs' in output
+
+
+@pytest.mark.db
+def test_gc_removes_prefixes(config, mutable_database, capsys):
+    s = spack.spec.Spec('simple-inheritance')
+    s.concretize()
+    s.package.do_install(fake=True, explicit=True)
+    cmake = s['cmake']
+    assert os.path.isdir(cmake.prefix)
+
+    with capsys.disabled():
+        gc('-y', '-j', '2')
+    assert not os.path.exists(cmake.prefix)
+    assert not mutable_database.query('cmake', installed=True)
+    assert not os.listdir(spack.store.layout.trash_path)
@@ -6,6 +6,7 @@
 import argparse
 import os
 import filecmp
+import json
 import re
 from six.moves import builtins
 import time
@@ -59,6 +60,22 @@ def test_install_package_and_dependency(
 
 
 @pytest.mark.disable_clean_stage_check
+def test_install_trace(
+        tmpdir, mock_packages, mock_archive, mock_fetch, config,
+        install_mockery):
+    trace_file = tmpdir.join('trace.jsonl')
+    install('--trace', str(trace_file), '--trace-format=jsonl', 'libdwarf')
+
+    events = [json.loads(line) for line in trace_file.readlines()]
+    categories = set(e['cat'] for e in events)
+    assert set(['install', 'phase', 'hook', 'db']) <= categories
+
+    installs = [e['args']['package'] for e in events if e['cat'] == 'install']
+    assert len(installs) == 2
+    assert any(p.startswith('libdwarf') for p in installs)
+    assert 'install' in set(e['name'] for e in events if e['cat'] == 'phase')
+
+
 def test_install_runtests_notests(monkeypatch, mock_packages, install_mockery):
     def check(pkg):
         assert not pkg.run_tests
@@ -147,6 +164,10 @@ def test_install_output_on_build_error(mock_packages, mock_archive, mock_fetch,
     assert 'configure: error: in /path/to/some/file:' in out
     assert 'configure: error: cannot run C compiled programs.' in out
 
+    # The end of the output is kept for the report
+    assert 'configure: error: cannot run C compiled programs.' in \
+        install.error.log_tail
+
 
 @pytest.mark.disable_clean_stage_check
 def test_install_output_on_python_error(
@@ -8,8 +8,10 @@
 
 import pytest
 
+import spack.config
 import spack.main
 import spack.modules
+import spack.util.source_digest
 from spack.test.conftest import use_store, use_configuration, use_repo
 
 module = spack.main.SpackCommand('module')
@@ -231,3 +233,48 @@ def test_setdefault_command(
         assert os.path.exists(writers[k].layout.filename)
     assert os.path.exists(link_name) and os.path.islink(link_name)
     assert os.path.realpath(link_name) == writers[preferred].layout.filename
+
+
+@pytest.fixture()
+def tcl_roots(tmpdir, mutable_config):
+    """Writes tcl module files in a temporary directory."""
+    spack.config.set('config:module_roots', {'tcl': str(tmpdir)})
+    return str(tmpdir)
+
+
+@pytest.mark.db
+def test_refresh_skips_up_to_date_modules(
+        database, module_configuration, tcl_roots, monkeypatch):
+    module('tcl', 'refresh', '-y', 'mpileaks')
+    filename = _module_files('tcl', 'mpileaks ^mpich')[0]
+    assert filename.startswith(tcl_roots)
+    with open(filename, 'w') as f:
+        f.write('edited')
+
+    module('tcl', 'refresh', '-y', 'mpileaks')
+    with open(filename) as f:
+        assert f.read() == 'edited'
+
+    # Changes to Spack itself make all module files outdated
+    monkeypatch.setattr(
+        spack.util.source_digest, 'source_digest', lambda: 'changed')
+    module('tcl', 'refresh', '-y', 'mpileaks')
+    with open(filename) as f:
+        assert f.read() != 'edited'
+    with open(filename, 'w') as f:
+        f.write('edited')
+
+    # Changes to the configuration make all module files outdated
+    module_configuration('autoload_direct')
+    module('tcl', 'refresh', '-y', 'mpileaks')
+    with open(filename) as f:
+        assert f.read() != 'edited'
+
+
+@pytest.mark.db
+def test_refresh_in_parallel(database, tcl_roots):
+    writer_cls = spack.modules.module_types['tcl']
+    files = [writer_cls(s).layout.filename for s in database.query()]
+    assert all(f.startswith(tcl_roots) for f in files)
+    module('tcl', 'refresh', '-y', '--delete-tree', '-j', '2')
+    assert all(os.path.exists(f) for f in files)
@@ -5,6 +5,7 @@
 
 import pytest
 import llnl.util.tty as tty
+import spack.database
 import spack.store
 from spack.main import SpackCommand, SpackCommandError
 
@@ -53,6 +54,27 @@ def test_recursive_uninstall(mutable_database):
     assert len(mpi_specs) == 3
 
 
+@pytest.mark.db
+def test_recursive_uninstall_single_transaction(mutable_database, monkeypatch):
+    """Test that dependents are uninstalled along with their dependencies,
+    with a single write of the database."""
+    writes = []
+    write = spack.database.Database._write
+
+    def _write(db, *args):
+        writes.append(args)
+        return write(db, *args)
+
+    monkeypatch.setattr(spack.database.Database, '_write', _write)
+    uninstall('-y', '-a', '--dependents', '-j', '2', 'mpich')
+
+    assert len(writes) == 1
+    assert not mutable_database.query('mpich')
+    assert not mutable_database.query('mpileaks ^mpich')
+    assert not mutable_database.query('callpath ^mpich')
+    assert len(mutable_database.query('mpileaks')) == 2
+
+
 @pytest.mark.db
 @pytest.mark.regression('3690')
 @pytest.mark.parametrize('constraint,expected_number_of_specs', [
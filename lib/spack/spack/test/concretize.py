@@ -8,7 +8,9 @@
 
 import spack.architecture
 import spack.concretize
+import spack.config
 import spack.repo
+import spack.util.source_digest
 
 from spack.concretize import find_spec, NoValidVersionError
 from spack.error import SpecError
@@ -638,3 +640,53 @@ def test_concretize_anonymous(self):
         with pytest.raises(spack.error.SpecError):
             s = Spec('+variant')
             s.concretize()
+
+
+@pytest.mark.usefixtures('mock_packages')
+def test_concretization_cache(mock_concretization_cache, monkeypatch):
+    expected = Spec('mpileaks ^mpich').concretized()
+    assert len(list(mock_concretization_cache.entries())) == 1
+
+    def _fail(*args, **kwargs):
+        raise AssertionError('spec concretized again')
+
+    monkeypatch.setattr(spack.concretize.Concretizer, 'concretize_version',
+                        _fail)
+    s = Spec('mpileaks ^mpich').concretized()
+    assert s.concrete
+    assert s.build_hash() == expected.build_hash()
+    assert all(x.concrete for x in s.traverse())
+
+    # Different abstract specs, and different tests arguments, are
+    # concretized again
+    with pytest.raises(AssertionError):
+        Spec('mpileaks ^zmpi').concretized()
+    with pytest.raises(AssertionError):
+        Spec('mpileaks ^mpich').concretize(tests=True)
+
+
+@pytest.mark.usefixtures('mock_packages')
+def test_concretization_cache_follows_configuration(
+        mock_concretization_cache):
+    cache = mock_concretization_cache
+    key = cache.key(Spec('mpileaks'))
+    assert cache.key(Spec('mpileaks')) == key
+
+    spack.config.set('packages:all:providers:mpi', ['zmpi'])
+    assert cache.key(Spec('mpileaks')) != key
+
+
+@pytest.mark.usefixtures('mock_packages')
+def test_concretization_cache_follows_spack_source(
+        mock_concretization_cache, monkeypatch):
+    cache = mock_concretization_cache
+    key = cache.key(Spec('mpileaks'))
+
+    monkeypatch.setattr(
+        spack.util.source_digest, 'source_digest', lambda: 'changed')
+    assert cache.key(Spec('mpileaks')) != key
+
+
+def test_concretization_cache_needs_repos_on_disk(mock_concretization_cache):
+    with spack.repo.swap(MockPackageMultiRepo()):
+        assert mock_concretization_cache.key(Spec('mpileaks')) is None
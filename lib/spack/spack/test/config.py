@@ -24,6 +24,7 @@
 import spack.schema.repos
 import spack.util.spack_yaml as syaml
 import spack.util.path as spack_path
+import spack.util.source_digest
 
 
 # sample config data
@@ -964,3 +965,157 @@ def test_bad_path_double_override(config):
                        match='Meaningless second override'):
         with spack.config.override('bad::double:override::directive', ''):
             pass
+
+
+def test_merged_config_cache(tmpdir, write_config_file, monkeypatch):
+    def configuration():
+        cfg = spack.config.Configuration(
+            *[spack.config.ConfigScope(name, str(tmpdir.join(name)))
+              for name in ['low', 'high']])
+        cfg.push_scope(spack.config.InternalConfigScope('command_line'))
+        cfg.cache = spack.config.MergedConfigCache(str(tmpdir.join('cache')))
+        return cfg
+
+    write_config_file('config', config_low, 'low')
+    write_config_file('config', config_override_key, 'high')
+    expected = configuration().get_config('config')
+    assert expected['install_tree'] == 'override_key'
+
+    # The merged section comes from the cache, without reading any file
+    def _read(*args, **kwargs):
+        raise AssertionError('configuration file read')
+
+    monkeypatch.setattr(spack.config, 'read_config_file', _read)
+    assert configuration().get_config('config') == expected
+
+    # Internal scopes are part of the key
+    cfg = configuration()
+    cfg.set('config:verify_ssl', False, scope='command_line')
+    with pytest.raises(AssertionError):
+        cfg.get_config('config')
+    monkeypatch.undo()
+
+    # Changing a file invalidates the entry
+    write_config_file('config', config_override_all, 'high')
+    data = configuration().get_config('config')
+    assert data['install_tree'] == 'override_all'
+    assert 'build_stage' not in data
+
+    # So does a change to the source of Spack
+    monkeypatch.setattr(
+        spack.util.source_digest, 'source_digest', lambda: 'changed')
+    monkeypatch.setattr(spack.config, 'read_config_file', _read)
+    with pytest.raises(AssertionError):
+        configuration().get_config('config')
+
+
+def test_merged_sections_follow_updates(mock_low_high_config,
+                                        write_config_file):
+    write_config_file('config', config_low, 'low')
+    cfg = mock_low_high_config
+    assert cfg.get_config('config')['install_tree'] == 'install_tree_path'
+
+    cfg.set('config:install_tree', 'high_tree', scope='high')
+    assert cfg.get_config('config')['install_tree'] == 'high_tree'
+
+    cfg.push_scope(spack.config.InternalConfigScope(
+        'top', {'config': {'install_tree': 'top_tree'}}))
+    assert cfg.get_config('config')['install_tree'] == 'top_tree'
+
+    cfg.pop_scope()
+    assert cfg.get_config('config')['install_tree'] == 'high_tree'
+
+
+def test_merged_sections_are_not_shared(mock_low_high_config,
+                                        write_config_file):
+    write_config_file('config', config_low, 'low')
+    cfg = mock_low_high_config
+    build_stage = cfg.get('config:build_stage')
+
+    cfg.get_config('config')['build_stage'].append('/bogus')
+    cfg.get('config:build_stage').append('/bogus')
+    cfg.get('config')['build_stage'].append('/bogus')
+
+    assert cfg.get_config('config')['build_stage'] == build_stage
+    assert cfg.get('config:build_stage') == build_stage
+
+
+def test_validation_record(tmpdir, monkeypatch):
+    record = spack.config.ValidationRecord(str(tmpdir.join('record')))
+    monkeypatch.setattr(spack.config, 'validation_record', record)
+    schema = spack.schema.config.schema
+    config_yaml = str(tmpdir.join('config.yaml'))
+    with open(config_yaml, 'w') as f:
+        f.write('config:\n  dirty: true\n')
+
+    data = spack.config.read_config_file(config_yaml, schema)
+    assert data['config']['dirty'] is True
+
+    # Unchanged files are not validated again
+    def _validate(*args, **kwargs):
+        raise AssertionError('configuration validated')
+
+    monkeypatch.setattr(spack.config, 'validate', _validate)
+    assert spack.config.read_config_file(config_yaml, schema) == data
+
+    with open(config_yaml, 'w') as f:
+        f.write('config:\n  dirty: false\n')
+    with pytest.raises(AssertionError):
+        spack.config.read_config_file(config_yaml, schema)
+
+
+def test_validation_record_keeps_one_entry_per_file(tmpdir, monkeypatch):
+    record = spack.config.ValidationRecord(str(tmpdir.join('record')))
+    monkeypatch.setattr(spack.config, 'validation_record', record)
+    schema = spack.schema.config.schema
+    config_yaml = str(tmpdir.join('config.yaml'))
+    for value in ('true', 'false', 'true'):
+        with open(config_yaml, 'w') as f:
+            f.write('config:\n  dirty: {0}\n'.format(value))
+        spack.config.read_config_file(config_yaml, schema)
+    assert len(os.listdir(record.root)) == 1
+
+    # Data that was not read from a file is not recorded
+    content = 'config:\n  dirty: true\n'
+    spack.config.validate(syaml.load_config(content), schema,
+                          content=content)
+    assert (content, schema, None) not in record
+    assert len(os.listdir(record.root)) == 1
+
+
+def test_invalid_data_is_not_recorded(tmpdir, monkeypatch):
+    record = spack.config.ValidationRecord(str(tmpdir.join('record')))
+    monkeypatch.setattr(spack.config, 'validation_record', record)
+    schema = spack.schema.config.schema
+    content = 'config:\n  dirty: [1]\n'
+    filename = str(tmpdir.join('config.yaml'))
+    for _ in range(2):
+        with pytest.raises(spack.config.ConfigFormatError):
+            spack.config.validate(syaml.load_config(content), schema,
+                                  filename, content)
+    assert (content, schema, filename) not in record
+
+
+def test_validators_are_reused():
+    schema = spack.schema.config.schema
+    validator = spack.schema.validator_for(schema)
+    assert spack.schema.validator_for(schema) is validator
+    assert spack.schema.validator_for(spack.schema.repos.schema) is not \
+        validator
+
+
+def test_recorded_round_trip_data_keeps_comments(tmpdir, monkeypatch):
+    record = spack.config.ValidationRecord(str(tmpdir.join('record')))
+    monkeypatch.setattr(spack.config, 'validation_record', record)
+    content = '# comment\nspack:\n  specs: []\n'
+    schema = spack.schema.env.schema
+    filename = str(tmpdir.join('spack.yaml'))
+
+    results = []
+    for _ in range(2):
+        data = syaml.load_config(content)
+        validated = spack.config.validate(data, schema, filename, content)
+        results.append(syaml.dump_config(validated))
+    assert (content, schema, filename) in record
+    assert results[0] == results[1]
+    assert results[1].startswith('# comment')
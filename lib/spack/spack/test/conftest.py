@@ -267,6 +267,17 @@ def __str__(self):
     monkeypatch.setattr(spack.caches, 'fetch_cache', MockCache())
 
 
+@pytest.fixture(scope='session', autouse=True)
+def mock_validation_record(tmpdir_factory):
+    """Keep the record of validated configuration files out of the home
+    directory of the user running the tests."""
+    record = spack.config.validation_record
+    root = record.root
+    record.root = str(tmpdir_factory.mktemp('validation-record'))
+    yield
+    record.root = root
+
+
 @pytest.fixture(autouse=True)
 def _skip_if_missing_executables(request):
     """Permits to mark tests with 'require_executables' and skip the
@@ -472,6 +483,16 @@ def mutable_config(tmpdir_factory, configuration_dir):
         yield cfg
 
 
+@pytest.fixture(scope='function')
+def mock_concretization_cache(tmpdir, monkeypatch, mutable_config):
+    """Enables a concretization cache that is empty, and private to the
+    test."""
+    cache = spack.concretize.ConcretizationCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.concretize, 'concretization_cache', cache)
+    spack.config.set('config:concretization_cache', True)
+    return cache
+
+
 @pytest.fixture(scope='function')
 def mutable_empty_config(tmpdir_factory, configuration_dir):
     """Empty configuration that can be modified by the tests."""
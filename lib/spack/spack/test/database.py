@@ -12,6 +12,7 @@
 import multiprocessing
 import os
 import pytest
+import sys
 import json
 try:
     import uuid
@@ -22,6 +23,7 @@
 
 from jsonschema import validate
 
+import llnl.util.filesystem as fs
 import llnl.util.lock as lk
 from llnl.util.tty.colify import colify
 
@@ -30,6 +32,8 @@
 import spack.database
 import spack.package
 import spack.spec
+import spack.util.lock
+from spack.util.crypto import bit_length
 from spack.util.mock_package import MockPackageMultiRepo
 from spack.util.executable import Executable
 from spack.schema.database_index import schema
@@ -252,6 +256,83 @@ def test_recursive_upstream_dbs(tmpdir_factory, test_store, gen_mock_layout):
                 spec['z'], direction='parents') == set([spec, spec['y']]))
 
 
+@pytest.mark.usefixtures('config')
+def test_upstream_db_cache(
+        tmpdir_factory, test_store, gen_mock_layout, monkeypatch):
+    roots = [str(tmpdir_factory.mktemp(x)) for x in ['b', 'c']]
+    layouts = [gen_mock_layout(x) for x in ['/rb/', '/rc/']]
+    cache = spack.database.UpstreamDatabaseCache(
+        str(tmpdir_factory.mktemp('cache')))
+    monkeypatch.setattr(spack.store, 'upstream_db_cache', cache)
+
+    reads = []
+    read_from_file = spack.database.Database._read_from_file
+
+    def _read_from_file(db, filename):
+        reads.append(db.root)
+        return read_from_file(db, filename)
+
+    monkeypatch.setattr(
+        spack.database.Database, '_read_from_file', _read_from_file)
+
+    default = ('build', 'link')
+    mock_repo = MockPackageMultiRepo()
+    z = mock_repo.add_package('z', [], [])
+    mock_repo.add_package('y', [z], [default])
+    mock_repo.add_package('x', [], [])
+
+    def upstream_dbs():
+        del reads[:]
+        return spack.store._construct_upstream_dbs_from_install_roots(
+            roots, _test=True)
+
+    with spack.repo.swap(mock_repo):
+        spec = spack.spec.Spec('y')
+        spec.concretize()
+        db_c = spack.database.Database(roots[1])
+        db_c.add(spec['z'], layouts[1])
+        db_b = spack.database.Database(roots[0], upstream_dbs=[db_c])
+        db_b.add(spec, layouts[0])
+
+        # Databases are read once, then loaded from the cache. Queries of
+        # upstream databases do not lock, as in Database.query()
+        assert len(upstream_dbs()) == 2
+        assert reads == [roots[1], roots[0]]
+        db_b, db_c = upstream_dbs()
+        assert reads == []
+
+        # Specs are still shared across databases
+        y_spec = db_b._query('y')[0]
+        assert y_spec == spec
+        assert y_spec.dependencies() == [db_c._query('z')[0]]
+        assert y_spec.dependencies()[0] is db_c._query('z')[0]
+
+        # Databases are read again if they depend on a changed database
+        x_spec = spack.spec.Spec('x').concretized()
+        spack.database.Database(roots[1]).add(x_spec, layouts[1])
+        db_b, db_c = upstream_dbs()
+        assert reads == [roots[1], roots[0]]
+        assert db_c._query('x')[0] == x_spec
+        assert db_b._query('y')[0].dependencies()[0] is db_c._query('z')[0]
+
+        # Databases they depend on are not
+        spack.database.Database(roots[0], upstream_dbs=[db_c]).remove(spec)
+        db_b, db_c = upstream_dbs()
+        assert reads == [roots[0]]
+        assert not db_b._query('y')
+        assert db_c._query('z')[0] == spec['z']
+
+        db_b, db_c = upstream_dbs()
+        assert reads == []
+        assert not db_b._query('y')
+
+        # Records cached by a different Spack are not loaded
+        monkeypatch.setattr(
+            spack.util.source_digest, 'source_digest', lambda: 'changed')
+        db_b, db_c = upstream_dbs()
+        assert reads == [roots[1], roots[0]]
+
+
 @pytest.fixture()
 def usr_folder_exists(monkeypatch):
     """The ``/usr`` folder is assumed to be existing in some tests. This
@@ -753,6 +834,30 @@ def test_uninstall_by_spec(mutable_database):
     assert len(mutable_database.query()) == 0
 
 
+def test_installed_dependents(database):
+    # Dependents of each spec, on its own, are the installed specs that
+    # contain it
+    specs = database.query()
+    dependents = database.installed_dependents(specs)
+    assert not dependents
+
+    for spec in specs:
+        expected = set(s for s in specs if spec in s and s != spec)
+        dependents = database.installed_dependents([spec])
+        assert set(dependents.get(spec.dag_hash(), [])) == expected
+
+    # Dependents that are uninstalled with the specs are not reported
+    mpileaks = database.query_one('mpileaks ^mpich')
+    callpath = mpileaks['callpath']
+    dependents = database.installed_dependents([callpath, mpileaks])
+    assert list(dependents) == []
+
+    dependents = database.installed_dependents([callpath, mpileaks['mpich']])
+    assert set(dependents) == set(
+        [callpath.dag_hash(), mpileaks['mpich'].dag_hash()])
+    assert dependents[callpath.dag_hash()] == [mpileaks]
+
+
 def test_query_unused_specs(mutable_database):
     # This spec installs a fake cmake as a build only dependency
     s = spack.spec.Spec('simple-inheritance')
@@ -869,6 +974,62 @@ def _is(db, spec):
     assert spack.store.db.prefix_failed(s)
 
 
+@pytest.mark.db
+def test_prefixes_failed(mutable_database, monkeypatch):
+    """Check the batched prefix failure check agrees with prefix_failed."""
+    specs = [spack.spec.Spec(name).concretized()
+             for name in ('a', 'b', 'c', 'libelf')]
+    a, b, c, libelf = specs
+    assert not spack.store.db.prefixes_failed(specs)
+
+    # A failure entry and a persistent failure marking are sufficient
+    spack.store.db._prefix_failures[a.prefix] = None
+    fs.touch(spack.store.db._failed_spec_path(c))
+    try:
+        assert spack.store.db.prefixes_failed(specs) == [a, c]
+
+        # So is a failure lock held by another process
+        def _locked(path, starts):
+            start = b.dag_hash_bit_prefix(bit_length(sys.maxsize))
+            assert path == spack.store.db.prefix_fail_path
+            return [s for s in starts if s == start]
+
+        monkeypatch.setattr(spack.util.lock, 'write_locked', _locked)
+        assert spack.store.db.prefixes_failed(specs) == [a, b, c]
+        assert spack.store.db.prefixes_failed([libelf, b]) == [b]
+    finally:
+        del spack.store.db._prefix_failures[a.prefix]
+        os.remove(spack.store.db._failed_spec_path(c))
+
+
+def test_write_locked(tmpdir):
+    """Check write_locked ignores missing files and unlocked bytes."""
+    path = str(tmpdir.join('lockfile'))
+    assert spack.util.lock.write_locked(path, [0, 1]) == []
+
+    fs.touch(path)
+    assert spack.util.lock.write_locked(path, [0, 1]) == []
+
+    # Only bytes locked by another process are reported
+    locked, done = multiprocessing.Event(), multiprocessing.Event()
+
+    def _hold_lock():
+        lock = lk.Lock(path, 1, 1)
+        lock.acquire_write()
+        locked.set()
+        done.wait()
+        lock.release_write()
+
+    p = multiprocessing.Process(target=_hold_lock)
+    p.start()
+    try:
+        assert locked.wait(10)
+        assert spack.util.lock.write_locked(path, [0, 1, 2]) == [1]
+    finally:
+        done.set()
+        p.join()
+
+
 def test_prefix_read_lock_error(mutable_database, monkeypatch):
     """Cover the prefix read lock exception."""
     def _raise(db, spec):
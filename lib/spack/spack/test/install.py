@@ -8,12 +8,16 @@
 import shutil
 
 import llnl.util.filesystem as fs
+from llnl.util.tty.log import open_log
 
 from spack.package import InstallError, PackageBase, PackageStillNeededError
+import spack.config
 import spack.error
+import spack.hooks
 import spack.patch
 import spack.repo
 import spack.store
+import spack.subprocess_context
 from spack.spec import Spec
 from spack.package import (_spack_build_envfile, _spack_build_logfile,
                            _spack_configure_argsfile)
@@ -335,6 +339,63 @@ def test_uninstall_by_spec_errors(mutable_database):
         PackageBase.uninstall_by_spec(rec.spec)
 
 
+def test_uninstall_by_specs(mutable_database, monkeypatch):
+    """Test uninstalling many specs at once."""
+    mpich = mutable_database.query_one('mpich')
+    dependents = mutable_database.installed_relatives(mpich, 'parents')
+    assert dependents
+
+    # Dependents of the specs must be uninstalled along with them
+    with pytest.raises(PackageStillNeededError, match="Cannot uninstall"):
+        PackageBase.uninstall_by_specs([mpich])
+    assert mpich.package.installed
+
+    writes = []
+    write = spack.database.Database._write
+
+    def _write(db, *args):
+        writes.append(args)
+        return write(db, *args)
+
+    monkeypatch.setattr(spack.database.Database, '_write', _write)
+    specs = [mpich] + list(dependents)
+    PackageBase.uninstall_by_specs(specs, jobs=2)
+
+    # The database is written once, and the prefixes are gone
+    assert len(writes) == 1
+    for spec in specs:
+        assert not mutable_database.query(spec, installed=True)
+        assert not os.path.exists(spec.prefix)
+    assert not os.listdir(spack.store.layout.trash_path)
+
+
+def test_uninstall_by_specs_failing_hook(mutable_database, monkeypatch):
+    """Test that a failing pre-uninstall hook leaves its spec, and the
+    ones after it, installed."""
+    mpich = mutable_database.query_one('mpich')
+    dependents = mutable_database.installed_relatives(mpich, 'parents')
+
+    def _pre_uninstall(spec):
+        if spec.name == 'mpich':
+            raise RuntimeError('pre-uninstall hook failed')
+
+    post_uninstalled = []
+    monkeypatch.setattr(spack.hooks, 'pre_uninstall', _pre_uninstall)
+    monkeypatch.setattr(spack.hooks, 'post_uninstall', post_uninstalled.append)
+
+    with pytest.raises(RuntimeError, match='hook failed'):
+        PackageBase.uninstall_by_specs([mpich] + list(dependents))
+
+    # The dependents went first, and were uninstalled completely
+    assert mpich.package.installed
+    assert os.path.exists(mpich.prefix)
+    for spec in dependents:
+        assert not mutable_database.query(spec, installed=True)
+        assert not os.path.exists(spec.prefix)
+    assert sorted(s.dag_hash() for s in post_uninstalled) == sorted(
+        s.dag_hash() for s in dependents)
+
+
 @pytest.mark.disable_clean_stage_check
 def test_nosource_pkg_install(
         install_mockery, mock_fetch, mock_packages, capfd):
@@ -400,6 +461,18 @@ def test_pkg_build_paths(install_mockery):
     shutil.rmtree(log_dir)
 
 
+def test_install_compressed_build_log(install_mockery, mock_fetch):
+    spec = Spec('dependency-install').concretized()
+    with spack.config.override('config:build_log_compression', 'gzip'):
+        spec.package.do_install()
+
+    # The compressed log is found after compression has been disabled
+    log_path = spec.package.install_log_path
+    assert log_path.endswith(_spack_build_logfile + '.gz')
+    with open_log(log_path) as f:
+        assert "Executing phase: 'install'" in f.read()
+
+
 def test_pkg_install_paths(install_mockery):
     # Get a basic concrete spec for the trivial install package.
     spec = Spec('trivial-install-test-package').concretized()
@@ -531,3 +604,16 @@ def test_install_error():
         assert exc.__class__.__name__ == 'InstallError'
         assert exc.message == msg
         assert exc.long_message == long_msg
+
+
+@pytest.mark.parametrize('method', spack.subprocess_context.start_methods)
+def test_install_build_process_start_methods(install_mockery, method):
+    if not spack.subprocess_context.supported(method):
+        pytest.skip('{0} is not supported by this Python'.format(method))
+
+    spec = Spec('trivial-install-test-package').concretized()
+    with spack.config.override('config:build_process_start_method', method):
+        spec.package.do_install(fake=True)
+
+    assert spec.package.installed
+    assert os.path.isdir(spec.prefix.bin)
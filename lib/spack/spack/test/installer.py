@@ -528,12 +528,29 @@ def test_check_deps_status_install_failure(install_mockery, monkeypatch):
     spec, installer = create_installer('a')
 
     # Make sure the package is identified as failed
-    monkeypatch.setattr(spack.database.Database, 'prefix_failed', _true)
+    def _all_failed(db, specs):
+        return list(specs)
+
+    monkeypatch.setattr(spack.database.Database, 'prefixes_failed',
+                        _all_failed)
 
     with pytest.raises(inst.InstallError, match='install failure'):
         installer._check_deps_status()
 
 
+def test_check_deps_status_installed_not_locked(install_mockery, mock_fetch,
+                                                monkeypatch):
+    spec, installer = create_installer('a')
+    spec['b'].package.do_install()
+
+    # Installed dependencies must not need a lock
+    monkeypatch.setattr(inst.PackageInstaller, '_ensure_locked', _not_locked)
+
+    installer._check_deps_status()
+    assert 'b' in installer.installed
+    assert not installer.locks
+
+
 def test_check_deps_status_write_locked(install_mockery, monkeypatch):
     spec, installer = create_installer('a')
 
@@ -17,6 +17,7 @@
     termios = None
 
 import pytest
+import six
 
 import llnl.util.tty.log
 from llnl.util.lang import uniq
@@ -107,6 +108,67 @@ def test_log_subproc_and_echo_output_capfd(capfd, tmpdir):
         assert capfd.readouterr()[0] == "echo\n"
 
 
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_log_compressed_output(compression, capfd, tmpdir):
+    if not llnl.util.tty.log.compression_supported(compression):
+        pytest.skip('{0} compression is not supported'.format(compression))
+
+    with tmpdir.as_cwd():
+        with log_output('foo.txt', compression=compression) as logger:
+            with logger.force_echo():
+                print('force echo')
+            print('logged')
+
+        with open('foo.txt', 'rb') as f:
+            assert f.read(2) != b'fo'
+
+        with llnl.util.tty.log.open_log('foo.txt') as f:
+            assert f.read() == 'force echo\nlogged\n'
+
+        assert capfd.readouterr()[0] == 'force echo\n'
+
+
+def test_log_max_size(tmpdir):
+    with tmpdir.as_cwd():
+        with log_output('foo.txt', max_size=20, tail_size=30) as logger:
+            for i in range(100):
+                print('line {0}'.format(i))
+
+        with open('foo.txt') as f:
+            lines = f.read().splitlines()
+
+        # The start and the end of the output are logged
+        assert lines[:3] == ['line 0', 'line 1', 'line 2']
+        assert lines[3].startswith('==> Output truncated')
+        assert lines[4:] == ['line {0}'.format(i) for i in range(97, 100)]
+
+        assert len(logger.tail) == 30
+        assert logger.tail.endswith('line 98\nline 99\n')
+
+
+def test_output_split_in_blocks(monkeypatch):
+    """Control and escape sequences split between blocks of output are
+    handled as if they were read at once."""
+    output = 'a\x1b[31mred\x1b[0m\n\x11\nechoed\n\x13\nnot echoed\n'
+
+    for split in range(1, len(output)):
+        log_file = six.StringIO()
+        handler = llnl.util.tty.log._OutputHandler(log_file, False, 0, 0)
+
+        echoed = six.StringIO()
+        monkeypatch.setattr(sys, 'stdout', echoed)
+
+        pending = ''
+        for block in (output[:split], output[split:]):
+            text, pending = llnl.util.tty.log._hold_back(pending + block)
+            handler.handle(text)
+        handler.handle(pending)
+        monkeypatch.undo()
+
+        assert log_file.getvalue() == 'ared\nechoed\nnot echoed\n'
+        assert echoed.getvalue() == 'echoed\n'
+
+
 #
 # Tests below use a pseudoterminal to test llnl.util.tty.log
 #
@@ -8,8 +8,10 @@
 import pytest
 import collections
 
+import spack.caches
 import spack.spec
 import spack.modules.tcl
+import spack.util.file_cache
 from spack.modules.common import UpstreamModuleIndex
 from spack.spec import Spec
 
@@ -186,6 +188,39 @@ def test_get_module_upstream():
         spack.modules.common.upstream_module_index = old_index
 
 
+def test_upstream_module_index_is_cached(tmpdir, monkeypatch):
+    s1 = MockSpec('spec-1')
+    s2 = MockSpec('spec-2')
+
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+
+    root = tmpdir.ensure('modules', dir=True)
+    spack.modules.common.update_module_index(
+        str(root), add={s1.dag_hash(): {'path': '/path/to/a',
+                                        'use_name': 'a'}})
+
+    def read_index():
+        return spack.modules.common._read_upstream_module_index(str(root))
+
+    index = read_index()
+    assert index[s1.dag_hash()].path == '/path/to/a'
+
+    # While the index does not change, the copy in the cache is used
+    def fail(root):
+        raise AssertionError('module index was read again')
+    monkeypatch.setattr(spack.modules.common, 'read_module_index', fail)
+    assert read_index() == index
+    monkeypatch.undo()
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+
+    spack.modules.common.update_module_index(
+        str(root), add={s2.dag_hash(): {'path': '/path/to/b',
+                                        'use_name': 'b'}})
+    index = read_index()
+    assert index[s2.dag_hash()].use_name == 'b'
+
+
 def test_load_installed_package_not_in_repo(install_mockery, mock_fetch,
                                             monkeypatch):
     # Get a basic concrete spec for the trivial install package.
@@ -3,6 +3,8 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import os
+
 import pytest
 
 import spack.modules.common
@@ -263,6 +265,78 @@ def test_module_index(
         assert len(index) == 1
         assert index[s3.dag_hash()].use_name == w3.layout.use_name
 
+    def test_module_index_updates(
+            self, module_configuration, factory, tmpdir_factory,
+            monkeypatch):
+
+        module_configuration('suffix')
+
+        w1, s1 = factory('mpileaks')
+        w2, s2 = factory('callpath')
+
+        test_root = str(tmpdir_factory.mktemp('module-root'))
+        index_path = os.path.join(
+            test_root, spack.modules.common.module_index_name)
+        e1 = spack.modules.common.module_index_entry(w1)
+        e2 = spack.modules.common.module_index_entry(w2)
+
+        def lines():
+            with open(index_path) as f:
+                return len(f.readlines())
+
+        # Changes are appended to the index
+        spack.modules.common.update_module_index(
+            test_root, add={s1.dag_hash(): e1})
+        spack.modules.common.update_module_index(
+            test_root, add={s1.dag_hash(): e1, s2.dag_hash(): e2})
+        assert lines() == 2
+        spack.modules.common.update_module_index(
+            test_root, remove=[s1.dag_hash()])
+        assert lines() == 3
+
+        index = spack.modules.common.read_module_index(test_root)
+        assert list(index) == [s2.dag_hash()]
+        assert index[s2.dag_hash()].path == w2.layout.filename
+
+        # The index is compacted when most of its lines are superseded
+        monkeypatch.setattr(spack.modules.common, 'module_index_slack', 2)
+        spack.modules.common.update_module_index(
+            test_root, remove=[s2.dag_hash()])
+        assert lines() == 0
+        assert spack.modules.common.read_module_index(test_root) == {}
+
+    def test_legacy_module_index(
+            self, module_configuration, factory, tmpdir_factory):
+
+        module_configuration('suffix')
+
+        w1, s1 = factory('mpileaks')
+        w2, s2 = factory('callpath')
+
+        test_root = tmpdir_factory.mktemp('module-root')
+        test_root.join('module-index.yaml').write("""\
+module_index:
+  {0}:
+    path: {1}
+    use_name: {2}
+""".format(s1.dag_hash(), w1.layout.filename, w1.layout.use_name))
+        test_root = str(test_root)
+
+        index = spack.modules.common.read_module_index(test_root)
+        assert index[s1.dag_hash()].use_name == w1.layout.use_name
+
+        # Updates convert the index to the new format
+        spack.modules.common.generate_module_index(test_root, [w2])
+        assert os.path.exists(os.path.join(
+            test_root, spack.modules.common.module_index_name))
+        assert not os.path.exists(os.path.join(
+            test_root, spack.modules.common.legacy_module_index_name))
+
+        index = spack.modules.common.read_module_index(test_root)
+        assert len(index) == 2
+        assert index[s1.dag_hash()].path == w1.layout.filename
+        assert index[s2.dag_hash()].path == w2.layout.filename
+
     def test_suffixes(self, module_configuration, factory):
         """Tests adding suffixes to module file name."""
         module_configuration('suffix')
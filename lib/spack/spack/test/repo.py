@@ -5,9 +5,15 @@
 
 import os
 import pytest
+import six
 
+import spack.caches
+import spack.config
+import spack.dependency
+import spack.package
 import spack.repo
 import spack.paths
+import spack.util.file_cache
 
 
 @pytest.fixture()
@@ -67,3 +73,130 @@ def test_repo_invisibles(mutable_mock_repo, extra_repo):
     with open(os.path.join(extra_repo.root, 'packages', '.invisible'), 'w'):
         pass
     extra_repo.all_package_names()
+
+
+def _inverted_from_packages():
+    """Dependents computed by loading all the package classes."""
+    dag = {}
+    for name in spack.repo.path.all_package_names():
+        dag.setdefault(name, set())
+        for dep in spack.repo.path.get_pkg_class(name).dependencies:
+            deps = [dep]
+            if spack.repo.path.is_virtual(dep):
+                deps += [s.name for s in spack.repo.path.providers_for(dep)]
+            for d in deps:
+                dag.setdefault(d, set()).add(name)
+    return dag
+
+
+def test_dependency_index_matches_packages(mock_packages):
+    index = spack.repo.path.dependency_index
+    assert index.inverted() == _inverted_from_packages()
+
+    for name in spack.repo.path.all_package_names():
+        pkg_cls = spack.repo.path.get_pkg_class(name)
+        assert set(index.dependencies_of(name)) == set(pkg_cls.dependencies)
+        for deptype in spack.dependency.all_deptypes:
+            expected = [
+                dep for dep, conds in pkg_cls.dependencies.items()
+                if any(deptype in d.type for d in conds.values())]
+            assert set(index.dependencies_of(name, deptype)) == set(expected)
+
+
+def test_dependency_index_queries(mock_packages):
+    index = spack.repo.path.dependency_index
+
+    assert index.is_virtual('mpi')
+    assert not index.is_virtual('mpich')
+    assert index.providers_for('mpi') == sorted(set(
+        s.name for s in spack.repo.path.providers_for('mpi')))
+
+    assert index.dependents_of('libelf') == set(
+        ['dyninst', 'libdwarf',
+         'patch-a-dependency', 'patch-several-dependencies'])
+    assert 'mpileaks' in index.dependents_of('libelf', transitive=True)
+    assert 'mpileaks' in index.dependents_of('mpich', transitive=True)
+    assert 'mpileaks' not in index.dependents_of(
+        'mpich', transitive=True, expand_virtuals=False)
+
+    expected = spack.package.possible_dependencies('mpileaks')
+    assert index.possible_dependencies('mpileaks') == (
+        set(expected) - set(['mpileaks']))
+
+    build_only = index.possible_dependencies('dtbuild1', deptype='build')
+    assert build_only == set(
+        spack.package.possible_dependencies('dtbuild1', deptype='build')
+    ) - set(['dtbuild1'])
+
+
+def test_dependency_index_update(mutable_mock_repo, extra_repo):
+    index = spack.repo.DependencyIndex()
+    index.update_package('builtin.mock.mpileaks')
+    assert 'mpileaks' in index
+    assert index.dependents_of('callpath') == set(['mpileaks'])
+
+    stream = six.StringIO()
+    index.to_json(stream)
+    stream.seek(0)
+    copy = spack.repo.DependencyIndex.from_json(stream)
+    assert copy.inverted() == index.inverted()
+
+    index.remove_package('mpileaks')
+    assert 'mpileaks' not in index
+    assert index.dependents_of('callpath') == set()
+
+    # Packages missing from the repositories are not part of the index
+    mutable_mock_repo.put_first(extra_repo)
+    assert 'a' in mutable_mock_repo.dependency_index
+
+
+@pytest.fixture()
+def package_checker(tmpdir, monkeypatch, mutable_config):
+    """Returns a function that creates a package checker for a repository
+    with packages ``a`` and ``b``, as a new Spack process would."""
+    packages = tmpdir.ensure('packages', dir=True)
+    for name in ('a', 'b'):
+        packages.ensure(name, 'package.py')
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+
+    def _checker():
+        monkeypatch.setattr(spack.repo.FastPackageChecker, '_paths_cache', {})
+        return spack.repo.FastPackageChecker(str(packages))
+    _checker.packages = packages
+    return _checker
+
+
+def _touch_later(path):
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+    return mtime
+
+
+def test_package_checker_manifest(package_checker):
+    spack.config.set('config:repo_manifest_ttl', 60)
+    mtime = package_checker()['a'].st_mtime
+
+    # Package files are not checked until the manifest expires
+    _touch_later(str(package_checker.packages.join('a', 'package.py')))
+    assert package_checker()['a'].st_mtime == mtime
+
+    # but new packages are found
+    package_checker.packages.ensure('c', 'package.py')
+    _touch_later(str(package_checker.packages))
+    checker = package_checker()
+    assert sorted(checker) == ['a', 'b', 'c']
+    assert checker['a'].st_mtime == mtime
+
+    manifest = checker._read_manifest()
+    manifest['validated'] -= 60
+    checker._write_manifest(manifest)
+    assert package_checker()['a'].st_mtime != mtime
+
+
+def test_package_checker_without_manifest(package_checker):
+    mtime = package_checker()['a'].st_mtime
+    assert package_checker()._read_manifest() is None
+
+    _touch_later(str(package_checker.packages.join('a', 'package.py')))
+    assert package_checker()['a'].st_mtime != mtime
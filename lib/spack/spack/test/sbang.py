@@ -16,6 +16,9 @@
 from llnl.util.filesystem import mkdirp
 
 import spack.paths
+import spack.spec
+import spack.util.prefix_scan
+from spack.hooks import sbang
 from spack.hooks.sbang import shebang_too_long, filter_shebangs_in_directory
 from spack.util.executable import which
 
@@ -157,3 +160,17 @@ def test_shebang_handles_non_writable_files(script_dir):
 
     st = os.stat(script_dir.long_shebang)
     assert oct(not_writable_mode) == oct(st.st_mode)
+
+
+def test_sbang_post_install_hook(script_dir):
+    spec = spack.spec.Spec('libelf')
+    spec.prefix = script_dir.tempdir
+    spec._concrete = True
+    spack.util.prefix_scan.clear_cache()
+
+    sbang.post_install(spec)
+
+    with open(script_dir.long_shebang, 'r') as f:
+        assert f.readline() == sbang_line
+    with open(script_dir.short_shebang, 'r') as f:
+        assert f.readline() == short_line
@@ -89,3 +89,33 @@ def test_yaml_aliases():
 
     # ensure no YAML aliases appear in syaml dumps.
     assert '*id' not in string
+
+
+#: Scalars that need quoting, or a particular representation, in YAML
+_tricky_scalars = [
+    'true', 'True', 'false', 'null', 'Null', '~', 'yes', 'no', 'on', 'y',
+    '1', '0', '09', '1.0', '1.', '.5', '1e5', '1_000', '0x1F', '0o17',
+    '.inf', '-.inf', '.nan', '2020-01-01', '12:30:00', '1.2.11', '2020.01',
+    'a-b', '-a', '.a', '_a', '+a', 'a b', 'a: b', '#a', 'a #b', '*a', '&a',
+    '!a', '%a', '@a', '`a', '|a', '>a', '?a', "it's", '"a"', '[a]', '{a}',
+    'a,b', '', ' ', 'a\tb', 'café', 'a\nb', 'x' * 200,
+    True, False, None, 0, -3, 10 ** 20, 1.5, syaml.syaml_int(4),
+    syaml.syaml_str('1.0'),
+]
+
+
+@pytest.mark.parametrize('value', _tricky_scalars)
+def test_flow_text(value):
+    """Ensure flow_text() is the same as the YAML emitter's flow style."""
+    for data in (
+            [value],
+            {'key': value},
+            syaml.syaml_dict([('a', {'b': [[value], {'c': value}]})]),
+    ):
+        expected = syaml.dump(data, default_flow_style=True)
+        assert syaml.flow_text(data) + '\n' == expected
+
+    # Keys are a different context for the emitter
+    data = syaml.syaml_dict([(value, 'v'), ('b', {value: 0})])
+    expected = syaml.dump(data, default_flow_style=True)
+    assert syaml.flow_text(data) + '\n' == expected
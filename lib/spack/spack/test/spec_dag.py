@@ -6,6 +6,8 @@
 """
 These tests check Spec DAG operations using dummy packages.
 """
+import sys
+
 import pytest
 import spack.architecture
 import spack.package
@@ -287,6 +289,35 @@ def test_postorder_path_traversal(self):
         traversal = dag.traverse(cover='paths', depth=True, order='post')
         assert [(x, y.name) for x, y in traversal] == pairs
 
+    def test_deep_traversal(self):
+        # Traversals must not be limited by the recursion limit
+        length = 2 * sys.getrecursionlimit()
+        specs = [Spec('node{0}'.format(i)) for i in range(length)]
+        for parent, child in zip(specs, specs[1:]):
+            parent._add_dependency(child, ('build', 'link'))
+
+        traversal = specs[0].traverse(depth=True, order='post')
+        assert [(x, y) for x, y in traversal] == list(
+            reversed(list(enumerate(specs))))
+
+    def test_topological_order(self):
+        dag = Spec('mpileaks ^zmpi')
+        dag.normalize()
+
+        names = ['libelf', 'libdwarf', 'dyninst', 'fake', 'zmpi', 'callpath',
+                 'mpileaks']
+        assert [x.name for x in dag.topological_order()] == names
+        assert [x.name for x in dag.topological_order(deptype='run')] == [
+            'mpileaks']
+
+        # The order is cached for concrete specs only
+        assert dag.topological_order() is not dag.topological_order()
+        dag = Spec('mpileaks ^zmpi').concretized()
+        order = dag.topological_order()
+        assert order is dag.topological_order()
+        assert order == tuple(dag.traverse(order='post'))
+        assert dag.copy().topological_order() == order
+
     def test_conflicting_spec_constraints(self):
         mpileaks = Spec('mpileaks ^mpich ^callpath ^dyninst ^libelf ^libdwarf')
 
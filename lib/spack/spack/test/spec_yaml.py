@@ -9,8 +9,11 @@
 
 """
 import ast
+import base64
+import hashlib
 import inspect
 import os
+import sys
 
 from collections import Iterable, Mapping
 
@@ -211,6 +214,123 @@ def test_ordered_read_not_required_for_consistent_dag_hash(
         assert spec.full_hash() == round_trip_reversed_json_spec.full_hash()
 
 
+#: Hashes computed by the YAML emitter based implementation. They must never
+#: change, or existing installations would no longer be found. Full hashes
+#: depend on the content of package files, so they are not pinned: they are
+#: checked against the YAML emitter in the test instead.
+_golden_hashes = [
+    ('mpileaks ^mpich',
+     'b4ervofanrurvlocnwdcezqekdphknd6',
+     'b4ervofanrurvlocnwdcezqekdphknd6'),
+    ('dyninst',
+     'xvb3xy52riui7jyceawrf3v3p4k5m4qk',
+     'xvb3xy52riui7jyceawrf3v3p4k5m4qk'),
+    ('externaltool',
+     'g23g42apkjyzmtuatxvabiaffh2u25kp',
+     'g23g42apkjyzmtuatxvabiaffh2u25kp'),
+    ('multivalue-variant',
+     'pa55sqdrnci2bbj27qpr5jurxjv3tvou',
+     'pa55sqdrnci2bbj27qpr5jurxjv3tvou'),
+    ('patch-several-dependencies',
+     'ijm6xlzene7rgn4wa4yelferavt6n5ku',
+     'ijm6xlzene7rgn4wa4yelferavt6n5ku'),
+    ('a cflags="-O3 -g" foobar=bar',
+     '55n6q7eauhyomqi4qpklxwxvtarqbf4w',
+     '55n6q7eauhyomqi4qpklxwxvtarqbf4w'),
+    ('dttop',
+     'ka2ompwmyzpeujhya4fxqum22ulvivq7',
+     'jltbkdehiyywjz2eyzrq2qwdrkfi65om'),
+    ('dt-diamond',
+     'anjlas2ya4oevzxfljpmllyu6xdl3snp',
+     'ilujqskux556szvkw733lfugezgkguas'),
+]
+
+
+def _emitter_hash(spec, hash):
+    """Hash of a node as computed by the YAML emitter based implementation.
+    """
+    yaml_text = syaml.dump(
+        spec.to_node_dict(hash=hash), default_flow_style=True)
+    sha = hashlib.sha1(yaml_text.encode('utf-8'))
+    b32_hash = base64.b32encode(sha.digest()).lower()
+    if sys.version_info[0] >= 3:
+        b32_hash = b32_hash.decode('utf-8')
+    return b32_hash
+
+
+@pytest.mark.parametrize('spec,dag_hash,build_hash', _golden_hashes)
+def test_golden_hashes(config, mock_packages, spec, dag_hash, build_hash):
+    spec = Spec(spec).concretized()
+    assert spec.dag_hash() == dag_hash
+    assert spec.build_hash() == build_hash
+
+    # Hashing each node on its own, or with the YAML emitter, gives the
+    # same result
+    for node in spec.traverse():
+        for hash in (ht.dag_hash, ht.build_hash, ht.full_hash):
+            expected = node._cached_hash(hash)
+            assert node._spec_hash(hash) == expected
+            assert _emitter_hash(node, hash) == expected
+
+
+_golden_yaml = """\
+spec:
+- odd:
+    version: '1.10'
+    arch:
+      platform: test
+      platform_os: debian6
+      target: x86_64
+    compiler:
+      name: gcc
+      version: 4.5.0
+    namespace: builtin.mock
+    parameters:
+      shared: true
+      languages: [c, c++, fortran]
+      build_type: RelWithDebInfo
+      cflags: ['-O2', '-DNAME="a b"', '-Wl,-rpath,/opt/x y']
+      cppflags: []
+      cxxflags: []
+      fflags: []
+      ldflags: ['--as-needed']
+      ldlibs: []
+    external:
+      path: '/opt/with space/#odd: path'
+      module: ['mod/1.0', 'null']
+      extra_attributes: {}
+    dependencies:
+      dep:
+        hash: 2222aaaabbbbccccddddeeeeffffgggg
+        type: [build, link]
+- dep:
+    version: 2020.01
+    arch:
+      platform: test
+      platform_os: debian6
+      target: x86_64
+    compiler:
+      name: gcc
+      version: 4.5.0
+    namespace: builtin.mock
+    parameters:
+      cflags: []
+      cppflags: []
+      cxxflags: []
+      fflags: []
+      ldflags: []
+      ldlibs: []
+"""
+
+
+def test_golden_hashes_from_yaml(config, mock_packages):
+    """Ensure values that need quoting in YAML are hashed as before."""
+    spec = Spec.from_yaml(_golden_yaml)
+    assert spec.dag_hash() == 'inoa6eq3utld5fiqmxkkt2higfhqrc6c'
+    assert spec.build_hash() == 'inoa6eq3utld5fiqmxkkt2higfhqrc6c'
+    assert spec['dep'].dag_hash() == 'yd7okwz4e2oxl4qolyxhmqkqrigjqnc7'
+
+
 @pytest.mark.parametrize("module", [
     spack.spec,
     spack.architecture,
@@ -204,3 +204,110 @@ def test_candidate_urls(pkg_factory, url, urls, version, expected):
     pkg = pkg_factory(url, urls, fetch_options={'timeout': 60})
     f = fs._from_merged_attrs(fs.URLFetchStrategy, pkg, version)
     assert f.extra_options == {'timeout': 60}
+
+
+def _archive_digest(path):
+    return crypto.checksum(crypto.hash_fun_for_algo('sha256'), path)
+
+
+def test_fetch_computes_checksum(tmpdir, mock_archive, config, monkeypatch):
+    """Ensure the checksum is computed while fetching, so that checking the
+    archive does not read it again."""
+    digest = _archive_digest(mock_archive.archive_file)
+    fetcher = fs.URLFetchStrategy(mock_archive.url, sha256=digest)
+    with Stage(fetcher, path=str(tmpdir)):
+        fetcher.fetch()
+
+        def _fail(*args, **kwargs):
+            raise AssertionError('archive was read again')
+
+        monkeypatch.setattr(crypto, 'checksum', _fail)
+        fetcher.check()
+
+        # A modified archive is read again, and fails the check
+        monkeypatch.undo()
+        with open(fetcher.archive_file, 'ab') as f:
+            f.write(b'garbage')
+        with pytest.raises(fs.ChecksumError):
+            fetcher.check()
+
+
+@pytest.mark.parametrize('connections', [2, 3, 7])
+def test_fetch_ranges(tmpdir, mock_archive, config, connections):
+    """Ensure archives downloaded in ranges are assembled correctly."""
+    digest = _archive_digest(mock_archive.archive_file)
+    fetcher = fs.URLFetchStrategy(mock_archive.url, sha256=digest)
+    with spack.config.override('config:fetch_parallel_min_mb', 0):
+        with spack.config.override('config:fetch_connections', connections):
+            with Stage(fetcher, path=str(tmpdir)) as stage:
+                fetcher.fetch()
+                fetcher.check()
+
+                with open(mock_archive.archive_file, 'rb') as f:
+                    expected = f.read()
+                with open(fetcher.archive_file, 'rb') as f:
+                    assert f.read() == expected
+
+                # Chunk files are removed once assembled
+                assert os.listdir(stage.path) == [
+                    os.path.basename(fetcher.archive_file)]
+
+
+def test_fetch_without_ranges_by_default(
+        tmpdir, mock_archive, config, monkeypatch):
+    """Ensure the server is not asked about ranges unless parallel
+    downloads are enabled."""
+    def _fail(*args, **kwargs):
+        raise AssertionError('server was asked about ranges')
+
+    monkeypatch.setattr(fs.URLFetchStrategy, '_ranged_size', _fail)
+    fetcher = fs.URLFetchStrategy(mock_archive.url)
+    with spack.config.override('config:fetch_parallel_min_mb', 0):
+        with Stage(fetcher, path=str(tmpdir)):
+            fetcher.fetch()
+            assert os.path.exists(fetcher.archive_file)
+
+
+def test_download_ranges_resumes(tmpdir):
+    """Ensure interrupted ranges are resumed from the data received."""
+    data = b''.join(bytes(bytearray([i % 256])) for i in range(1000))
+    requests = []
+
+    def _fetch_range(start, end, path):
+        first = all(e != end for _, e in requests)
+        requests.append((start, end))
+        with open(path, 'wb') as f:
+            if first:
+                # Interrupt the first transfer of each range halfway
+                f.write(data[start:start + (end - start + 1) // 2])
+                raise fs._ResumableRangeError()
+            f.write(data[start:end + 1])
+        return {}
+
+    partial_file = str(tmpdir.join('archive.part'))
+    checksum = fs._IncrementalChecksum(
+        crypto.hash_fun_for_algo('sha256'), partial_file)
+    fs._download_ranges('url', _fetch_range, len(data), partial_file,
+                        connections=3, retries=1, checksum=checksum)
+
+    with open(partial_file, 'rb') as f:
+        assert f.read() == data
+    assert checksum.hexdigest() == crypto.hash_fun_for_algo('sha256')(
+        data).hexdigest()
+
+    # Resumed requests start where the interrupted ones stopped
+    assert len(requests) == 6
+    starts = sorted(start for start, _ in requests)
+    assert starts == [0, 167, 334, 501, 668, 834]
+
+
+def test_download_ranges_gives_up(tmpdir):
+    """Ensure ranges interrupted too many times fail the download."""
+    def _fetch_range(start, end, path):
+        raise fs._ResumableRangeError()
+
+    partial_file = str(tmpdir.join('archive.part'))
+    with pytest.raises(fs.FailedDownloadError):
+        fs._download_ranges('url', _fetch_range, 100, partial_file,
+                            connections=2, retries=2)
+    assert os.listdir(str(tmpdir)) == []
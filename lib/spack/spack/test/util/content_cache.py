@@ -0,0 +1,138 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Test the content-addressed cache of source archives."""
+import os
+
+import pytest
+
+import spack.util.crypto as crypto
+from spack.util.content_cache import ContentCache, reflink
+
+
+def _digest(algo, data):
+    hasher = crypto.hash_fun_for_algo(algo)()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+@pytest.fixture()
+def archive(tmpdir):
+    def _archive(name, data):
+        path = tmpdir.join(name)
+        path.write_binary(data)
+        return str(path)
+    return _archive
+
+
+@pytest.fixture()
+def cache(tmpdir):
+    return ContentCache(str(tmpdir.join('cache')))
+
+
+def test_store_and_fetch(cache, archive, tmpdir):
+    path = archive('a.tar.gz', b'contents')
+    sha256 = _digest('sha256', b'contents')
+
+    entry = cache.store(path, sha256)
+    assert entry == cache.path_for(sha256)
+    assert not os.stat(entry).st_mode & 0o222
+
+    dest = str(tmpdir.join('stage.tar.gz'))
+    assert cache.fetch(sha256, dest)
+    with open(dest, 'rb') as f:
+        assert f.read() == b'contents'
+
+
+def test_identical_archives_stored_once(cache, archive):
+    sha256 = _digest('sha256', b'contents')
+    md5 = _digest('md5', b'contents')
+
+    first = cache.store(archive('a.tar.gz', b'contents'), sha256)
+    second = cache.store(archive('b.tar.gz', b'contents'), md5)
+    assert first == second
+    assert cache.size() == len(b'contents')
+
+    # Either checksum finds the same entry
+    assert cache.find(md5) == cache.find(sha256) == first
+
+
+def test_store_checksum_mismatch(cache, archive):
+    path = archive('a.tar.gz', b'contents')
+    assert cache.store(path, _digest('sha256', b'other')) is None
+    assert cache.size() == 0
+
+
+def test_find_missing(cache):
+    assert cache.find(_digest('sha256', b'missing')) is None
+    assert cache.find('not-a-digest') is None
+
+
+def test_fetch_evicted_entry(cache, archive, tmpdir, monkeypatch):
+    sha256 = _digest('sha256', b'contents')
+    entry = cache.store(archive('a.tar.gz', b'contents'), sha256)
+
+    # The entry is evicted between finding and copying it
+    find = cache.find
+
+    def _find(digest):
+        path = find(digest)
+        os.remove(path)
+        return path
+
+    monkeypatch.setattr(cache, 'find', _find)
+    dest = str(tmpdir.join('stage.tar.gz'))
+    assert not cache.fetch(sha256, dest)
+    assert not reflink(entry, dest)
+    assert not os.path.exists(dest)
+
+
+def test_shared_with_group(tmpdir, archive):
+    cache = ContentCache(str(tmpdir.join('shared', 'cache')))
+    old_umask = os.umask(0o022)
+    try:
+        sha256 = _digest('sha256', b'contents')
+        entry = cache.store(archive('a.tar.gz', b'contents'),
+                            _digest('md5', b'contents'))
+        cache.evict(0)
+    finally:
+        os.umask(old_umask)
+
+    # Directories and the lock are writable by the group, as by the owner
+    paths = [cache.root, os.path.join(cache.root, '.lock'),
+             os.path.dirname(entry), os.path.dirname(cache.path_for(sha256)),
+             os.path.dirname(cache.path_for(_digest('md5', b'contents')))]
+    for path in paths:
+        mode = os.stat(path).st_mode
+        assert mode & 0o070 == (mode & 0o700) >> 3
+
+
+def test_evict_least_recently_used(cache, archive):
+    entries = []
+    for i in range(3):
+        data = b'x' * 100 + str(i).encode()
+        entry = cache.store(archive(str(i), data), _digest('md5', data))
+        entries.append(entry)
+        os.utime(entry, (1000 + i, 1000 + i))
+
+    # Using the oldest entry makes it the most recently used
+    cache.find(_digest('md5', b'x' * 100 + b'0'))
+
+    removed = cache.evict(250)
+    assert removed == [entries[1]]
+    assert cache.size() <= 250
+
+    # Links from other checksum types to evicted entries are removed
+    md5_links = [os.path.join(d, f)
+                 for d, _, files in os.walk(os.path.join(cache.root, 'md5'))
+                 for f in files]
+    assert len(md5_links) == 2
+
+
+def test_size_limit(tmpdir, archive):
+    cache = ContentCache(str(tmpdir.join('cache')), size_limit=150)
+    for i in range(3):
+        cache.store(archive(str(i), b'x' * 100 + str(i).encode()))
+    assert cache.size() <= 150
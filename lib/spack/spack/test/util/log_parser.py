@@ -3,7 +3,13 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-from ctest_log_parser import CTestLogParser
+import gzip
+import sre_parse
+
+import ctest_log_parser
+from ctest_log_parser import CTestLogParser, LogScanner
+
+from spack.util.log_parse import parse_log_events
 
 
 def test_log_parser(tmpdir):
@@ -32,3 +38,76 @@ def test_log_parser(tmpdir):
 
     assert len(warnings) == 1
     assert all(w.text.endswith('W') for w in warnings)
+
+
+def test_parse_compressed_log(tmpdir):
+    log_file = str(tmpdir.join('log.txt.gz'))
+    with gzip.open(log_file, 'wb') as f:
+        f.write(b"""checking for gcc... /usr/bin/gcc
+foo.c:3: error: something happened
+/var/tmp/build/foo.py:60: warning: some weird warning
+""")
+
+    errors, warnings = parse_log_events(log_file)
+    assert [e.text for e in errors] == ['foo.c:3: error: something happened']
+    assert len(warnings) == 1
+
+
+log_text = """checking for gcc... /usr/bin/gcc
+foo.c:3: error: expected ';'
+make[2]: *** [foo.o] Error 1
+/var/tmp/build/foo.py:60: warning: some weird warning
+checking for ld... /usr/bin/ld
+collect2: ld returned 1 exit status
+done"""
+
+
+def test_log_scanner_incremental():
+    expected = CTestLogParser().parse(log_text.splitlines(True), context=2)
+
+    # The log may be fed in chunks of any size
+    for size in (1, 7, 100):
+        scanner = LogScanner(context=2)
+        for i in range(0, len(log_text), size):
+            scanner.feed(log_text[i:i + size])
+        errors, warnings = scanner.finish()
+
+        for found, events in ((errors, expected[0]), (warnings, expected[1])):
+            assert [(e.line_no, e.text, e.pre_context, e.post_context)
+                    for e in found] == [
+                (e.line_no, e.text, e.pre_context, e.post_context)
+                for e in events]
+
+    assert [e.line_no for e in expected[0]] == [2, 3, 6]
+    assert expected[0][2].pre_context == [
+        '/var/tmp/build/foo.py:60: warning: some weird warning',
+        'checking for ld... /usr/bin/ld']
+    assert expected[0][2].post_context == ['done']
+
+
+def test_log_scanner_max_errors():
+    scanner = LogScanner(context=1, max_errors=1)
+    scanner.feed(log_text[:40])
+    assert not scanner.done
+
+    # Scanning stops once the context of the first error is complete
+    scanner.feed(log_text[40:])
+    assert scanner.done
+    errors, warnings = scanner.finish()
+    assert [e.line_no for e in errors] == [2]
+    assert errors[0].post_context == ['make[2]: *** [foo.o] Error 1']
+    assert not warnings
+
+
+def test_event_keys():
+    """Every regex for errors and warnings requires one of the keys."""
+    keys = ctest_log_parser.event_keys()
+    patterns = ctest_log_parser._all_patterns(
+        ctest_log_parser._error_matches + ctest_log_parser._warning_matches)
+    for pattern in patterns:
+        required = ctest_log_parser._required_strings(sre_parse.parse(pattern))
+        assert all(any(k in s for k in keys) for s in required)
+
+    strings = ctest_log_parser._required_strings(
+        sre_parse.parse(r'^(foo|bar)+ ?[0-9]: bazz.*'))
+    assert strings == set([': bazz'])
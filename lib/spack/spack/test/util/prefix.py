@@ -5,6 +5,8 @@
 
 """Tests various features of :py:class:`spack.util.prefix.Prefix`"""
 
+import pickle
+
 from spack.util.prefix import Prefix
 
 
@@ -74,3 +76,14 @@ def test_string_like_behavior():
     assert prefix.find('u', 1)
     assert prefix.upper() == '/USR'
     assert prefix.lstrip('/') == 'usr'
+
+
+def test_pickle():
+    """Test that prefixes can be pickled, e.g. to be sent to build
+    processes"""
+    prefix = Prefix('/usr')
+    copy = pickle.loads(pickle.dumps(prefix))
+
+    assert copy == prefix
+    assert isinstance(copy, Prefix)
+    assert copy.bin == '/usr/bin'
@@ -0,0 +1,65 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Test the shared prefix scan used by post-install hooks."""
+import os
+
+import pytest
+
+import spack.util.prefix_scan as prefix_scan
+
+
+@pytest.fixture()
+def prefix(tmpdir):
+    tmpdir.ensure('bin', 'script')
+    tmpdir.ensure('lib', 'python', 'module.py')
+    tmpdir.join('bin', 'link').mksymlinkto(tmpdir.join('bin', 'script'))
+    tmpdir.join('dirlink').mksymlinkto(tmpdir.join('lib'))
+    yield str(tmpdir)
+    prefix_scan.clear_cache()
+
+
+def test_scan_prefix_kinds(prefix):
+    entries = dict(
+        (os.path.relpath(e.path, prefix), e.kind)
+        for e in prefix_scan.scan_prefix(prefix)
+    )
+    assert entries == {
+        'bin': prefix_scan.DIR,
+        os.path.join('bin', 'script'): prefix_scan.FILE,
+        os.path.join('bin', 'link'): prefix_scan.LINK,
+        'lib': prefix_scan.DIR,
+        os.path.join('lib', 'python'): prefix_scan.DIR,
+        os.path.join('lib', 'python', 'module.py'): prefix_scan.FILE,
+        'dirlink': prefix_scan.LINK,
+    }
+
+
+def test_scan_prefix_is_cached(prefix):
+    first = prefix_scan.scan_prefix(prefix)
+    assert prefix_scan.scan_prefix(prefix) is first
+
+    prefix_scan.clear_cache()
+    assert prefix_scan.scan_prefix(prefix) is not first
+
+
+def test_scan_missing_prefix(tmpdir):
+    assert prefix_scan.scan_prefix(str(tmpdir.join('missing'))) == []
+
+
+@pytest.mark.parametrize('nitems', [1, 1000])
+def test_parallel_map(nitems):
+    items = list(range(nitems))
+    assert prefix_scan.parallel_map(lambda x: 2 * x, items) == [
+        2 * x for x in items
+    ]
+
+
+def test_parallel_map_propagates_errors():
+    def _fail(x):
+        raise ValueError(x)
+
+    with pytest.raises(ValueError):
+        prefix_scan.parallel_map(_fail, list(range(1000)))
@@ -0,0 +1,105 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Tests for span-style install tracing."""
+import json
+
+import pytest
+
+import spack.util.tracing as tracing
+
+
+def _read_events(path, fmt):
+    with open(path) as f:
+        text = f.read()
+    if fmt == 'chrome':
+        # The closing bracket is optional in the JSON array format
+        return json.loads(text.rstrip().rstrip(',') + ']')
+    return [json.loads(line) for line in text.splitlines()]
+
+
+@pytest.mark.parametrize('fmt', tracing.formats)
+def test_spans_are_recorded(tmpdir, fmt):
+    path = str(tmpdir.join('trace'))
+    with tracing.tracing_to(path, fmt):
+        assert tracing.enabled()
+        with tracing.span('outer', 'phase', package='zlib'):
+            with tracing.span('inner', 'hook'):
+                pass
+    assert not tracing.enabled()
+
+    inner, outer = _read_events(path, fmt)
+    assert (inner['name'], inner['cat']) == ('inner', 'hook')
+    assert (outer['name'], outer['cat']) == ('outer', 'phase')
+    assert outer['args'] == {'package': 'zlib'}
+    assert outer['ph'] == 'X'
+    assert outer['ts'] <= inner['ts']
+    assert outer['dur'] >= inner['dur']
+
+
+@pytest.mark.parametrize('fmt', tracing.formats)
+def test_append_to_trace(tmpdir, fmt):
+    path = str(tmpdir.join('trace'))
+    with tracing.tracing_to(path, fmt):
+        tracing.record('first', 'install', 0, 1)
+
+    # e.g. a build process that was not forked from the tracing process
+    tracing.enable(path, fmt, append=True)
+    try:
+        tracing.record('second', 'phase', 1, 1)
+    finally:
+        tracing.disable()
+
+    events = _read_events(path, fmt)
+    assert [e['name'] for e in events] == ['first', 'second']
+
+
+def test_span_records_errors(tmpdir):
+    path = str(tmpdir.join('trace.jsonl'))
+    with tracing.tracing_to(path, 'jsonl'):
+        with pytest.raises(ValueError):
+            with tracing.span('failing', 'phase'):
+                raise ValueError()
+
+    event, = _read_events(path, 'jsonl')
+    assert event['args'] == {'error': 'ValueError'}
+
+
+def test_traced_decorator_and_context(tmpdir):
+    class Context(object):
+        def __enter__(self):
+            return 'value'
+
+        def __exit__(self, type, value, traceback):
+            pass
+
+    @tracing.traced('decorated', 'phase')
+    def decorated():
+        return 42
+
+    context = Context()
+    assert tracing.traced_context(context, 'context', 'db') is context
+
+    path = str(tmpdir.join('trace.jsonl'))
+    with tracing.tracing_to(path, 'jsonl'):
+        assert decorated() == 42
+        with tracing.traced_context(context, 'context', 'db') as value:
+            assert value == 'value'
+
+    names = [e['name'] for e in _read_events(path, 'jsonl')]
+    assert names == ['decorated', 'context']
+
+
+def test_tracing_disabled_by_default(tmpdir):
+    assert not tracing.enabled()
+    with tracing.tracing_to(None):
+        with tracing.span('nothing', 'phase'):
+            pass
+    assert not tmpdir.listdir()
+
+
+def test_unknown_format(tmpdir):
+    with pytest.raises(ValueError):
+        tracing.enable(str(tmpdir.join('trace')), 'xml')
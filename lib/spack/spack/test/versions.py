@@ -374,6 +374,20 @@ def test_intersect_with_containment():
     check_intersection('1.6:1.6.5', '1.6', ':1.6.5')
 
 
+def test_intersection_of_long_lists():
+    a = VersionList(['1.{0}'.format(i) for i in range(0, 100, 2)])
+    b = VersionList(
+        ['1.{0}:1.{1}'.format(i, i + 1) for i in range(0, 100, 10)])
+    check_intersection(['1.{0}'.format(i) for i in range(0, 100, 10)], a, b)
+    check_intersection(['1.{0}'.format(i) for i in range(0, 100, 10)], b, a)
+    check_intersection(a, a, ':')
+
+
+def test_list_contains_versions_of_any_element():
+    assert_in('a,3', '1.a:develop,a:0.0')
+    assert_not_in('a,3', '1.a:2,a:0.0')
+
+
 def test_union_with_containment():
     check_union(':1.6', '1.6.5', ':1.6')
     check_union(':1.6', ':1.6', '1.6.5')
@@ -562,3 +576,17 @@ def test_list_highest():
     assert vl2.highest_numeric() is None
     assert vl2.preferred() == Version('develop')
     assert vl2.lowest() == Version('master')
+
+
+@pytest.mark.parametrize('versions', [
+    ['1.0', '1.0.1', '1.1', '1.a', '1.b', '1.develop', '1.master', '2'],
+    ['a', 'b', '0', '10', 'trunk', 'head', 'master', 'main', 'develop'],
+    ['1.2.3a', '1.2.3b', '1.2.3', '1.2.3.0', '1.2.10'],
+])
+def test_sort_key_matches_comparison(versions):
+    versions = [Version(v) for v in versions]
+    for a in versions:
+        for b in versions:
+            assert (a.sort_key < b.sort_key) == (a < b)
+            assert (a.sort_key == b.sort_key) == (a == b)
+    assert sorted(versions, key=lambda v: v.sort_key) == sorted(versions)
@@ -3,10 +3,14 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import os
+import threading
 
 import ordereddict_backport
 import pytest
+from six.moves import BaseHTTPServer, socketserver
+
 import spack.paths
+import spack.util.http_pool
 import spack.util.web
 from spack.version import ver
 
@@ -167,3 +171,73 @@ def test_get_header():
     # If there isn't even a fuzzy match, raise KeyError
     with pytest.raises(KeyError):
         spack.util.web.get_header(headers, 'ContentLength')
+
+
+class _KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        _KeepAliveHandler.connections += 1
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+    def do_GET(self):
+        body = self.path.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn,
+                       BaseHTTPServer.HTTPServer):
+    # Serve each connection in its own thread, so that the connections
+    # kept alive by the client do not block the server
+    daemon_threads = True
+
+
+@pytest.fixture()
+def http_server():
+    _KeepAliveHandler.connections = 0
+    server = _ThreadingServer(('127.0.0.1', 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{0}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+    spack.util.http_pool.pool.clear()
+
+
+@pytest.mark.skipif(not spack.util.http_pool.keep_alive_supported,
+                    reason='keep-alive requires Python 3')
+def test_read_from_url_reuses_connections(http_server):
+    spack.util.http_pool.pool.clear()
+    for i in range(5):
+        _, _, response = spack.util.web.read_from_url(
+            '{0}/page{1}'.format(http_server, i))
+        assert response.read() == '/page{0}'.format(i).encode('utf-8')
+
+    assert _KeepAliveHandler.connections == 1
+
+
+def test_read_from_urls(http_server):
+    urls = ['{0}/page{1}'.format(http_server, i) for i in range(20)]
+    urls.append(_create_url('does-not-exist.html'))
+
+    contents, errors = {}, []
+    for url, result, error in spack.util.web.read_from_urls(
+            urls, concurrency=4):
+        if error is not None:
+            errors.append(url)
+        else:
+            contents[url] = result[2].read().decode('utf-8')
+
+    assert errors == [_create_url('does-not-exist.html')]
+    assert contents == dict(
+        (url, '/page{0}'.format(i)) for i, url in enumerate(urls[:-1]))
+    assert _KeepAliveHandler.connections <= 4
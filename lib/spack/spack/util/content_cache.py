@@ -0,0 +1,361 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Content-addressed store for source archives.
+
+Archives are stored once per content, under their sha256 checksum::
+
+    <root>/sha256/<first 2 digits>/<sha256>
+
+so that identical archives used by different packages, resources or
+patches are downloaded and stored only once. When an archive is stored
+with a checksum of another type (e.g. the ``md5`` of an old package), a
+symbolic link to the sha256 entry is made under that type as well, so the
+archive can be found by either checksum.
+
+The cache can be shared by several users and build hosts:
+
+* entries are written to a temporary file and renamed into place, so
+  readers never see a partial entry and concurrent writers of the same
+  entry do not conflict;
+* entries are read-only, and their content is verified before they are
+  added;
+* eviction is serialized by a lock file at the root of the cache.
+
+Directories, entries and the lock file are created with the permissions
+allowed by the umask, and the group gets the same permissions as the
+owner, so that other members of the group can add and evict entries. To
+share a cache, set the set-group-ID bit of its root directory, so that
+everything in it belongs to the group of the root.
+
+Entries are copied into stages as reflinks (copy-on-write clones) where
+the file system supports them, then as hard links, and as plain copies
+otherwise. If the cache has a size limit, the least recently used entries
+are evicted when it is exceeded.
+"""
+import errno
+import os
+import shutil
+import stat
+import tempfile
+
+import llnl.util.tty as tty
+
+import spack.util.crypto as crypto
+from spack.util.lock import Lock, WriteTransaction
+
+#: Checksum type used to address the entries of the cache
+key_algo = 'sha256'
+
+#: ioctl request for a copy-on-write clone of a file on Linux (FICLONE)
+_ficlone = 0x40049409
+
+
+def _hash_file(path, algos, block_size=2 ** 20):
+    """Return a dictionary with the hex digests of ``path`` for ``algos``,
+    computed in a single read of the file."""
+    hashers = dict((algo, crypto.hash_fun_for_algo(algo)()) for algo in algos)
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            for hasher in hashers.values():
+                hasher.update(data)
+    return dict((algo, h.hexdigest()) for algo, h in hashers.items())
+
+
+def _share(path):
+    """Give the group of ``path`` the permissions its owner has."""
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        os.chmod(path, mode | (mode & 0o700) >> 3)
+    except OSError:
+        # Owned by another user of the cache, who shared it already
+        pass
+
+
+def _mkdirp_shared(path):
+    """Create the directory ``path`` and its missing parents, shared with
+    the group."""
+    missing = []
+    while not os.path.isdir(path):
+        missing.append(path)
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+
+    for directory in reversed(missing):
+        try:
+            os.mkdir(directory)
+        except OSError as e:
+            # Created by someone else in the meantime
+            if e.errno != errno.EEXIST:
+                raise
+        _share(directory)
+
+
+def reflink(src, dest):
+    """Make ``dest`` a copy-on-write clone of ``src``.
+
+    Returns True on success, or False if the file system or the platform
+    does not support it, or if ``src`` cannot be read (in which case
+    ``dest`` is not created).
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    fd = None
+    try:
+        with open(src, 'rb') as f_src:
+            fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            fcntl.ioctl(fd, _ficlone, f_src.fileno())
+    except (IOError, OSError):
+        if fd is not None:
+            os.close(fd)
+            os.remove(dest)
+        return False
+    os.close(fd)
+    return True
+
+
+def clone_or_copy(src, dest, hardlink=True):
+    """Make ``dest`` a reflink of ``src``, or a hard link if ``hardlink``
+    is True, or a copy, whichever works first.
+
+    Returns the method that worked: ``'reflink'``, ``'hardlink'`` or
+    ``'copy'``.
+    """
+    if reflink(src, dest):
+        return 'reflink'
+
+    if hardlink:
+        try:
+            os.link(src, dest)
+            return 'hardlink'
+        except OSError:
+            # Different file systems, or protected hard links
+            pass
+
+    shutil.copyfile(src, dest)
+    return 'copy'
+
+
+class ContentCache(object):
+    """Content-addressed cache of source archives.
+
+    Args:
+        root (str): directory of the cache. It is created if needed.
+        size_limit (int): maximum size of the cache in bytes, or 0 for no
+            limit
+        timeout (int): seconds to wait for the eviction lock
+    """
+
+    def __init__(self, root, size_limit=0, timeout=120):
+        self.root = os.path.abspath(root)
+        self.size_limit = size_limit
+        self.timeout = timeout
+        self._lock = None
+
+    @property
+    def lock(self):
+        # The root may have been removed since the lock was created
+        _mkdirp_shared(self.root)
+        path = os.path.join(self.root, '.lock')
+        if not os.path.exists(path):
+            # Other users of the cache must be able to take the lock too
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o666))
+            _share(path)
+        if self._lock is None:
+            self._lock = Lock(path, default_timeout=self.timeout)
+        return self._lock
+
+    def path_for(self, digest):
+        """Path of the entry with checksum ``digest``, whether it exists or
+        not. The checksum type is guessed from the length of the digest."""
+        algo = crypto.hash_algo_for_digest(digest)
+        return os.path.join(self.root, algo, digest[:2], digest)
+
+    def find(self, digest):
+        """Path of the entry with checksum ``digest``, or None if it is not
+        in the cache.
+
+        Finding an entry marks it as used, for the purpose of eviction.
+        """
+        try:
+            path = os.path.realpath(self.path_for(digest))
+        except ValueError:
+            # Not a known checksum type
+            return None
+
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            # Record the access even on file systems mounted with noatime.
+            # This is only allowed to the owner of the entry.
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def fetch(self, digest, dest):
+        """Put a copy of the entry with checksum ``digest`` at ``dest``.
+
+        The copy is a reflink or a hard link of the entry where possible.
+        Since entries are read-only, so are hard links to them.
+
+        Returns:
+            True if the entry was found, False otherwise
+        """
+        path = self.find(digest)
+        if not path:
+            return False
+
+        try:
+            method = clone_or_copy(path, dest)
+        except (IOError, OSError) as e:
+            # Evicted since it was found
+            if e.errno != errno.ENOENT or os.path.exists(path):
+                raise
+            tty.debug('Cached archive {0} was evicted'.format(path))
+            return False
+        tty.debug('Using {0} of cached archive {1}'.format(method, path))
+        return True
+
+    def store(self, path, digest=None):
+        """Add the file at ``path`` to the cache.
+
+        If ``digest`` is given, the file is only added if its checksum
+        matches, and the entry can then be found by that checksum as well.
+
+        Returns:
+            (str): the path of the entry, or None if the file was not
+                added because its checksum does not match ``digest``
+        """
+        algos = set([key_algo])
+        if digest:
+            algos.add(crypto.hash_algo_for_digest(digest))
+        digests = _hash_file(path, algos)
+
+        if digest:
+            algo = crypto.hash_algo_for_digest(digest)
+            if digests[algo] != digest:
+                tty.debug('Not caching {0}: {1} checksum mismatch'
+                          .format(path, algo))
+                return None
+
+        key = digests[key_algo]
+        entry = self.path_for(key)
+        if os.path.isfile(entry):
+            self.find(key)
+        else:
+            self._add(path, entry)
+
+        # Index the entry by the checksum it was requested with, too
+        if digest and digest != key:
+            self._link(entry, self.path_for(digest))
+
+        if self.size_limit:
+            self.evict(self.size_limit)
+        return entry
+
+    def _add(self, path, entry):
+        directory = os.path.dirname(entry)
+        _mkdirp_shared(directory)
+
+        # Write a temporary file next to the entry, and move it in place
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        os.close(fd)
+        try:
+            clone_or_copy(path, tmp, hardlink=False)
+            os.chmod(tmp, 0o444)
+            os.rename(tmp, entry)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _link(self, entry, alias):
+        if os.path.realpath(alias) == entry:
+            return
+        _mkdirp_shared(os.path.dirname(alias))
+        tmp = '{0}.tmp-{1}'.format(alias, os.getpid())
+        os.symlink(os.path.relpath(entry, os.path.dirname(alias)), tmp)
+        os.rename(tmp, alias)
+
+    def _entries(self):
+        """Yield ``(path, stat)`` for each entry in the cache."""
+        top = os.path.join(self.root, key_algo)
+        if not os.path.isdir(top):
+            return
+        for subdir in os.listdir(top):
+            directory = os.path.join(top, subdir)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    yield path, os.lstat(path)
+                except OSError as e:
+                    # Removed by someone else in the meantime
+                    if e.errno != errno.ENOENT:
+                        raise
+
+    def size(self):
+        """Total size of the entries in the cache, in bytes."""
+        return sum(st.st_size for _, st in self._entries())
+
+    def evict(self, size_limit):
+        """Remove the least recently used entries until the cache takes at
+        most ``size_limit`` bytes.
+
+        Returns:
+            (list): paths of the entries that were removed
+        """
+        removed = []
+        with WriteTransaction(self.lock):
+            entries = list(self._entries())
+            total = sum(st.st_size for _, st in entries)
+            if total <= size_limit:
+                return removed
+
+            entries.sort(key=lambda e: max(e[1].st_atime, e[1].st_mtime))
+            for path, st in entries:
+                if total <= size_limit:
+                    break
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    if e.errno != errno.ENOENT:
+                        raise
+                total -= st.st_size
+                removed.append(path)
+
+            self._remove_dangling_links()
+
+        tty.debug('Evicted {0} archives from {1}'
+                  .format(len(removed), self.root))
+        return removed
+
+    def _remove_dangling_links(self):
+        for algo in os.listdir(self.root):
+            top = os.path.join(self.root, algo)
+            if algo == key_algo or not os.path.isdir(top):
+                continue
+            for dirpath, _, filenames in os.walk(top):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    if os.path.islink(path) and not os.path.exists(path):
+                        os.remove(path)
+
+    def destroy(self):
+        """Remove all the entries of the cache."""
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -144,6 +144,14 @@ def check(self, filename):
             self.hash_fun, filename, block_size=self.block_size)
         return self.sum == self.hexdigest
 
+    def check_sum(self, hexdigest):
+        """Check a checksum computed elsewhere, e.g. while the file was
+           being downloaded, against self.hexdigest.  The checksum is
+           stored in self.sum, as with check().
+        """
+        self.sum = hexdigest
+        return self.sum == self.hexdigest
+
 
 def prefix_bits(byte_array, bits):
     """Return the first <bits> bits of a byte array as an integer."""
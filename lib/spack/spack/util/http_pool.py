@@ -0,0 +1,211 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Pooled, keep-alive HTTP transport for ``spack.util.web``.
+
+``urllib`` opens a new connection for every request and asks the server
+to close it afterwards. Buildcache and mirror operations issue thousands
+of small requests to the same few hosts, so most of their time goes into
+TCP and TLS handshakes.
+
+This module provides a ``urllib`` opener whose HTTP and HTTPS handlers
+keep connections alive and reuse them across requests to the same host.
+A connection goes back to the pool once the response it carried has been
+read to the end; responses closed before that discard their connection.
+
+Keep-alive relies on the Python 3 ``http.client`` API. On Python 2 the
+opener falls back to the standard handlers.
+"""
+import collections
+import sys
+import threading
+
+import six.moves.http_client as http_client
+import six.moves.urllib.request as urllib_request
+from six.moves.urllib.error import URLError
+
+#: Maximum number of idle connections kept per host
+max_idle_per_host = 8
+
+#: Whether the running Python supports connection reuse
+keep_alive_supported = sys.version_info >= (3,)
+
+
+class ConnectionPool(object):
+    """Idle HTTP connections, keyed by scheme, host and SSL context."""
+
+    def __init__(self, max_idle=max_idle_per_host):
+        self.max_idle = max_idle
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+        #: Number of connections created and reused, for diagnostics
+        self.created = 0
+        self.reused = 0
+
+    def get(self, key, factory):
+        """Return a tuple with a connection for ``key`` and whether it was
+        reused. New connections are built by calling ``factory()``.
+        """
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+            self.created += 1
+        return factory(), False
+
+    def put(self, key, conn):
+        """Return a connection to the pool, closing it if the pool for
+        ``key`` is full.
+        """
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def clear(self):
+        """Close all the idle connections."""
+        with self._lock:
+            connections = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in connections:
+            conn.close()
+
+
+#: Pool shared by all the requests of this process
+pool = ConnectionPool()
+
+
+class PooledResponse(http_client.HTTPResponse):
+    """Response that hands its connection back to the pool when its body
+    has been read to the end.
+    """
+    _release = None
+    _closed_early = False
+
+    def close(self):
+        # Still having a file object here means the body was not read to
+        # the end, so the connection carries unread data.
+        if self.fp is not None:
+            self._closed_early = True
+        super(PooledResponse, self).close()
+
+    def _close_conn(self):
+        super(PooledResponse, self)._close_conn()
+        self._done()
+
+    def _done(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release(not (self.will_close or self._closed_early))
+
+
+class PooledHandlerMixin(object):
+    """Handler mixin that opens requests on pooled connections."""
+
+    #: ``http.client`` connection class used by the handler
+    connection_class = None
+
+    def _pooled_open(self, req, **conn_args):
+        # Requests tunneled through a proxy need a connection per tunnel
+        if getattr(req, '_tunnel_host', None):
+            return None
+
+        host = req.host
+        if not host:
+            raise URLError('no host given')
+
+        context = conn_args.get('context')
+        key = (self.connection_class.__name__, host, id(context))
+
+        def _make_connection():
+            conn = self.connection_class(
+                host, timeout=req.timeout, **conn_args)
+            conn.response_class = PooledResponse
+            return conn
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update(dict((k, v) for k, v in req.headers.items()
+                            if k not in headers))
+        headers['Connection'] = 'keep-alive'
+        headers = dict((name.title(), val) for name, val in headers.items())
+
+        conn, reused = pool.get(key, _make_connection)
+        try:
+            try:
+                conn.request(req.get_method(), req.selector, req.data,
+                             headers)
+                response = conn.getresponse()
+            except (http_client.BadStatusLine, ConnectionError):
+                # The server may have closed an idle connection in the
+                # meantime, retry once on a new one
+                if not reused:
+                    raise
+                conn.close()
+                conn = _make_connection()
+                conn.request(req.get_method(), req.selector, req.data,
+                             headers)
+                response = conn.getresponse()
+        except (OSError, http_client.HTTPException) as err:
+            conn.close()
+            raise URLError(err)
+
+        def _release(reusable):
+            if reusable:
+                pool.put(key, conn)
+            else:
+                conn.close()
+
+        response._release = _release
+        if response.isclosed():
+            # Responses without a body (e.g. to HEAD) are already done
+            response._done()
+
+        response.url = req.get_full_url()
+        response.msg = response.reason
+        return response
+
+
+class PooledHTTPHandler(PooledHandlerMixin, urllib_request.HTTPHandler):
+    connection_class = http_client.HTTPConnection
+
+    def http_open(self, req):
+        return (self._pooled_open(req) or
+                urllib_request.HTTPHandler.http_open(self, req))
+
+
+class PooledHTTPSHandler(PooledHandlerMixin, urllib_request.HTTPSHandler):
+    connection_class = http_client.HTTPSConnection
+
+    def https_open(self, req):
+        return (self._pooled_open(req, context=self._context) or
+                urllib_request.HTTPSHandler.https_open(self, req))
+
+
+#: Openers, one per SSL context
+_openers = {}
+_openers_lock = threading.Lock()
+
+
+def opener(context=None):
+    """Return the opener to be used for requests with ``context``.
+
+    Openers are created on first use and cached, so that all the requests
+    with the same SSL context share their handlers and connections.
+    """
+    key = id(context)
+    with _openers_lock:
+        if key not in _openers:
+            if keep_alive_supported:
+                handlers = [PooledHTTPHandler(),
+                            PooledHTTPSHandler(context=context)]
+            else:
+                handlers = []
+            # Keep a reference to the context, so its id is not reused
+            _openers[key] = (urllib_request.build_opener(*handlers), context)
+        return _openers[key][0]
@@ -4,8 +4,11 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 """Wrapper for ``llnl.util.lock`` allows locking to be enabled/disabled."""
+import errno
+import fcntl
 import os
 import stat
+import time
 
 import llnl.util.lock
 from llnl.util.lock import *  # noqa
@@ -13,6 +16,7 @@
 import spack.config
 import spack.error
 import spack.paths
+import spack.util.tracing
 
 
 class Lock(llnl.util.lock.Lock):
@@ -28,7 +32,12 @@ def __init__(self, *args, **kwargs):
 
     def _lock(self, op, timeout=0):
         if self._enable:
-            return super(Lock, self)._lock(op, timeout)
+            wait_time, nattempts = super(Lock, self)._lock(op, timeout)
+            spack.util.tracing.record(
+                'lock wait', 'lock', time.time() - wait_time, wait_time,
+                path=self.path, type=llnl.util.lock.lock_type[op],
+                attempts=nattempts)
+            return wait_time, nattempts
         else:
             return 0, 0
 
@@ -42,6 +51,43 @@ def _debug(self, *args):
             super(Lock, self)._debug(*args)
 
 
+def write_locked(path, starts):
+    """Return the offsets, among ``starts``, of the bytes of ``path`` that
+    are write locked by another process.
+
+    This gives the same answer as ``Lock.is_write_locked()`` for one-byte
+    locks at each offset, but checks all of them through a single open
+    file. The bytes must not be locked by this process: checking them
+    would release its locks.
+    """
+    if not spack.config.get('config:locks', True):
+        return []
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        # There are no locks on a file that does not exist
+        return []
+
+    locked = []
+    try:
+        for start in starts:
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_SH | fcntl.LOCK_NB, 1, start,
+                            os.SEEK_SET)
+            except (IOError, OSError) as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                locked.append(start)
+            else:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, start, os.SEEK_SET)
+    finally:
+        os.close(fd)
+    return locked
+
+
 def check_lock_safety(path):
     """Do some extra checks to ensure disabling locks is safe.
 
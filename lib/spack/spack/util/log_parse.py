@@ -6,24 +6,30 @@
 from __future__ import print_function
 
 import sys
-from six import StringIO
+from six import StringIO, string_types
 
 from ctest_log_parser import CTestLogParser, BuildError, BuildWarning
+from ctest_log_parser import LogScanner
 
 import llnl.util.tty as tty
 from llnl.util.tty.color import cescape, colorize
+from llnl.util.tty.log import open_log
 
-__all__ = ['parse_log_events', 'make_log_context']
+__all__ = ['parse_log_events', 'make_log_context', 'LogScanner']
 
 
-def parse_log_events(stream, context=6, jobs=None, profile=False):
+def parse_log_events(stream, context=6, jobs=None, profile=False,
+                     max_errors=None):
     """Extract interesting events from a log file as a list of LogEvent.
 
     Args:
-        stream (str or fileobject): build log name or file object
+        stream (str or fileobject): build log name or file object. Named
+            logs may be compressed.
         context (int): lines of context to extract around each log event
-        jobs (int): number of jobs to parse with; default ncpus
+        jobs (int): unused, logs are parsed as they are read
         profile (bool): print out profile information for parsing
+        max_errors (int): stop parsing once this many errors are found, or
+            None to parse the whole log
 
     Returns:
         (tuple): two lists containig ``BuildError`` and
@@ -32,11 +38,19 @@ def parse_log_events(stream, context=6, jobs=None, profile=False):
     This is a wrapper around ``ctest_log_parser.CTestLogParser`` that
     lazily constructs a single ``CTestLogParser`` object.  This ensures
     that all the regex compilation is only done once.
+
+    To parse a log while it is being written, feed it to a ``LogScanner``
+    instead.
     """
+    if isinstance(stream, string_types):
+        with open_log(stream) as f:
+            return parse_log_events(f, context, jobs, profile, max_errors)
+
     if parse_log_events.ctest_parser is None:
         parse_log_events.ctest_parser = CTestLogParser(profile=profile)
 
-    result = parse_log_events.ctest_parser.parse(stream, context, jobs)
+    result = parse_log_events.ctest_parser.parse(
+        stream, context, jobs, max_errors)
     if profile:
         parse_log_events.ctest_parser.print_timings()
     return result
@@ -49,3 +49,11 @@ def join(self, string):
             Prefix: the newly created installation prefix
         """
         return Prefix(os.path.join(self, string))
+
+    # Since __getattr__ makes up any attribute, pickle needs these to be
+    # defined explicitly
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, d):
+        self.__dict__.update(d)
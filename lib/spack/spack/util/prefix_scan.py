@@ -0,0 +1,127 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Shared scan of an installation prefix for post-install hooks.
+
+Several hooks need to look at every file in a freshly installed prefix
+(e.g. shebang filtering and permission setting). Rather than having each
+of them walk the prefix on its own, they can call :func:`scan_prefix`,
+which walks the prefix once and caches a typed list of its entries until
+:func:`clear_cache` is called. The hook dispatcher in :mod:`spack.hooks`
+clears the cache around each hook run, so a scan never outlives the hooks
+that share it.
+
+:func:`parallel_map` runs a function over the scanned entries in a thread
+pool, which pays off for the I/O bound work hooks usually do.
+"""
+import collections
+import multiprocessing
+import multiprocessing.pool
+import os
+import stat
+
+#: Kinds of entries found in a prefix
+FILE, DIR, LINK = 'file', 'dir', 'link'
+
+#: Below this number of items, ``parallel_map`` runs serially
+parallel_threshold = 64
+
+#: One entry of a prefix scan. ``kind`` is one of ``FILE``, ``DIR`` or
+#: ``LINK``; links are never followed.
+PrefixEntry = collections.namedtuple('PrefixEntry', ['path', 'kind'])
+
+#: Scans computed since the cache was last cleared, keyed by prefix
+_scans = {}
+
+
+def _entry_kind(mode):
+    if stat.S_ISLNK(mode):
+        return LINK
+    if stat.S_ISDIR(mode):
+        return DIR
+    return FILE
+
+
+def _list_directory(directory):
+    """Yield ``(path, kind)`` for each entry in ``directory``."""
+    if hasattr(os, 'scandir'):
+        for dir_entry in os.scandir(directory):
+            if dir_entry.is_symlink():
+                kind = LINK
+            elif dir_entry.is_dir(follow_symlinks=False):
+                kind = DIR
+            else:
+                kind = FILE
+            yield dir_entry.path, kind
+    else:
+        # Python 2 has no os.scandir, fall back to one lstat per entry
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            yield path, _entry_kind(os.lstat(path).st_mode)
+
+
+def _walk(root):
+    entries = []
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        for path, kind in _list_directory(directory):
+            entries.append(PrefixEntry(path, kind))
+            if kind == DIR:
+                stack.append(path)
+    return entries
+
+
+def scan_prefix(prefix):
+    """Return the list of entries below ``prefix``, without following links.
+
+    The prefix itself is not part of the list. The result is cached until
+    :func:`clear_cache` is called, so that all the hooks run on a prefix
+    share a single walk of the file system.
+
+    Args:
+        prefix (str): directory to be scanned
+
+    Returns:
+        list of :class:`PrefixEntry`
+    """
+    prefix = str(prefix)
+    if prefix not in _scans:
+        _scans[prefix] = _walk(prefix) if os.path.isdir(prefix) else []
+    return _scans[prefix]
+
+
+def clear_cache():
+    """Forget all the prefix scans computed so far."""
+    _scans.clear()
+
+
+def parallel_map(func, items, processes=None):
+    """Apply ``func`` to each item of ``items`` using a pool of threads.
+
+    Short lists are processed serially, since spawning threads for them
+    costs more than it saves. Exceptions raised by ``func`` are propagated
+    to the caller.
+
+    Args:
+        func (callable): function to be applied to each item
+        items (list): items to be processed
+        processes (int or None): number of threads to use. Defaults to the
+            number of CPUs.
+
+    Returns:
+        list of the results of ``func``, in the same order as ``items``
+    """
+    items = list(items)
+    processes = processes or multiprocessing.cpu_count()
+    if len(items) < parallel_threshold or processes < 2:
+        return [func(item) for item in items]
+
+    tp = multiprocessing.pool.ThreadPool(processes=processes)
+    try:
+        return tp.map(func, items)
+    finally:
+        tp.terminate()
+        tp.join()
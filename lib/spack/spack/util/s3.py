@@ -4,12 +4,19 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import threading
 
 import six.moves.urllib.parse as urllib_parse
 
 import spack
 import spack.util.url as url_util
 
+#: S3 clients, keyed by endpoint and SSL setting. Creating a client is
+#: expensive, and clients are thread-safe, so they are shared by all the
+#: requests to the same endpoint.
+_clients = {}
+_clients_lock = threading.Lock()
+
 
 def create_s3_session(url):
     url = url_util.parse(url)
@@ -18,6 +25,23 @@ def create_s3_session(url):
             'Can not create S3 session from URL with scheme: {SCHEME}'.format(
                 SCHEME=url.scheme))
 
+    use_ssl = spack.config.get('config:verify_ssl')
+    endpoint_url = os.environ.get('S3_ENDPOINT_URL')
+
+    key = (endpoint_url, use_ssl)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = _create_s3_client(endpoint_url, use_ssl)
+        return _clients[key]
+
+
+def clear_s3_clients():
+    """Forget the S3 clients created so far."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def _create_s3_client(endpoint_url, use_ssl):
     # NOTE(opadron): import boto and friends as late as possible.  We don't
     # want to require boto as a dependency unless the user actually wants to
     # access S3 mirrors.
@@ -25,9 +49,8 @@ def create_s3_session(url):
 
     session = Session()
 
-    s3_client_args = {"use_ssl": spack.config.get('config:verify_ssl')}
+    s3_client_args = {"use_ssl": use_ssl}
 
-    endpoint_url = os.environ.get('S3_ENDPOINT_URL')
     if endpoint_url:
         if urllib_parse.urlparse(endpoint_url, scheme=None).scheme is None:
             endpoint_url = '://'.join(('https', endpoint_url))
@@ -0,0 +1,48 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Digest of the source of Spack's own modules.
+
+Caches that keep Spack objects across runs, e.g. pickled specs, must not
+be used by a Spack whose classes differ from the ones that wrote them. The
+Spack version is not enough to tell, since the code of a development
+checkout changes without a new version. The digest changes whenever one of
+Spack's modules does.
+"""
+import hashlib
+import os
+
+import llnl.util.lang
+
+import spack.paths
+
+#: Directories of the modules covered by the digest
+source_paths = [
+    spack.paths.module_path,
+    os.path.join(spack.paths.lib_path, 'llnl'),
+]
+
+
+@llnl.util.lang.memoized
+def source_digest():
+    """Hex digest of the name, modification time and size of every module
+    of Spack, except its tests."""
+    digest = hashlib.sha1()
+    for top in source_paths:
+        for dirpath, dirnames, filenames in os.walk(top):
+            # Walk in a stable order, and skip the tests
+            dirnames[:] = sorted(d for d in dirnames if d != 'test')
+            for name in sorted(filenames):
+                if not name.endswith('.py'):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                digest.update('{0} {1} {2}\n'.format(
+                    os.path.relpath(path, top), stat.st_mtime, stat.st_size
+                ).encode('utf-8'))
+    return digest.hexdigest()
@@ -26,6 +26,9 @@ def load(stream):
     else:
         load = json.load
 
+    if sys.version_info[0] >= 3:
+        # Strings are already str, there is nothing to convert
+        return load(stream)
     return _strify(load(stream, object_hook=_strify), ignore_dicts=True)
 
 
@@ -14,12 +14,15 @@
 """
 import ctypes
 import collections
+import re
 
 from ordereddict_backport import OrderedDict
+import six
 from six import string_types, StringIO
 
 import ruamel.yaml as yaml
 from ruamel.yaml import RoundTripLoader, RoundTripDumper
+from ruamel.yaml.resolver import VersionedResolver
 
 from llnl.util.tty.color import colorize, clen, cextra
 
@@ -207,6 +210,117 @@ def dump(obj, default_flow_style=False, stream=None):
                      Dumper=SafeDumper, stream=stream)
 
 
+#: Strings made only of these characters, and not starting with an
+#: indicator, are emitted as plain scalars in flow context unless they
+#: would be read back as another type (e.g. ``1.0`` or ``true``)
+_flow_plain_str = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9_.+-]*\Z')
+
+#: Maximum length of a key emitted without the explicit ``?`` indicator
+_max_simple_key = 120
+
+#: Scalar types whose flow representation is computed without ruamel
+_str_types = (str, syaml_str) + tuple(string_types)
+_dict_types = (dict, syaml_dict)
+_list_types = (list, syaml_list, tuple)
+
+
+def _implicit_resolvers():
+    resolver = VersionedResolver()
+    resolver.use_version = None
+    return resolver.resolver
+
+
+#: Implicit resolvers used by ``dump``, by first character of the scalar
+_resolvers = _implicit_resolvers()
+
+
+class _NoFastPath(Exception):
+    """Raised when an object cannot be emitted without ruamel."""
+
+
+def _resolves_to_str(value):
+    for _, regexp in _resolvers.get(value[0], []) + _resolvers.get(None, []):
+        if regexp.match(value):
+            return False
+    return True
+
+
+#: Flow representations of scalars outside of the fast path, as computed
+#: by ruamel, keyed by type, value and whether the scalar is a key
+_scalar_memo = {}
+
+
+def _ruamel_scalar(value, key):
+    memo_key = (type(value), value, key)
+    if memo_key not in _scalar_memo:
+        if len(_scalar_memo) > 10000:
+            _scalar_memo.clear()
+        if key:
+            text = dump(syaml_dict([(value, 0)]), default_flow_style=True)
+            if not (text.startswith('{') and text.endswith(': 0}\n')):
+                raise _NoFastPath()
+            text = text[1:-5]
+        else:
+            text = dump([value], default_flow_style=True)
+            if not (text.startswith('[') and text.endswith(']\n')):
+                raise _NoFastPath()
+            text = text[1:-2]
+        if '\n' in text:
+            # Line breaks are indented according to the nesting level
+            raise _NoFastPath()
+        _scalar_memo[memo_key] = text
+    return _scalar_memo[memo_key]
+
+
+def _flow_scalar(value, key=False):
+    cls = type(value)
+    if cls in _str_types:
+        if key and len(value) >= _max_simple_key:
+            raise _NoFastPath()
+        if _flow_plain_str.match(value):
+            if _resolves_to_str(value):
+                return value
+            return "'" + value + "'"
+    elif cls is bool:
+        return 'true' if value else 'false'
+    elif cls in six.integer_types or cls is syaml_int:
+        return str(int(value))
+    elif value is None and not key:
+        return "!!null ''"
+    else:
+        # Lists and dictionaries as keys are not handled here
+        try:
+            hash(value)
+        except TypeError:
+            raise _NoFastPath()
+    return _ruamel_scalar(value, key)
+
+
+def _flow(obj):
+    cls = type(obj)
+    if cls in _dict_types:
+        return '{' + ', '.join(
+            _flow_scalar(k, key=True) + ': ' + _flow(v)
+            for k, v in obj.items()) + '}'
+    elif cls in _list_types:
+        return '[' + ', '.join(_flow(item) for item in obj) + ']'
+    return _flow_scalar(obj)
+
+
+def flow_text(obj):
+    """Flow style YAML for ``obj``, without the final newline.
+
+    The text is identical to ``dump(obj, default_flow_style=True)``, but it
+    is produced without going through ruamel's emitter for the types that
+    make up spec node dictionaries. Other objects are still emitted by
+    ruamel.
+    """
+    try:
+        return _flow(obj)
+    except _NoFastPath:
+        return dump(obj, default_flow_style=True)[:-1]
+
+
 def file_line(mark):
     """Format a mark as <file>:<line> information."""
     result = mark.name
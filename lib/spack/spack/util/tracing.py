@@ -0,0 +1,203 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Span-style tracing of the install process.
+
+When tracing is enabled with :func:`enable` (e.g. by ``spack install
+--trace``), the code instrumented with :func:`span`, :func:`traced` and
+:func:`record` writes one event per completed span to a trace file.
+Tracing is off by default, and all the instrumentation is a no-op then.
+
+Two formats are supported:
+
+``chrome``
+    The JSON array format of the Chrome trace event profiler. Files can
+    be loaded in ``chrome://tracing`` or https://ui.perfetto.dev.
+
+``jsonl``
+    One JSON object per line, with the same fields as the Chrome events.
+
+Events are appended to the trace file with a single unbuffered write, so
+build processes forked by the installer can safely write to the same file
+as their parent. Each event records the process and thread that emitted
+it, the category of the span (``hook``, ``phase``, ``install``, ``lock``,
+``db``) and its start time and duration in microseconds.
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+#: Supported trace formats
+formats = ('chrome', 'jsonl')
+
+#: The active tracer, or None if tracing is disabled
+_tracer = None
+
+
+class Tracer(object):
+    """Writes trace events to a file.
+
+    Args:
+        path (str): file the trace is written to. It is truncated, unless
+            ``append`` is True.
+        fmt (str): one of ``formats``
+        append (bool): whether to append events to an existing trace, e.g.
+            from a build process that was not forked from the tracing one
+    """
+    def __init__(self, path, fmt='chrome', append=False):
+        if fmt not in formats:
+            raise ValueError('Unknown trace format: {0}'.format(fmt))
+        self.path = path
+        self.fmt = fmt
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        if not append:
+            flags |= os.O_TRUNC
+        self._fd = os.open(path, flags, 0o644)
+        if fmt == 'chrome' and not append:
+            # The closing bracket is optional in the JSON array format, which
+            # lets every process append to the file independently.
+            os.write(self._fd, b'[\n')
+
+    def write(self, event):
+        """Append an event to the trace file."""
+        line = json.dumps(event, sort_keys=True)
+        line += ',\n' if self.fmt == 'chrome' else '\n'
+        os.write(self._fd, line.encode('utf-8'))
+
+    def close(self):
+        os.close(self._fd)
+
+
+def enable(path, fmt='chrome', append=False):
+    """Start writing trace events to ``path`` in the given format."""
+    global _tracer
+    disable()
+    _tracer = Tracer(path, fmt, append)
+
+
+def disable():
+    """Stop tracing and close the trace file, if any."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def enabled():
+    """Whether trace events are currently being recorded."""
+    return _tracer is not None
+
+
+@contextlib.contextmanager
+def tracing_to(path, fmt='chrome'):
+    """Context manager that traces to ``path`` while active.
+
+    If ``path`` is None this does nothing, so that callers can pass an
+    optional command line argument straight through.
+    """
+    if path is None:
+        yield
+        return
+
+    enable(path, fmt)
+    try:
+        yield
+    finally:
+        disable()
+
+
+def record(name, cat, start, duration, **args):
+    """Record a span that has already completed.
+
+    Args:
+        name (str): name of the span
+        cat (str): category of the span
+        start (float): start time, in seconds since the epoch
+        duration (float): duration of the span, in seconds
+        **args: additional information attached to the event
+    """
+    if _tracer is None:
+        return
+
+    event = {
+        'name': name,
+        'cat': cat,
+        'ph': 'X',
+        'ts': int(start * 1e6),
+        'dur': int(duration * 1e6),
+        'pid': os.getpid(),
+        'tid': threading.current_thread().ident,
+    }
+    if args:
+        event['args'] = dict((k, str(v)) for k, v in args.items())
+    _tracer.write(event)
+
+
+@contextlib.contextmanager
+def span(name, cat, **args):
+    """Context manager that records the time spent in its body as a span.
+
+    The span is recorded even if the body raises, with an ``error``
+    argument holding the type of the exception.
+    """
+    if _tracer is None:
+        yield
+        return
+
+    start = time.time()
+    try:
+        yield
+    except BaseException as e:
+        args['error'] = type(e).__name__
+        raise
+    finally:
+        record(name, cat, start, time.time() - start, **args)
+
+
+def traced(name, cat):
+    """Decorator that records each call of the decorated function as a
+    span named ``name`` in category ``cat``.
+    """
+    def _decorator(func):
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            with span(name, cat):
+                return func(*args, **kwargs)
+        return _wrapper
+    return _decorator
+
+
+def traced_context(context, name, cat, **args):
+    """Wrap a context manager so that the time spent from its entry to its
+    exit is recorded as a span.
+
+    When tracing is disabled, ``context`` is returned unchanged.
+    """
+    if _tracer is None:
+        return context
+    return _TracedContext(context, name, cat, args)
+
+
+class _TracedContext(object):
+    def __init__(self, context, name, cat, args):
+        self._context = context
+        self._name = name
+        self._cat = cat
+        self._args = args
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.time()
+        return self._context.__enter__()
+
+    def __exit__(self, type, value, traceback):
+        try:
+            return self._context.__exit__(type, value, traceback)
+        finally:
+            record(self._name, self._cat, self._start,
+                   time.time() - self._start, **self._args)
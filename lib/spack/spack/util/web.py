@@ -7,6 +7,7 @@
 
 import codecs
 import errno
+import io
 import multiprocessing.pool
 import os
 import os.path
@@ -18,7 +19,7 @@
 
 import six
 from six.moves.urllib.error import URLError
-from six.moves.urllib.request import urlopen, Request
+from six.moves.urllib.request import Request
 
 try:
     # Python 2 had these in the HTMLParser package.
@@ -39,6 +40,7 @@ class HTMLParseError(Exception):
 import spack.error
 import spack.url
 import spack.util.crypto
+import spack.util.http_pool as http_pool
 import spack.util.s3 as s3_util
 import spack.util.url as url_util
 
@@ -86,6 +88,24 @@ def uses_ssl(parsed_url):
     ))(sys.version_info)
 
 
+#: SSL contexts, keyed by whether they verify certificates. Creating a
+#: context loads the CA certificates, so they are shared by all requests.
+_ssl_contexts = {}
+
+
+def _ssl_context(verify_ssl):
+    if verify_ssl not in _ssl_contexts:
+        if verify_ssl:
+            # User wants SSL verification, and it *can* be provided.
+            context = ssl.create_default_context()  # novm
+        else:
+            # User has explicitly indicated that they do not want SSL
+            # verification.
+            context = ssl._create_unverified_context()
+        _ssl_contexts[verify_ssl] = context
+    return _ssl_contexts[verify_ssl]
+
+
 def read_from_url(url, accept_content_type=None):
     url = url_util.parse(url)
     context = None
@@ -95,17 +115,11 @@ def read_from_url(url, accept_content_type=None):
     # Don't even bother with a context unless the URL scheme is one that uses
     # SSL certs.
     if uses_ssl(url):
-        if verify_ssl:
-            if __UNABLE_TO_VERIFY_SSL:
-                # User wants SSL verification, but it cannot be provided.
-                warn_no_ssl_cert_checking()
-            else:
-                # User wants SSL verification, and it *can* be provided.
-                context = ssl.create_default_context()  # novm
+        if verify_ssl and __UNABLE_TO_VERIFY_SSL:
+            # User wants SSL verification, but it cannot be provided.
+            warn_no_ssl_cert_checking()
         else:
-            # User has explicitly indicated that they do not want SSL
-            # verification.
-            context = ssl._create_unverified_context()
+            context = _ssl_context(verify_ssl)
 
     req = Request(url_util.format(url))
     content_type = None
@@ -120,6 +134,7 @@ def read_from_url(url, accept_content_type=None):
         resp = _urlopen(req, timeout=_timeout, context=context)
 
         content_type = get_header(resp.headers, 'Content-type')
+        resp.close()
 
     # Do the real GET request when we know it's just HTML.
     req.get_method = lambda: "GET"
@@ -144,11 +159,56 @@ def read_from_url(url, accept_content_type=None):
             " with content type " if content_type is not None else "",
             content_type or ""))
 
+        response.close()
         return None, None, None
 
     return response.geturl(), response.headers, response
 
 
+def read_from_urls(urls, accept_content_type=None, concurrency=32):
+    """Read many URLs concurrently, yielding their contents as they arrive.
+
+    Requests are issued from a bounded pool of threads and share the
+    pooled connections of :mod:`spack.util.http_pool`, so that many small
+    requests to the same host reuse a few keep-alive connections. Each
+    response body is read in full by the thread that requested it, which
+    frees its connection for the next request right away.
+
+    Args:
+        urls (iterable): URLs to be read
+        accept_content_type (str or None): as in :func:`read_from_url`
+        concurrency (int): maximum number of simultaneous requests
+
+    Yields:
+        ``(url, result, error)`` tuples, in completion order. ``result`` is
+        the tuple returned by :func:`read_from_url`, with the response
+        replaced by an in-memory stream of its body. If reading the URL
+        raised an exception, ``result`` is None and ``error`` holds it.
+    """
+    def _read(url):
+        try:
+            response_url, headers, response = read_from_url(
+                url, accept_content_type)
+            if response is not None:
+                response = io.BytesIO(response.read())
+            return url, (response_url, headers, response), None
+        except Exception as e:
+            return url, None, e
+
+    urls = list(urls)
+    if not urls:
+        return
+
+    tp = multiprocessing.pool.ThreadPool(
+        processes=max(1, min(concurrency, len(urls))))
+    try:
+        for result in tp.imap_unordered(_read, urls):
+            yield result
+    finally:
+        tp.terminate()
+        tp.join()
+
+
 def warn_no_ssl_cert_checking():
     tty.warn("Spack will not check SSL certificates. You need to update "
              "your Python to enable certificate verification.")
@@ -222,7 +282,8 @@ def url_exists(url):
     # otherwise, just try to "read" from the URL, and assume that *any*
     # non-throwing response contains the resource represented by the URL
     try:
-        read_from_url(url)
+        _, _, response = read_from_url(url)
+        response.close()
         return True
     except URLError:
         return False
@@ -456,24 +517,20 @@ def _wrapper(args):
 
 
 def _urlopen(req, *args, **kwargs):
-    """Wrapper for compatibility with old versions of Python."""
+    """Open a request on the pooled transport, or through boto for S3."""
     url = req
     try:
         url = url.get_full_url()
     except AttributeError:
         pass
 
-    # We don't pass 'context' parameter because it was only introduced starting
-    # with versions 2.7.9 and 3.4.3 of Python.
-    if 'context' in kwargs:
-        del kwargs['context']
+    context = kwargs.pop('context', None)
 
-    opener = urlopen
     if url_util.parse(url).scheme == 's3':
         import spack.s3_handler
-        opener = spack.s3_handler.open
+        return spack.s3_handler.open(req, *args, **kwargs)
 
-    return opener(req, *args, **kwargs)
+    return http_pool.opener(context).open(req, *args, **kwargs)
 
 
 def find_versions_of_archive(
@@ -26,7 +26,7 @@
 """
 import re
 import numbers
-from bisect import bisect_left
+from bisect import bisect_left, bisect_right
 from functools import wraps
 from six import string_types
 
@@ -39,9 +39,27 @@
 # Valid version characters
 VALID_VERSION = r'[A-Za-z0-9_.-]'
 
+_valid_version_regex = re.compile(VALID_VERSION)
+
+# Alphabetical and numeric segments of versions
+_segment_regex = re.compile(r'[a-zA-Z]+|[0-9]+')
+
 # Infinity-like versions. The order in the list implies the comparison rules
 infinity_versions = ['develop', 'main', 'master', 'head', 'trunk']
 
+#: Ranks of the components of version sort keys. Numbers are "newer" than
+#: letters, and infinity-like versions are newer than both.
+_alpha_rank, _numeric_rank, _infinity_rank = 1, 2, 3
+
+#: Sort key components of infinity-like versions
+_infinity_keys = dict((v, (_infinity_rank, -i))
+                      for i, v in enumerate(infinity_versions))
+
+#: Component that is greater than the components of any version. Appended
+#: to the key of a version, it makes a bound above all the versions that
+#: start with it (e.g. 1.6.5 for 1.6).
+_upper_bound = (_infinity_rank + 1,)
+
 
 def int_if_int(string):
     """Convert a string to int if possible.  Otherwise, return a string."""
@@ -51,6 +69,49 @@ def int_if_int(string):
         return string
 
 
+def _component_key(component):
+    if isinstance(component, string_types):
+        return _infinity_keys.get(component, (_alpha_rank, component))
+    return (_numeric_rank, component)
+
+
+def _sort_key(version):
+    """Key that sorts Versions and VersionRanges in a VersionList.
+
+    Ranges are ordered by start and then by end, where an open start is
+    lower and an open end is higher than any version. A Version is sorted
+    as the range from itself to itself.
+    """
+    if type(version) == Version:
+        return (1, version.sort_key, 0, version.sort_key)
+    start, end = version.start, version.end
+    start_key = (0, ()) if start is None else (1, start.sort_key)
+    end_key = (1, ()) if end is None else (0, end.sort_key)
+    return start_key + end_key
+
+
+def _bounds(version):
+    """Lowest and highest sort keys of the versions that a Version or
+    VersionRange may overlap.
+
+    The upper bound of an end also covers the versions it contains, e.g.
+    ``:1.6`` contains ``1.6.5``.
+    """
+    if type(version) == Version:
+        return version.sort_key, version.sort_key + (_upper_bound,)
+    start, end = version.start, version.end
+    return (() if start is None else start.sort_key,
+            (_upper_bound,) if end is None else end.sort_key + (_upper_bound,))
+
+
+def _may_overlap(a, b):
+    """Whether the bounds of ``a`` and ``b`` overlap. Versions and ranges
+    whose bounds do not overlap do not overlap either."""
+    low_a, high_a = _bounds(a)
+    low_b, high_b = _bounds(b)
+    return low_a <= high_b and low_b <= high_a
+
+
 def coerce_versions(a, b):
     """
     Convert both a and b to the 'greatest' type between them, in this order:
@@ -99,7 +160,7 @@ class Version(object):
     def __init__(self, string):
         string = str(string)
 
-        if not re.match(VALID_VERSION, string):
+        if not _valid_version_regex.match(string):
             raise ValueError("Bad characters in version string: %s" % string)
 
         # preserve the original string, but trimmed.
@@ -107,12 +168,16 @@ def __init__(self, string):
         self.string = string
 
         # Split version into alphabetical and numeric segments
-        segment_regex = r'[a-zA-Z]+|[0-9]+'
-        segments = re.findall(segment_regex, string)
+        segments = _segment_regex.findall(string)
         self.version = tuple(int_if_int(seg) for seg in segments)
 
         # Store the separators from the original version string as well.
-        self.separators = tuple(re.split(segment_regex, string)[1:])
+        self.separators = tuple(_segment_regex.split(string)[1:])
+
+        #: Key that sorts versions in the same order as comparing them. Each
+        #: component of the version is a ``(rank, value)`` pair, so that
+        #: versions compare as plain tuples.
+        self.sort_key = tuple(_component_key(c) for c in self.version)
 
     @property
     def dotted(self):
@@ -205,12 +270,7 @@ def highest(self):
 
     def isdevelop(self):
         """Triggers on the special case of the `@develop-like` version."""
-        for inf in infinity_versions:
-            for v in self.version:
-                if v == inf:
-                    return True
-
-        return False
+        return any(rank == _infinity_rank for rank, _ in self.sort_key)
 
     @coerced
     def satisfies(self, other):
@@ -270,44 +330,15 @@ def __lt__(self, other):
            does things.  If you need more complicated versions in installed
            packages, you should override your package's version string to
            express it more sensibly.
-        """
-        if other is None:
-            return False
-
-        # Coerce if other is not a Version
-        # simple equality test first.
-        if self.version == other.version:
-            return False
 
-        # Standard comparison of two numeric versions
-        for a, b in zip(self.version, other.version):
-            if a == b:
-                continue
-            else:
-                if a in infinity_versions:
-                    if b in infinity_versions:
-                        return (infinity_versions.index(a) >
-                                infinity_versions.index(b))
-                    else:
-                        return False
-                if b in infinity_versions:
-                    return True
-
-                # Neither a nor b is infinity
-                # Numbers are always "newer" than letters.
-                # This is for consistency with RPM.  See patch
-                # #60884 (and details) from bugzilla #50977 in
-                # the RPM project at rpm.org.  Or look at
-                # rpmvercmp.c if you want to see how this is
-                # implemented there.
-                if type(a) != type(b):
-                    return type(b) == int
-                else:
-                    return a < b
-
-        # If the common prefix is equal, the one
-        # with more segments is bigger.
-        return len(self.version) < len(other.version)
+           Components of the versions are compared in order: develop-like
+           versions are newer than anything else, and numbers are newer
+           than letters (see patch #60884 and bugzilla #50977 in the RPM
+           project at rpm.org, or rpmvercmp.c). If the common prefix is
+           equal, the version with more components is newer. All this is
+           encoded in ``sort_key``.
+        """
+        return other is not None and self.sort_key < other.sort_key
 
     @coerced
     def __eq__(self, other):
@@ -320,15 +351,15 @@ def __ne__(self, other):
 
     @coerced
     def __le__(self, other):
-        return self == other or self < other
+        return other is not None and self.sort_key <= other.sort_key
 
     @coerced
     def __ge__(self, other):
-        return not (self < other)
+        return other is None or self.sort_key >= other.sort_key
 
     @coerced
     def __gt__(self, other):
-        return not (self == other) and not (self < other)
+        return other is None or self.sort_key > other.sort_key
 
     def __hash__(self):
         return hash(self.version)
@@ -600,14 +631,18 @@ def add(self, version):
             if version.concrete:
                 version = version.concrete
 
-            i = bisect_left(self, version)
+            i = self._bisect_left(version)
 
-            while i - 1 >= 0 and version.overlaps(self[i - 1]):
+            # Check the cheap bounds first, since the neighbors of a new
+            # version seldom overlap it
+            while (i - 1 >= 0 and _may_overlap(version, self[i - 1]) and
+                   version.overlaps(self[i - 1])):
                 version = version.union(self[i - 1])
                 del self.versions[i - 1]
                 i -= 1
 
-            while i < len(self) and version.overlaps(self[i]):
+            while (i < len(self) and _may_overlap(version, self[i]) and
+                   version.overlaps(self[i])):
                 version = version.union(self[i])
                 del self.versions[i]
 
@@ -620,6 +655,36 @@ def add(self, version):
         else:
             raise TypeError("Can't add %s to VersionList" % type(version))
 
+    def _bisect_left(self, version):
+        """Index where ``version`` would be inserted in the list.
+
+        This is ``bisect_left(self, version)``, comparing sort keys instead
+        of coercing each version to a range.
+        """
+        key = _sort_key(version)
+        lo, hi = 0, len(self.versions)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _sort_key(self.versions[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _upper_candidate(self, version):
+        """Index of the first element of the list that starts above any
+        version that ``version`` may overlap. No element from there on can
+        overlap it."""
+        high = _bounds(version)[1]
+        lo, hi = 0, len(self.versions)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if high < _bounds(self.versions[mid])[0]:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
     @property
     def concrete(self):
         if len(self) == 1:
@@ -737,10 +802,24 @@ def union(self, other):
 
     @coerced
     def intersection(self, other):
-        # TODO: make this faster.  This is O(n^2).
         result = VersionList()
+        if not self or not other:
+            return result
+
+        # Only elements whose bounds overlap can intersect. The lower bounds
+        # of the other list are sorted, and so is the running maximum of
+        # its upper bounds, so the candidates are found by binary search.
+        lows, highs = [], []
+        for o in other:
+            low, high = _bounds(o)
+            lows.append(low)
+            highs.append(max(high, highs[-1]) if highs else high)
+
         for s in self:
-            for o in other:
+            low, high = _bounds(s)
+            first = bisect_left(highs, low)
+            last = bisect_right(lows, high)
+            for o in other.versions[first:last]:
                 result.add(s.intersection(o))
         return result
 
@@ -761,11 +840,8 @@ def __contains__(self, other):
             return False
 
         for version in other:
-            i = bisect_left(self, other)
-            if i == 0:
-                if version not in self[0]:
-                    return False
-            elif all(version not in v for v in self[i - 1:]):
+            candidates = self.versions[:self._upper_candidate(version)]
+            if not any(version in v for v in reversed(candidates)):
                 return False
 
         return True
@@ -320,7 +320,7 @@ _spack() {
     then
         SPACK_COMPREPLY="-h --help -H --all-help --color -C --config-scope -d --debug --timestamp --pdb -e --env -D --env-dir -E --no-env --use-env-repo -k --insecure -l --enable-locks -L --disable-locks -m --mock -p --profile --sorted-profile --lines -v --verbose --stacktrace -V --version --print-shell-vars"
     else
-        SPACK_COMPREPLY="activate add arch blame build-env buildcache cd checksum ci clean clone commands compiler compilers concretize config containerize create deactivate debug dependencies dependents deprecate dev-build docs edit env extensions external fetch find flake8 gc gpg graph help info install license list load location log-parse maintainers mirror module patch pkg providers pydoc python reindex remove rm repo resource restage setup spec stage test uninstall unload url verify versions view"
+        SPACK_COMPREPLY="activate add arch blame build-env buildcache cd checksum ci clean clone commands compiler compilers concretization-cache concretize config containerize create deactivate debug dependencies dependents deprecate dev-build docs edit env extensions external fetch find flake8 gc gpg graph help info install license list load location log-parse maintainers mirror module patch pkg providers pydoc python reindex remove rm repo resource restage setup spec stage test uninstall unload url verify versions view"
     fi
 }
 
@@ -561,6 +561,23 @@ _spack_compilers() {
     SPACK_COMPREPLY="-h --help --scope"
 }
 
+_spack_concretization_cache() {
+    if $list_options
+    then
+        SPACK_COMPREPLY="-h --help"
+    else
+        SPACK_COMPREPLY="list clear"
+    fi
+}
+
+_spack_concretization_cache_list() {
+    SPACK_COMPREPLY="-h --help"
+}
+
+_spack_concretization_cache_clear() {
+    SPACK_COMPREPLY="-h --help --stale"
+}
+
 _spack_concretize() {
     SPACK_COMPREPLY="-h --help -f --force"
 }
@@ -898,7 +915,7 @@ _spack_flake8() {
 }
 
 _spack_gc() {
-    SPACK_COMPREPLY="-h --help -y --yes-to-all"
+    SPACK_COMPREPLY="-h --help -y --yes-to-all -j --jobs"
 }
 
 _spack_gpg() {
@@ -1002,7 +1019,7 @@ _spack_info() {
 _spack_install() {
     if $list_options
     then
-        SPACK_COMPREPLY="-h --help --only -u --until -j --jobs --overwrite --fail-fast --keep-prefix --keep-stage --dont-restage --use-cache --no-cache --cache-only --no-check-signature --show-log-on-error --source -n --no-checksum -v --verbose --fake --only-concrete -f --file --clean --dirty --test --run-tests --log-format --log-file --help-cdash --cdash-upload-url --cdash-build --cdash-site --cdash-track --cdash-buildstamp -y --yes-to-all"
+        SPACK_COMPREPLY="-h --help --only -u --until -j --jobs --overwrite --fail-fast --keep-prefix --keep-stage --dont-restage --use-cache --no-cache --cache-only --no-check-signature --show-log-on-error --source -n --no-checksum -v --verbose --fake --trace --trace-format --only-concrete -f --file --clean --dirty --test --run-tests --log-format --log-file --help-cdash --cdash-upload-url --cdash-build --cdash-site --cdash-track --cdash-buildstamp -y --yes-to-all"
     else
         _all_packages
     fi
@@ -1055,7 +1072,7 @@ _spack_location() {
 _spack_log_parse() {
     if $list_options
     then
-        SPACK_COMPREPLY="-h --help --show -c --context -p --profile -w --width -j --jobs"
+        SPACK_COMPREPLY="-h --help --show -c --context -p --profile -w --width -j --jobs -n --max-errors"
     else
         SPACK_COMPREPLY=""
     fi
@@ -1149,7 +1166,7 @@ _spack_module_lmod() {
 _spack_module_lmod_refresh() {
     if $list_options
     then
-        SPACK_COMPREPLY="-h --help --delete-tree --upstream-modules -y --yes-to-all"
+        SPACK_COMPREPLY="-h --help --delete-tree --upstream-modules -j --jobs -y --yes-to-all"
     else
         _installed_packages
     fi
@@ -1203,7 +1220,7 @@ _spack_module_tcl() {
 _spack_module_tcl_refresh() {
     if $list_options
     then
-        SPACK_COMPREPLY="-h --help --delete-tree --upstream-modules -y --yes-to-all"
+        SPACK_COMPREPLY="-h --help --delete-tree --upstream-modules -j --jobs -y --yes-to-all"
     else
         _installed_packages
     fi
@@ -1476,7 +1493,7 @@ _spack_test() {
 _spack_uninstall() {
     if $list_options
     then
-        SPACK_COMPREPLY="-h --help -f --force -R --dependents -y --yes-to-all -a --all"
+        SPACK_COMPREPLY="-h --help -f --force -R --dependents -y --yes-to-all -a --all -j --jobs"
     else
         _installed_packages
     fi